@@ -1,12 +1,35 @@
 import asyncio
 import logging
+import os
 import sys
 
 from aiogram.types import MenuButtonWebApp, WebAppInfo
 
-from loader import dp, bot
+from config import (
+    ARCHIVE_BATCH_SIZE,
+    ARCHIVE_INTERVAL_HOURS,
+    ARCHIVE_MAX_AGE_DAYS,
+    ARCHIVE_VACUUM,
+    BOT_MODE,
+    BOT_WORKERS,
+    METRICS_HOST,
+    METRICS_PORT,
+    WEBHOOK_HOST,
+    WEBHOOK_MAX_INFLIGHT,
+    WEBHOOK_PATH,
+    WEBHOOK_PORT,
+    WEBHOOK_SECRET,
+    WEBHOOK_URL,
+)
+from loader import dp, bot, fsm_storage, sender, subscriptions
+from database.fsm_storage import SQLiteStorage
 from database.manager import db_manager
-from handlers import start, menu, add_car, search
+from middlewares.metrics import instrument_router
+from services.archiver import run_archiver
+from services.metrics import start_metrics_server
+from services.webhook import run_webhook
+from services.workers import WorkerPool, poll_updates, serve_worker, worker_slot
+from handlers import start, menu, add_car, search, inline_search, admin
 
 MINI_APP_URL = "https://YOUR-MINIAPP-DOMAIN.vercel.app"
 
@@ -32,46 +55,176 @@ async def set_mini_app_menu_button() -> None:
     )
 
 
-async def main():
-    try:
-        logger.info("Bot initialization starting...")
+def include_routers() -> None:
+    # Routerlar tartibi muhim: fallback menu eng oxirida bo'lsin
+    for module in (start, add_car, search, inline_search, admin, menu):
+        instrument_router(module.router)
+
+    dp.include_router(start.router)
+    logger.info("✅ Start handler loaded")
+
+    dp.include_router(add_car.router)
+    logger.info("✅ Add car handler loaded")
+
+    dp.include_router(search.router)
+    logger.info("✅ Search handler loaded")
+
+    dp.include_router(inline_search.router)
+    logger.info("✅ Inline search handler loaded")
+
+    dp.include_router(admin.router)
+    logger.info("✅ Admin handler loaded")
+
+    dp.include_router(menu.router)
+    logger.info("✅ Menu handler loaded")
 
-        # Initialize Database
-        await db_manager.initialize()
-        logger.info("✅ Database initialized")
 
-        # Mini App menu button
+async def run_supervisor() -> None:
+    """BOT_WORKERS > 1: updatelarni qabul qiladi va chat bo'yicha worker jarayonlariga uzatadi.
+
+    Supervisor o'zi handler ishlatmaydi; routerlar faqat allowed_updates uchun kerak.
+    """
+    pool = WorkerPool(BOT_WORKERS, [sys.executable, os.path.abspath(__file__)])
+    try:
+        # Workerlar bir vaqtda migratsiya qilmasligi uchun sxema oldindan yangilanadi
+        await db_manager.migrate()
+        include_routers()
+
         try:
             await set_mini_app_menu_button()
             logger.info("✅ Mini App menu button set")
         except Exception as e:
             logger.warning(f"Mini App menu button set bo'lmadi: {e}")
 
-        # Routerlar tartibi muhim: fallback menu eng oxirida bo'lsin
-        dp.include_router(start.router)
-        logger.info("✅ Start handler loaded")
+        await pool.start()
+        logger.info(f"🤖 Supervisor started: {BOT_WORKERS} workers")
+
+        if BOT_MODE == 'webhook':
+            await run_webhook(
+                dp,
+                bot,
+                host=WEBHOOK_HOST,
+                port=WEBHOOK_PORT,
+                path=WEBHOOK_PATH,
+                secret_token=WEBHOOK_SECRET,
+                max_inflight=WEBHOOK_MAX_INFLIGHT,
+                public_url=WEBHOOK_URL,
+                runner=pool,
+            )
+        else:
+            await poll_updates(bot, pool, dp.resolve_used_update_types())
+    finally:
+        await pool.drain()
+        logger.info(f"Workers stopped: {pool.metrics()}")
+        await bot.session.close()
+
+
+async def main():
+    worker = worker_slot()
+    if BOT_WORKERS > 1 and worker is None:
+        await run_supervisor()
+        return
+
+    background_tasks: list[asyncio.Task] = []
+    metrics_runner = None
+    try:
+        logger.info("Bot initialization starting...")
 
-        dp.include_router(add_car.router)
-        logger.info("✅ Add car handler loaded")
+        # Har bir worker o'z metrikalarini alohida portda beradi
+        if METRICS_PORT > 0:
+            port = METRICS_PORT + (worker[0] if worker is not None else 0)
+            metrics_runner = await start_metrics_server(METRICS_HOST, port)
+            logger.info("✅ Metrics endpoint started")
 
-        dp.include_router(search.router)
-        logger.info("✅ Search handler loaded")
+        # Initialize Database
+        await db_manager.initialize()
+        logger.info("✅ Database initialized")
 
-        dp.include_router(menu.router)
-        logger.info("✅ Menu handler loaded")
+        # Dispatcher to'xtaganda storage.close() saqlanmagan sessiyalarni yozadi
+        if isinstance(fsm_storage, SQLiteStorage):
+            await fsm_storage.initialize()
+            logger.info("✅ FSM storage initialized")
+
+        sender.start()
+        logger.info("✅ Send scheduler started")
+
+        await subscriptions.load()
+        logger.info(f"✅ Saved searches loaded: {len(subscriptions.index)}")
+
+        # Bir nechta workerda arxivni faqat birinchisi ishlatadi
+        if ARCHIVE_INTERVAL_HOURS > 0 and (worker is None or worker[0] == 0):
+            background_tasks.append(
+                asyncio.create_task(
+                    run_archiver(
+                        db_manager,
+                        interval=ARCHIVE_INTERVAL_HOURS * 3600,
+                        max_age_days=ARCHIVE_MAX_AGE_DAYS or None,
+                        batch_size=ARCHIVE_BATCH_SIZE,
+                        vacuum=ARCHIVE_VACUUM,
+                    )
+                )
+            )
+            logger.info("✅ Archiver scheduled")
+
+        # Mini App menu button (worker rejimida supervisor o'rnatadi)
+        if worker is None:
+            try:
+                await set_mini_app_menu_button()
+                logger.info("✅ Mini App menu button set")
+            except Exception as e:
+                logger.warning(f"Mini App menu button set bo'lmadi: {e}")
+
+        include_routers()
 
         logger.info("🤖 Bot started successfully!")
         print("=" * 50)
         print("🤖 BOT STARTED SUCCESSFULLY!")
         print("=" * 50)
 
-        # Run polling
-        await dp.start_polling(bot)
+        if worker is not None:
+            index, socket_path = worker
+            await serve_worker(
+                dp,
+                bot,
+                index,
+                socket_path,
+                max_inflight=WEBHOOK_MAX_INFLIGHT,
+                storage=db_manager,
+                subscriptions=subscriptions,
+            )
+        elif BOT_MODE == 'webhook':
+            await run_webhook(
+                dp,
+                bot,
+                host=WEBHOOK_HOST,
+                port=WEBHOOK_PORT,
+                path=WEBHOOK_PATH,
+                secret_token=WEBHOOK_SECRET,
+                max_inflight=WEBHOOK_MAX_INFLIGHT,
+                public_url=WEBHOOK_URL,
+            )
+        else:
+            # Run polling
+            await dp.start_polling(bot)
 
     except Exception as e:
         logger.error(f"❌ CRITICAL ERROR: {e}", exc_info=True)
         print(f"❌ CRITICAL ERROR: {e}")
         raise
+    finally:
+        for task in background_tasks:
+            task.cancel()
+        await asyncio.gather(*background_tasks, return_exceptions=True)
+        if metrics_runner is not None:
+            await metrics_runner.cleanup()
+        await subscriptions.close()
+        # Odatda dp shutdown'da yopilgan bo'ladi; polling boshlanmasdan xato bo'lsa ham yozib qo'yamiz
+        await fsm_storage.close()
+        await sender.stop()
+        logger.info("Send queue drained")
+        await bot.session.close()
+        await db_manager.close()
+        logger.info("Database connections closed")
 
 
 if __name__ == "__main__":
@@ -0,0 +1,82 @@
+"""Qatorlarni dict + json.loads va Car yozuvlariga aylantirishni solishtiradi.
+
+Ishga tushirish (loyiha ildizidan):
+
+    python -m benchmarks.car_records            # 10k va 100k qator
+    python -m benchmarks.car_records 50000
+"""
+import json
+import sys
+import time
+import tracemalloc
+
+from database.records import Car
+
+COLUMNS = [
+    'id', 'user_id', 'model', 'price', 'condition', 'transmission', 'color',
+    'mileage', 'region', 'photo', 'phone', 'username', 'photos', 'status',
+    'channel_message_id', 'created_at', 'sold_at',
+]
+
+
+def make_rows(count: int) -> list[tuple]:
+    return [
+        (
+            i, str(1000 + i), f'Chevrolet Cobalt {i}', 10_000 + i, 'Ishlatilgan', 'Avtomat',
+            'Oq', 50_000 + i, 'Toshkent', f'file-{i}-0', '+998901234567', f'user{i}',
+            json.dumps([f'file-{i}-{n}' for n in range(3)]), 'active', None,
+            '2026-10-18 10:00:00', None,
+        )
+        for i in range(count)
+    ]
+
+
+def as_dict(columns: list[str], row: tuple) -> dict:
+    # Avvalgi DatabaseManager._row_to_dict
+    data = dict(zip(columns, row))
+    raw_photos = data.get('photos')
+    if raw_photos:
+        try:
+            data['photos'] = json.loads(raw_photos)
+        except json.JSONDecodeError:
+            data['photos'] = [data.get('photo')] if data.get('photo') else []
+    else:
+        data['photos'] = [data.get('photo')] if data.get('photo') else []
+    return data
+
+
+def summary_line(car) -> str:
+    # admin_recent kabi: faqat model, narx va birinchi rasm kerak
+    return f"{car.get('model')} {car.get('price')} {car.get('photo')}"
+
+
+def bench(name: str, build, rows: list[tuple]) -> None:
+    started = time.perf_counter()
+    records = [build(COLUMNS, row) for row in rows]
+    built = time.perf_counter() - started
+    del records
+
+    # Xotira alohida o'lchanadi: tracemalloc vaqtni sezilarli sekinlashtiradi
+    tracemalloc.start()
+    records = [build(COLUMNS, row) for row in rows]
+    memory, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    started = time.perf_counter()
+    for record in records:
+        summary_line(record)
+    accessed = time.perf_counter() - started
+
+    print(
+        f'  {name:<12} yasash {built * 1000:8.1f} ms   '
+        f'o‘qish {accessed * 1000:7.1f} ms   xotira {memory / 1024 / 1024:7.1f} MiB'
+    )
+
+
+if __name__ == '__main__':
+    sizes = [int(arg) for arg in sys.argv[1:]] or [10_000, 100_000]
+    for size in sizes:
+        rows = make_rows(size)
+        print(f'\n=== {size:,} qator ===')
+        bench('dict+json', as_dict, rows)
+        bench('Car', Car.from_row, rows)
@@ -0,0 +1,84 @@
+"""SQLite va xotiradagi engine'larni bir xil yuklamada solishtiradi.
+
+Ishga tushirish (loyiha ildizidan, .env yoki BOT_TOKEN/CHANNEL_ID kerak):
+
+    python -m benchmarks.engines            # 20k e'lon, 2k qidiruv
+    python -m benchmarks.engines 50000 5000
+"""
+import asyncio
+import os
+import random
+import sys
+import tempfile
+import time
+
+from database.base import CarStorage
+from database.manager import DatabaseManager
+from database.memory import MemoryDatabaseManager
+
+MODELS = ['Chevrolet Cobalt', 'Chevrolet Gentra', 'Nexia 3', 'Spark', 'Kia K5', 'BYD Chazor']
+QUERIES = ['cobalt', 'Кобальт', 'nexia', 'gentra', 'k5', '', 'spark']
+REGIONS = ['Toshkent', 'Samarqand', 'Buxoro', 'Andijon']
+
+
+async def workload(storage: CarStorage, cars: int, searches: int) -> dict[str, float]:
+    rnd = random.Random(7)
+    timings: dict[str, float] = {}
+
+    started = time.perf_counter()
+    await asyncio.gather(*[
+        storage.add_user(str(user_id), '+998900000000', f'user{user_id}')
+        for user_id in range(cars // 10)
+    ])
+    await asyncio.gather(*[
+        storage.add_car({
+            'user_id': str(rnd.randrange(cars // 10)),
+            'model': rnd.choice(MODELS),
+            'price': rnd.randint(2_000, 60_000),
+            'region': rnd.choice(REGIONS),
+            'photos': [f'file-{i}-{n}' for n in range(rnd.randint(0, 3))],
+        })
+        for i in range(cars)
+    ])
+    timings['yozish'] = time.perf_counter() - started
+
+    started = time.perf_counter()
+    for _ in range(searches):
+        price_min = rnd.randint(0, 40_000)
+        await storage.search_cars_page(rnd.choice(QUERIES), price_min, price_min + 10_000, limit=10)
+    timings['qidiruv'] = time.perf_counter() - started
+
+    started = time.perf_counter()
+    for _ in range(searches):
+        await storage.get_user(str(rnd.randrange(cars // 10)))
+    timings['get_user'] = time.perf_counter() - started
+
+    started = time.perf_counter()
+    for _ in range(searches):
+        await storage.get_stats()
+    timings['get_stats'] = time.perf_counter() - started
+    return timings
+
+
+async def main(cars: int, searches: int) -> None:
+    with tempfile.TemporaryDirectory() as tmp:
+        engines = {
+            'sqlite': DatabaseManager(os.path.join(tmp, 'bench.db')),
+            'memory': MemoryDatabaseManager(),
+        }
+        for name, storage in engines.items():
+            await storage.initialize()
+            try:
+                timings = await workload(storage, cars, searches)
+            finally:
+                await storage.close()
+
+            print(f'\n=== {name} ===')
+            print(f"  yozish    {cars / timings['yozish']:>10,.0f} e'lon/s")
+            for step in ('qidiruv', 'get_user', 'get_stats'):
+                print(f'  {step:<9} {searches / timings[step]:>10,.0f} so‘rov/s')
+
+
+if __name__ == '__main__':
+    args = [int(arg) for arg in sys.argv[1:]]
+    asyncio.run(main(*(args + [20_000, 2_000][len(args):])))
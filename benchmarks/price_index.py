@@ -0,0 +1,119 @@
+"""search_cars_page: SQL yo'li va xotiradagi PriceIndex (SEARCH_INDEX=1) solishtiruvi.
+
+Ishga tushirish (loyiha ildizidan, .env yoki BOT_TOKEN/CHANNEL_ID kerak):
+
+    python -m benchmarks.price_index             # 1M aktiv e'lon, 500 so'rov
+    python -m benchmarks.price_index 200000 1000
+"""
+import asyncio
+import os
+import random
+import sqlite3
+import statistics
+import sys
+import tempfile
+import time
+
+from database.manager import DatabaseManager
+from database.search_cache import search_key
+from utils.translit import normalize_text
+
+MODELS = ['Chevrolet Cobalt', 'Chevrolet Gentra', 'Nexia 3', 'Spark', 'Kia K5', 'BYD Chazor', 'Malibu 2']
+REGIONS = ['Toshkent', 'Samarqand', 'Buxoro', 'Andijon', 'Xorazm']
+QUERIES = ['cobalt', 'nexia', 'gentra', 'k5', '', 'malibu', 'chev']
+
+
+def populate(path: str, rows: int) -> None:
+    rnd = random.Random(42)
+    db = sqlite3.connect(path)
+    db.create_function('car_norm', 1, normalize_text, deterministic=True)
+    db.executemany(
+        '''
+        INSERT INTO cars (user_id, model, price, color, mileage, region, status)
+        VALUES (?, ?, ?, ?, ?, ?, 'active')
+        ''',
+        (
+            (
+                str(rnd.randint(1, rows // 10 + 1)),
+                rnd.choice(MODELS),
+                rnd.randint(2_000, 60_000),
+                rnd.choice(['Oq', 'Qora', 'Kumush']),
+                rnd.randint(0, 300_000),
+                rnd.choice(REGIONS),
+            )
+            for _ in range(rows)
+        ),
+    )
+    db.commit()
+    db.close()
+
+
+def report(name: str, samples: list[float]) -> None:
+    samples.sort()
+    p99 = samples[int(len(samples) * 0.99) - 1]
+    print(f'  {name:<28} o‘rtacha {statistics.mean(samples):8.3f} ms   p99 {p99:8.3f} ms')
+
+
+async def main(rows: int, queries: int) -> None:
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'bench.db')
+        storage = DatabaseManager(path)
+        await storage.initialize()
+        await storage.close()
+
+        started = time.perf_counter()
+        populate(path, rows)
+        print(f"{rows:,} e'lon yozildi: {time.perf_counter() - started:.1f} s")
+
+        storage = DatabaseManager(path, search_index=True)
+        started = time.perf_counter()
+        await storage.initialize()
+        index = storage.price_index
+        print(f'Indekslar yuklandi: {time.perf_counter() - started:.1f} s')
+        columns = (index._prices, index._price_ids, index._ids, index._price_of, index._mileage_of)
+        postings = sum(len(ids) * ids.itemsize for ids in index._postings.values())
+        arrays = sum(len(column) * column.itemsize for column in columns) + postings
+        print(f'PriceIndex massivlari: {arrays / 2**20:.1f} MB')
+
+        rnd = random.Random(7)
+        workloads = {
+            'tor oraliq (1000$)': 1_000,
+            'o‘rta oraliq (10000$)': 10_000,
+            'keng oraliq (cheksiz)': None,
+        }
+        try:
+            for title, width in workloads.items():
+                sql: list[float] = []
+                memory: list[float] = []
+                full: list[float] = []
+                for _ in range(queries):
+                    model = rnd.choice(QUERIES)
+                    price_min = rnd.randint(2_000, 50_000) if width else 0
+                    price_max = price_min + width if width else 999_999_999
+                    key = search_key(model, price_min, price_max)
+
+                    started = time.perf_counter()
+                    expected, _ = await storage._search_page(key, None, 10)
+                    sql.append((time.perf_counter() - started) * 1000)
+
+                    started = time.perf_counter()
+                    ids, _ = index.search(model, price_min, price_max, None, 10)
+                    memory.append((time.perf_counter() - started) * 1000)
+
+                    started = time.perf_counter()
+                    cars, _ = await storage.search_cars_page(model, price_min, price_max, None, 10)
+                    full.append((time.perf_counter() - started) * 1000)
+
+                    assert ids == [car['id'] for car in expected] == [car['id'] for car in cars]
+
+                print(f'\n=== {title} ===')
+                report('SQL (FTS + indeks)', sql)
+                report('PriceIndex.search', memory)
+                report('PriceIndex + qatorlar', full)
+        finally:
+            await storage.close()
+
+
+if __name__ == '__main__':
+    args = [int(arg) for arg in sys.argv[1:]]
+    asyncio.run(main(*(args + [1_000_000, 500][len(args):])))
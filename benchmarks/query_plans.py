@@ -0,0 +1,103 @@
+"""cars jadvalidagi indekslar so'rov rejasi va tezligiga ta'sirini o'lchaydi.
+
+Ishga tushirish (loyiha ildizidan):
+
+    python -m benchmarks.query_plans            # 100k va 1M e'lon
+    python -m benchmarks.query_plans 50000      # ixtiyoriy hajm
+"""
+import os
+import random
+import sqlite3
+import sys
+import tempfile
+import time
+
+from database.migrations import CAR_INDEXES, CARS_TABLE
+
+REGIONS = ['Toshkent', 'Samarqand', 'Buxoro', 'Andijon', 'Farg‘ona', 'Namangan', 'Xorazm', 'Qashqadaryo']
+MODELS = ['Chevrolet Cobalt', 'Chevrolet Gentra', 'Chevrolet Nexia 3', 'Chevrolet Spark', 'Kia K5', 'BYD Chazor']
+
+QUERIES = {
+    'search_cars': (
+        "SELECT * FROM cars WHERE status = 'active' AND price >= ? AND price <= ? "
+        'ORDER BY id DESC',
+        (8000, 9000),
+    ),
+    'count_active': ("SELECT COUNT(*) FROM cars WHERE status = 'active'", ()),
+    'count_sold': ("SELECT COUNT(*) FROM cars WHERE status = 'sold'", ()),
+    'today_ads': (
+        "SELECT COUNT(*) FROM cars "
+        "WHERE created_at >= datetime('now', 'localtime', 'start of day', 'utc') "
+        "AND created_at < datetime('now', 'localtime', 'start of day', '+1 day', 'utc')",
+        (),
+    ),
+    'top_region': (
+        'SELECT region, COUNT(*) AS cnt FROM cars GROUP BY region ORDER BY cnt DESC LIMIT 1',
+        (),
+    ),
+    'recent_cars': ('SELECT * FROM cars ORDER BY id DESC LIMIT 5', ()),
+}
+
+
+def populate(db: sqlite3.Connection, rows: int) -> None:
+    rnd = random.Random(42)
+    db.execute(CARS_TABLE)
+
+    def generate():
+        for i in range(rows):
+            days_ago = rnd.randint(0, 365)
+            yield (
+                str(rnd.randint(1, rows // 10 + 1)),
+                rnd.choice(MODELS),
+                rnd.randint(2_000, 60_000),
+                rnd.choice(REGIONS),
+                f'photo-{i}',
+                'sold' if rnd.random() < 0.3 else 'active',
+                f'-{days_ago} days',
+            )
+
+    db.executemany(
+        '''
+        INSERT INTO cars (user_id, model, price, region, photo, status, created_at)
+        VALUES (?, ?, ?, ?, ?, ?, datetime('now', ?))
+        ''',
+        generate(),
+    )
+    db.commit()
+
+
+def measure(db: sqlite3.Connection, query: str, params: tuple, repeat: int = 5) -> tuple[list[str], float]:
+    plan = [row[3] for row in db.execute(f'EXPLAIN QUERY PLAN {query}', params)]
+    best = float('inf')
+    for _ in range(repeat):
+        started = time.perf_counter()
+        db.execute(query, params).fetchall()
+        best = min(best, time.perf_counter() - started)
+    return plan, best * 1000
+
+
+def run(rows: int) -> None:
+    with tempfile.TemporaryDirectory() as tmp:
+        db = sqlite3.connect(os.path.join(tmp, 'bench.db'))
+        populate(db, rows)
+
+        before = {name: measure(db, q, p) for name, (q, p) in QUERIES.items()}
+        for statement in CAR_INDEXES:
+            db.execute(statement)
+        db.execute('ANALYZE')
+        after = {name: measure(db, q, p) for name, (q, p) in QUERIES.items()}
+        db.close()
+
+    print(f'\n=== {rows:,} e\'lon ===')
+    for name in QUERIES:
+        plan_before, ms_before = before[name]
+        plan_after, ms_after = after[name]
+        print(f'\n{name}: {ms_before:.2f} ms -> {ms_after:.2f} ms')
+        print(f'  oldin : {" | ".join(plan_before)}')
+        print(f'  keyin : {" | ".join(plan_after)}')
+
+
+if __name__ == '__main__':
+    sizes = [int(arg) for arg in sys.argv[1:]] or [100_000, 1_000_000]
+    for size in sizes:
+        run(size)
@@ -0,0 +1,100 @@
+"""Webhook rejimi: soxta updatelarni lokal serverga POST qilib o'lchash.
+
+Handler Bot API o'rniga HANDLER_DELAY soniya kutadi (tarmoq/DB I/O ga
+o'xshatish). Har bir chat ichidagi tartib, noto'g'ri secret uchun 401 va
+to'xtashda navbatning tugashi tekshiriladi.
+
+    python -m benchmarks.webhook              # 2000 update, 200 chat
+    python -m benchmarks.webhook 5000 500
+"""
+import asyncio
+import sys
+import time
+from datetime import datetime
+
+from aiogram import Bot, Dispatcher
+from aiogram.types import Message
+from aiohttp import ClientSession, web
+
+from services.webhook import build_webhook_app
+
+HOST = '127.0.0.1'
+PORT = 8089
+PATH = '/webhook'
+SECRET = 'bench-secret'
+HANDLER_DELAY = 0.02
+CLIENT_CONNECTIONS = 40
+
+
+def fake_update(update_id: int, chat_id: int, sequence: int) -> dict:
+    return {
+        'update_id': update_id,
+        'message': {
+            'message_id': sequence,
+            'date': int(datetime.now().timestamp()),
+            'chat': {'id': chat_id, 'type': 'private'},
+            'from': {'id': chat_id, 'is_bot': False, 'first_name': 'Bench'},
+            'text': str(sequence),
+        },
+    }
+
+
+async def run(updates: int, chats: int, max_inflight: int) -> None:
+    seen: dict[int, list[int]] = {}
+    dispatcher = Dispatcher()
+
+    @dispatcher.message()
+    async def handler(message: Message) -> None:
+        await asyncio.sleep(HANDLER_DELAY)
+        seen.setdefault(message.chat.id, []).append(int(message.text))
+
+    bot = Bot('1:bench')
+    app, webhook = build_webhook_app(dispatcher, bot, PATH, SECRET, max_inflight)
+    runner = web.AppRunner(app)
+    await runner.setup()
+    await web.TCPSite(runner, HOST, PORT).start()
+    url = f'http://{HOST}:{PORT}{PATH}'
+
+    async with ClientSession() as session:
+        async with session.post(url, json=fake_update(0, 1, 0), headers={'X-Telegram-Bot-Api-Secret-Token': 'x'}) as response:
+            assert response.status == 401, response.status
+
+        clients = min(CLIENT_CONNECTIONS, chats)
+        batches: list[list[dict]] = [[] for _ in range(clients)]
+        for index in range(updates):
+            chat = index % chats
+            batches[chat % clients].append(fake_update(index + 1, 1000 + chat, index // chats))
+
+        async def client(batch: list[dict]) -> None:
+            # Bitta chat updatelari ketma-ket yuboriladi (Telegram ham shunday qiladi)
+            for update in batch:
+                async with session.post(url, json=update, headers={'X-Telegram-Bot-Api-Secret-Token': SECRET}) as response:
+                    assert response.status == 200, response.status
+
+        started = time.perf_counter()
+        await asyncio.gather(*(client(batch) for batch in batches))
+        accepted = time.perf_counter() - started
+        # Qabul qilingan, lekin hali ishlanmagan updatelar cleanup'da tugatiladi
+        await runner.cleanup()
+        elapsed = time.perf_counter() - started
+
+    await bot.session.close()
+    processed = sum(len(sequence) for sequence in seen.values())
+    ordered = all(sequence == sorted(sequence) for sequence in seen.values())
+    print(
+        f'  max_inflight={max_inflight:<4} qabul {accepted:6.2f} s   '
+        f'ishlandi {processed}/{updates} ta, {elapsed:6.2f} s ({processed / elapsed:7.0f} update/s)   '
+        f'tartib {"OK" if ordered else "BUZILGAN"}'
+    )
+    assert processed == updates and ordered
+
+
+async def main(updates: int, chats: int) -> None:
+    print(f'{updates} update, {chats} chat, handler {HANDLER_DELAY * 1000:.0f} ms')
+    for max_inflight in (4, 16, 64, 256):
+        await run(updates, chats, max_inflight)
+
+
+if __name__ == '__main__':
+    args = [int(arg) for arg in sys.argv[1:]]
+    asyncio.run(main(*(args + [2000, 200][len(args):])))
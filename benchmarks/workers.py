@@ -0,0 +1,103 @@
+"""BOT_WORKERS: worker jarayonlari soni bo'yicha o'tkazuvchanlik.
+
+Supervisor (services.workers.WorkerPool) soxta updatelarni chat bo'yicha
+workerlarga uzatadi. Har bir worker handleri qidiruv sahifasini
+formatlaydi (format_car, CPU ish) -- Bot API va baza chaqirilmaydi.
+Natija CPU yadrolari soniga bog'liq: 1 yadroda o'sish bo'lmaydi.
+
+    python -m benchmarks.workers              # 3000 update, 1/2/4 worker
+    python -m benchmarks.workers 10000 1 2 4 8
+"""
+import asyncio
+import os
+import sys
+import tempfile
+import time
+
+from aiogram import Bot, Dispatcher
+from aiogram.types import Message
+
+from services.workers import WorkerPool, serve_worker, worker_slot
+from utils.formatter import format_car, format_car_short
+
+CHATS = 500
+# Bitta update uchun formatlanadigan sahifalar (taxminan 1-2 ms CPU)
+PAGES_PER_UPDATE = 20
+RESULT_DIR_ENV = 'BENCH_RESULT_DIR'
+
+CAR = {
+    'model': 'Chevrolet Cobalt', 'price': 11_500, 'condition': 'Ishlatilgan',
+    'transmission': 'Avtomat', 'color': 'Oq', 'mileage': 84_000, 'region': 'Toshkent',
+    'phone': '+998901234567', 'username': 'seller', 'photos': ['a', 'b', 'c'],
+}
+
+
+def fake_update(update_id: int, chat_id: int) -> dict:
+    return {
+        'update_id': update_id,
+        'message': {
+            'message_id': update_id,
+            'date': int(time.time()),
+            'chat': {'id': chat_id, 'type': 'private'},
+            'from': {'id': chat_id, 'is_bot': False, 'first_name': 'Bench'},
+            'text': 'cobalt',
+        },
+    }
+
+
+async def worker(index: int, socket_path: str) -> None:
+    dispatcher = Dispatcher()
+    processed = 0
+
+    @dispatcher.message()
+    async def handler(message: Message) -> None:
+        nonlocal processed
+        for _ in range(PAGES_PER_UPDATE):
+            page = [{**CAR, 'price': CAR['price'] + offset} for offset in range(10)]
+            '\n\n'.join(format_car_short(car) for car in page)
+            format_car(page[0])
+        processed += 1
+
+    bot = Bot('1:bench')
+    await serve_worker(dispatcher, bot, index, socket_path, max_inflight=64)
+    await bot.session.close()
+    with open(os.path.join(os.environ[RESULT_DIR_ENV], f'{index}.txt'), 'w') as result:
+        result.write(str(processed))
+
+
+async def run(updates: int, count: int) -> None:
+    with tempfile.TemporaryDirectory() as results:
+        os.environ[RESULT_DIR_ENV] = results
+        pool = WorkerPool(count, [sys.executable, '-m', 'benchmarks.workers'])
+        await pool.start()
+        bot = Bot('1:bench')
+
+        started = time.perf_counter()
+        for index in range(updates):
+            await pool.submit(bot, fake_update(index + 1, 1000 + index % CHATS))
+        # drain: workerlar navbatini tugatib chiqquncha kutadi
+        await pool.drain(timeout=600)
+        elapsed = time.perf_counter() - started
+        await bot.session.close()
+
+        processed = 0
+        for name in os.listdir(results):
+            with open(os.path.join(results, name)) as result:
+                processed += int(result.read())
+
+    print(f'  {count} worker: {processed}/{updates} ta, {elapsed:6.2f} s ({processed / elapsed:7.0f} update/s)')
+
+
+async def main(updates: int, counts: list[int]) -> None:
+    print(f'{updates} update, {CHATS} chat, CPU yadrolari: {os.cpu_count()}')
+    for count in counts:
+        await run(updates, count)
+
+
+if __name__ == '__main__':
+    slot = worker_slot()
+    if slot is not None:
+        asyncio.run(worker(*slot))
+    else:
+        args = [int(arg) for arg in sys.argv[1:]]
+        asyncio.run(main(args[0] if args else 3000, args[1:] or [1, 2, 4]))
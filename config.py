@@ -5,7 +5,44 @@ load_dotenv()
 
 BOT_TOKEN = os.getenv('BOT_TOKEN', '').strip()
 CHANNEL_ID_RAW = os.getenv('CHANNEL_ID', '').strip()
+DB_ENGINE = os.getenv('DB_ENGINE', 'sqlite').strip().lower()
 DB_FILE = os.getenv('DB_FILE', 'bot_database.db')
+DB_READERS = int(os.getenv('DB_READERS', '4'))
+# Aktiv e'lonlar qidiruvini xotiradagi narx indeksidan bajarish (SQLite engine)
+SEARCH_INDEX = os.getenv('SEARCH_INDEX', '0').strip().lower() in {'1', 'true', 'yes'}
+# Filtr tugmalaridagi sanoq va filtrlangan qidiruvni xotiradagi facet indeksidan
+# bajarish (SQLite engine); o'chirilgan bo'lsa GROUP BY so'rovlari ishlaydi
+FACET_INDEX = os.getenv('FACET_INDEX', '0').strip().lower() in {'1', 'true', 'yes'}
+
+# FSM holatlari: sqlite (qayta ishga tushirishda saqlanadi) yoki memory
+FSM_STORAGE = os.getenv('FSM_STORAGE', 'sqlite').strip().lower()
+FSM_DB_FILE = os.getenv('FSM_DB_FILE', DB_FILE)
+# Shuncha soat yozilmagan FSM sessiyasi o'chiriladi
+FSM_SESSION_TTL_HOURS = float(os.getenv('FSM_SESSION_TTL_HOURS', '24'))
+
+# Sotilgan va eskirgan e'lonlarni arxivlash (0 soat -- o'chirilgan)
+ARCHIVE_INTERVAL_HOURS = float(os.getenv('ARCHIVE_INTERVAL_HOURS', '6'))
+# 0 -- faqat sotilganlar arxivlanadi. N > 0 bo'lsa N kundan eski aktiv
+# e'lonlar ham 'expired' sifatida arxivga o'tadi (kanal posti o'zgarmaydi)
+ARCHIVE_MAX_AGE_DAYS = int(os.getenv('ARCHIVE_MAX_AGE_DAYS', '0'))
+ARCHIVE_BATCH_SIZE = int(os.getenv('ARCHIVE_BATCH_SIZE', '500'))
+ARCHIVE_VACUUM = os.getenv('ARCHIVE_VACUUM', '1').strip().lower() in {'1', 'true', 'yes'}
+
+# Updatelarni qabul qilish: polling yoki webhook (aiohttp server)
+BOT_MODE = os.getenv('BOT_MODE', 'polling').strip().lower()
+# Tashqi manzil (https://bot.example.com); bo'sh bo'lsa setWebhook chaqirilmaydi
+WEBHOOK_URL = os.getenv('WEBHOOK_URL', '').strip()
+WEBHOOK_PATH = os.getenv('WEBHOOK_PATH', '/webhook').strip()
+WEBHOOK_HOST = os.getenv('WEBHOOK_HOST', '0.0.0.0').strip()
+WEBHOOK_PORT = int(os.getenv('WEBHOOK_PORT', '8080'))
+WEBHOOK_SECRET = os.getenv('WEBHOOK_SECRET', '').strip()
+# Bir vaqtda ishlayotgan handlerlar soni (bitta chat ichida tartib saqlanadi)
+WEBHOOK_MAX_INFLIGHT = int(os.getenv('WEBHOOK_MAX_INFLIGHT', '64'))
+# 1 dan katta bo'lsa: supervisor updatelarni chat bo'yicha shuncha worker jarayoniga taqsimlaydi
+BOT_WORKERS = max(1, int(os.getenv('BOT_WORKERS', '1')))
+# Prometheus /metrics (0 -- o'chirilgan, masalan 9108). Workerlar METRICS_PORT + raqam portida
+METRICS_HOST = os.getenv('METRICS_HOST', '127.0.0.1').strip()
+METRICS_PORT = int(os.getenv('METRICS_PORT', '0'))
 
 ADMIN_IDS_RAW = os.getenv('ADMIN_IDS', '').strip()
 ADMIN_IDS = {
@@ -20,4 +57,13 @@ if not BOT_TOKEN:
 if not CHANNEL_ID_RAW:
     raise ValueError('CHANNEL_ID .env faylda kiritilmagan')
 
+if BOT_MODE not in {'polling', 'webhook'}:
+    raise ValueError(f"BOT_MODE noto'g'ri: {BOT_MODE} (polling yoki webhook)")
+
+if BOT_MODE == 'webhook' and not WEBHOOK_SECRET:
+    raise ValueError('BOT_MODE=webhook uchun WEBHOOK_SECRET .env faylda kiritilmagan')
+
+if BOT_WORKERS > 1 and DB_ENGINE == 'memory':
+    raise ValueError("BOT_WORKERS > 1 faqat DB_ENGINE=sqlite bilan ishlaydi (jarayonlar umumiy baza)")
+
 CHANNEL_ID = int(CHANNEL_ID_RAW)
@@ -0,0 +1,110 @@
+from typing import Callable, Protocol
+
+from database.facets import FacetCounts, Filters
+from database.records import Car
+from database.search_cache import SearchCache
+from utils.cache import TTLCache
+
+# on_change(tur, ma'lumot): 'car_added' | 'car_removed' | 'cars_archived'
+ChangeListener = Callable[[str, dict], None]
+
+
+class CarStorage(Protocol):
+    """Handlerlar foydalanadigan saqlash interfeysi.
+
+    SQLite (database.manager.DatabaseManager) va xotiradagi
+    (database.memory.MemoryDatabaseManager) engine'lar shu metodlarni
+    bir xil ma'noda bajaradi; engine DB_ENGINE orqali tanlanadi.
+    """
+
+    user_cache: TTLCache | None
+    search_cache: SearchCache | None
+    # Workerlar rejimida yozuvlar shu orqali boshqa jarayonlarga tarqatiladi
+    on_change: ChangeListener | None
+
+    async def initialize(self) -> None: ...
+
+    async def close(self) -> None: ...
+
+    async def migrate(self) -> int: ...
+
+    def apply_change(self, kind: str, payload: dict) -> None: ...
+
+    async def add_user(self, user_id: str, phone: str, username: str | None) -> None: ...
+
+    async def get_user(self, user_id: str) -> dict | None: ...
+
+    async def add_car(self, car_data: dict) -> int: ...
+
+    async def set_channel_message_id(self, car_id: int, message_id: int | None) -> None: ...
+
+    async def get_car(self, car_id: int) -> Car | None: ...
+
+    async def mark_car_sold(self, car_id: int, owner_user_id: str) -> Car | None: ...
+
+    async def search_cars(
+        self,
+        model: str | None = None,
+        price_min: int = 0,
+        price_max: int = 999_999_999,
+    ) -> list[Car]: ...
+
+    async def search_cars_page(
+        self,
+        model: str | None = None,
+        price_min: int = 0,
+        price_max: int = 999_999_999,
+        after_id: int | None = None,
+        limit: int = 10,
+    ) -> tuple[list[Car], int | None]: ...
+
+    async def search_cars_faceted(
+        self,
+        model: str | None = None,
+        price_min: int = 0,
+        price_max: int = 999_999_999,
+        filters: Filters | None = None,
+        after_id: int | None = None,
+        limit: int = 10,
+    ) -> tuple[list[Car], int | None]: ...
+
+    async def count_cars(
+        self,
+        model: str | None = None,
+        price_min: int = 0,
+        price_max: int = 999_999_999,
+    ) -> int: ...
+
+    async def facet_counts(
+        self,
+        model: str | None = None,
+        price_min: int = 0,
+        price_max: int = 999_999_999,
+        filters: Filters | None = None,
+    ) -> tuple[int, FacetCounts]: ...
+
+    def facet_key(self, facet: str, code: str) -> str | None: ...
+
+    async def get_photos_for(self, car_ids: list[int]) -> dict[int, list[str]]: ...
+
+    async def get_stats(self) -> dict: ...
+
+    async def check_counters(self, repair: bool = False) -> list[tuple[str, str, int, int]]: ...
+
+    async def archive_cars(self, max_age_days: int | None = None, limit: int = 500) -> int: ...
+
+    async def incremental_vacuum(self, pages: int = 1000) -> None: ...
+
+    async def get_recent_cars(self, limit: int = 5) -> list[Car]: ...
+
+    async def add_saved_search(
+        self,
+        user_id: str,
+        model: str | None,
+        price_min: int,
+        price_max: int,
+    ) -> dict: ...
+
+    async def delete_saved_search(self, search_id: int, user_id: str) -> bool: ...
+
+    async def get_saved_searches(self) -> list[dict]: ...
@@ -0,0 +1,96 @@
+from datetime import date
+
+import aiosqlite
+
+# Admin statistikasi uchun oldindan hisoblangan sanoqlar:
+#   ('total', 'users' | 'cars' | 'active' | 'sold' | 'archived')
+#   ('day', 'YYYY-MM-DD')   -- mahalliy sana bo'yicha qo'shilgan e'lonlar
+#   ('region', '<hudud>')   -- hudud bo'yicha barcha e'lonlar
+COUNTERS_TABLE = '''
+CREATE TABLE IF NOT EXISTS counters (
+    scope TEXT NOT NULL,
+    key TEXT NOT NULL,
+    value INTEGER NOT NULL DEFAULT 0,
+    PRIMARY KEY (scope, key)
+) WITHOUT ROWID
+'''
+
+# Haqiqiy qiymatlar: backfill va tekshiruv shu so'rovlardan foydalanadi.
+# {cars} -- cars yoki cars + cars_archive (umrbod sanoqlar arxivni ham o'z ichiga oladi).
+REAL_COUNTS = (
+    "SELECT 'total', 'users', COUNT(*) FROM users",
+    "SELECT 'total', 'cars', COUNT(*) FROM {cars}",
+    "SELECT 'total', 'active', COUNT(*) FROM cars WHERE status = 'active'",
+    "SELECT 'total', 'sold', COUNT(*) FROM {cars} WHERE status = 'sold'",
+    '''
+    SELECT 'day', date(created_at, 'localtime'), COUNT(*) FROM {cars}
+    WHERE created_at IS NOT NULL GROUP BY 2
+    ''',
+    "SELECT 'region', COALESCE(region, ''), COUNT(*) FROM {cars} GROUP BY 2",
+    "SELECT 'total', 'archived', COUNT(*) FROM {archive}",
+)
+
+_ALL_CARS = '''(
+    SELECT status, created_at, region FROM cars
+    UNION ALL
+    SELECT status, created_at, region FROM cars_archive
+)'''
+
+
+def today_key() -> str:
+    return date.today().isoformat()
+
+
+async def bump(db: aiosqlite.Connection, scope: str, key: str | None, delta: int = 1) -> None:
+    await db.execute(
+        '''
+        INSERT INTO counters (scope, key, value) VALUES (?, ?, ?)
+        ON CONFLICT (scope, key) DO UPDATE SET value = value + excluded.value
+        ''',
+        (scope, key or '', delta),
+    )
+
+
+async def real_counts(db: aiosqlite.Connection) -> dict[tuple[str, str], int]:
+    async with db.execute(
+        "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'cars_archive'"
+    ) as cursor:
+        has_archive = await cursor.fetchone() is not None
+
+    sources = {
+        'cars': _ALL_CARS if has_archive else 'cars',
+        'archive': 'cars_archive' if has_archive else '(SELECT 1 WHERE 0)',
+    }
+    counts: dict[tuple[str, str], int] = {}
+    for query in REAL_COUNTS:
+        async with db.execute(query.format(**sources)) as cursor:
+            for scope, key, value in await cursor.fetchall():
+                if value:
+                    counts[(scope, key)] = value
+    return counts
+
+
+async def stored_counts(db: aiosqlite.Connection) -> dict[tuple[str, str], int]:
+    async with db.execute('SELECT scope, key, value FROM counters WHERE value != 0') as cursor:
+        return {(scope, key): value for scope, key, value in await cursor.fetchall()}
+
+
+async def rebuild(db: aiosqlite.Connection) -> None:
+    """counters jadvalini haqiqiy sanoqlardan qayta to'ldiradi."""
+    counts = await real_counts(db)
+    await db.execute('DELETE FROM counters')
+    await db.executemany(
+        'INSERT INTO counters (scope, key, value) VALUES (?, ?, ?)',
+        [(scope, key, value) for (scope, key), value in counts.items()],
+    )
+
+
+async def diff(db: aiosqlite.Connection) -> list[tuple[str, str, int, int]]:
+    """Mos kelmagan sanoqlar: (scope, key, haqiqiy, saqlangan)."""
+    real = await real_counts(db)
+    stored = await stored_counts(db)
+    return [
+        (scope, key, real.get((scope, key), 0), stored.get((scope, key), 0))
+        for scope, key in sorted(real.keys() | stored.keys())
+        if real.get((scope, key), 0) != stored.get((scope, key), 0)
+    ]
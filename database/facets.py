@@ -0,0 +1,377 @@
+import hashlib
+import heapq
+from array import array
+from bisect import bisect_left, bisect_right
+from collections import Counter
+from collections.abc import Iterable, Mapping
+from functools import lru_cache
+from itertools import chain
+
+from database.price_index import _descending, _number
+from utils.translit import normalize_text, tokenize
+
+FACETS = ('region', 'transmission', 'condition', 'mileage')
+
+# (dan, gacha, yorliq) -- gacha kirmaydi
+MILEAGE_BUCKETS = (
+    (0, 50_000, '0–50 ming km'),
+    (50_000, 100_000, '50–100 ming km'),
+    (100_000, 200_000, '100–200 ming km'),
+    (200_000, None, '200 ming km+'),
+)
+
+# Erkin matndagi javoblarni ("1", "Avtomat", "автомат") bitta qiymatga keltirish:
+# (menyu raqami, so'z boshlari, (kalit, yorliq)). Raqam faqat butun javob
+# bo'lsa mos keladi: "10 yil ishlatilgan" yoki "1.5" 1-bandga tushmasin.
+_CANONICAL = {
+    'transmission': (
+        ('1', ('mek', 'meh', 'mk'), ('mexanika', 'Mexanika')),
+        ('2', ('avt', 'aut', 'akp'), ('avtomat', 'Avtomat')),
+    ),
+    'condition': (
+        ('1', ('yan', 'nov'), ('yangi', 'Yangi')),
+        ('2', ('ish', 'b u', 'bu'), ('ishlatilgan', 'Ishlatilgan')),
+    ),
+}
+
+# callback_data dagi qiymat kodi uzunligi (hex belgilar, 64 bayt chegarasiga sig'adi)
+FACET_CODE_BYTES = 5
+
+Filters = Mapping[str, list[str] | set[str] | tuple[str, ...]]
+# Har bir facet bo'yicha kalitlar (FACETS tartibida) -> e'lonlar soni
+Combos = Mapping[tuple[str | None, ...], int]
+FacetCounts = dict[str, list[tuple[str, str, int]]]
+
+
+def facet_value(facet: str, car: Mapping) -> tuple[str, str] | None:
+    """E'londagi facet qiymati: (kalit, yorliq) yoki None."""
+    if facet == 'mileage':
+        mileage = car.get('mileage')
+        if mileage is None or str(mileage).strip() == '':
+            return None
+        try:
+            mileage = int(mileage)
+        except (TypeError, ValueError):
+            return None
+        for low, high, label in MILEAGE_BUCKETS:
+            if mileage >= low and (high is None or mileage < high):
+                return str(low), label
+        return None
+
+    return _text_value(facet, str(car.get(facet) or '').strip())
+
+
+def facet_key(facet: str, value) -> str | None:
+    """Ustun qiymatining facet kaliti (SQLite'dagi car_facet() funksiyasi)."""
+    canonical = facet_value(facet, {facet: value})
+    return canonical[0] if canonical else None
+
+
+def facet_code(key: str) -> str:
+    """Qiymat kalitining qisqa xeshi: tugmalarda ro'yxatdagi o'rin emas, shu kod.
+
+    O'rin yuklash tartibiga bog'liq -- arxivlash, qayta ishga tushirish va
+    har xil workerlarda boshqa qiymatni ko'rsatib qolardi. Xesh esa kalitning
+    o'zidan chiqadi, hamma joyda bir xil.
+    """
+    return hashlib.blake2b(key.encode(), digest_size=FACET_CODE_BYTES).hexdigest()
+
+
+@lru_cache(maxsize=10_000)
+def _text_value(facet: str, raw: str) -> tuple[str, str] | None:
+    key = normalize_text(raw)
+    if not key:
+        return None
+    for number, prefixes, canonical in _CANONICAL.get(facet, ()):
+        if key == number or key.startswith(prefixes):
+            return canonical
+    return key, raw[:1].upper() + raw[1:]
+
+
+def _merge(existing: array | None, ids: list[int]) -> array:
+    # Yangi id lar odatda o'sish tartibida keladi: sorted() deyarli O(n)
+    if existing:
+        ids = set(ids).union(existing)
+    return array('q', sorted(ids))
+
+
+def count_facets(combos: Combos, filters: Filters, labels: Mapping[tuple[str, str], str]) -> tuple[int, FacetCounts]:
+    """Kalitlar kombinatsiyalari sanog'idan: (filtrga mos jami, har facet qiymati uchun (kalit, yorliq, sanoq)).
+
+    Bitta facet ichida OR, facetlar orasida AND. Qiymat sanog'i qolgan
+    facetlardagi tanlovlarni hisobga oladi, o'z facetidagisini esa yo'q:
+    tanlovni kengaytirish natijasi ko'rinadi.
+    """
+    selections = [set(filters.get(facet) or ()) for facet in FACETS]
+    tallies: list[Counter[str]] = [Counter() for _ in FACETS]
+    total = 0
+    for keys, count in combos.items():
+        failed = [
+            position for position, selected in enumerate(selections)
+            if selected and keys[position] not in selected
+        ]
+        if not failed:
+            total += count
+            for position, key in enumerate(keys):
+                if key is not None:
+                    tallies[position][key] += count
+        elif len(failed) == 1:
+            # Faqat bitta facetdan o'tmagan: o'sha facet qiymatini tanlasa mos keladi
+            key = keys[failed[0]]
+            if key is not None:
+                tallies[failed[0]][key] += count
+
+    result: FacetCounts = {}
+    for facet, selected, tally in zip(FACETS, selections, tallies):
+        values = [(key, labels[(facet, key)], count) for key, count in tally.items()]
+        values.extend((key, labels.get((facet, key), key), 0) for key in selected if key not in tally)
+        if facet == 'mileage':
+            # Probeg oraliqlari o'z tartibida, qolganlari sanoq bo'yicha
+            values.sort(key=lambda value: int(value[0]) if value[0].isdigit() else -1)
+        else:
+            values.sort(key=lambda value: (-value[2], value[1]))
+        result[facet] = values
+    return total, result
+
+
+class FacetIndex:
+    """Aktiv e'lonlar uchun xotiradagi facet indeksi (FACET_INDEX=1).
+
+    PriceIndex kabi siyrak: har bir facet qiymati va qidiruv tokeni uchun
+    o'suvchi id lar array('q') postingi, narx oralig'i (narx, id) bo'yicha
+    saralangan ustunlardan bisect bilan kesiladi. Xotira e'lonlar soniga
+    bog'liq, id lar qanchalik katta bo'lishidan emas. Kalitlar
+    kombinatsiyalari sanog'i add/remove da yangilanib boradi: model va
+    narxsiz so'rovda tugmalardagi sanoq e'lonlarni aylanmasdan olinadi.
+    """
+
+    def __init__(self):
+        self._ids = array('q')
+        self._prices = array('q')
+        self._price_ids = array('q')
+        self._price_of: dict[int, int] = {}
+        self._postings: dict[str, array] = {}
+        self._vocabulary: list[str] = []
+        self._texts: dict[int, str] = {}
+        self._values: dict[str, dict[str, array]] = {facet: {} for facet in FACETS}
+        self._keys_of: dict[int, tuple[str | None, ...]] = {}
+        self._combos: Counter[tuple[str | None, ...]] = Counter()
+        self._labels: dict[tuple[str, str], str] = {}
+        # facet -> {kod: kalit}
+        self._keys: dict[str, dict[str, str]] = {facet: {} for facet in FACETS}
+
+    def __len__(self) -> int:
+        return len(self._ids)
+
+    def load(self, cars: Iterable[tuple[int, Mapping]]) -> None:
+        """Boshlang'ich yuklash: massivlar bir marta saralanadi (add ning O(n) qo'yishisiz)."""
+        entries = []
+        postings: dict[str, list[int]] = {}
+        values: dict[tuple[str, str], list[int]] = {}
+        for car_id, car in cars:
+            if car_id in self._keys_of:
+                self.remove(car_id)
+            keys, tokens, price = self._register(car_id, car)
+            entries.append((price, car_id))
+            for token in tokens:
+                postings.setdefault(token, []).append(car_id)
+            for facet, key in zip(FACETS, keys):
+                if key is not None:
+                    values.setdefault((facet, key), []).append(car_id)
+
+        entries.extend(zip(self._prices, self._price_ids))
+        entries.sort()
+        self._prices = array('q', (price for price, _ in entries))
+        self._price_ids = array('q', (car_id for _, car_id in entries))
+        self._ids = array('q', sorted(car_id for _, car_id in entries))
+        for token, ids in postings.items():
+            self._postings[token] = _merge(self._postings.get(token), ids)
+        self._vocabulary = sorted(self._postings)
+        for (facet, key), ids in values.items():
+            self._values[facet][key] = _merge(self._values[facet].get(key), ids)
+
+    def _register(self, car_id: int, car: Mapping) -> tuple[tuple[str | None, ...], set[str], int]:
+        """Kalitlar, yorliqlar, matn va narxni yozadi; saralangan massivlarga tegmaydi."""
+        keys: list[str | None] = []
+        for facet in FACETS:
+            value = facet_value(facet, car)
+            if value is None:
+                keys.append(None)
+                continue
+            key, label = value
+            if (facet, key) not in self._labels:
+                self._labels[(facet, key)] = label
+                self._keys[facet][facet_code(key)] = key
+            keys.append(key)
+
+        combo = tuple(keys)
+        self._keys_of[car_id] = combo
+        self._combos[combo] += 1
+        # " token1 token2" ko'rinishida: prefiks tekshiruvi oddiy substring qidiruvi
+        tokens = tokenize(car.get('model')) + tokenize(car.get('color')) + tokenize(car.get('region'))
+        self._texts[car_id] = ''.join(f' {token}' for token in tokens)
+        price = self._price_of[car_id] = _number(car.get('price'))
+        return combo, set(tokens), price
+
+    def add(self, car_id: int, car: Mapping) -> None:
+        if car_id in self._keys_of:
+            self.remove(car_id)
+        keys, tokens, price = self._register(car_id, car)
+
+        position = self._position(price, car_id)
+        self._prices.insert(position, price)
+        self._price_ids.insert(position, car_id)
+        self._ids.insert(bisect_left(self._ids, car_id), car_id)
+        for token in tokens:
+            ids = self._postings.get(token)
+            if ids is None:
+                ids = self._postings[token] = array('q')
+                self._vocabulary.insert(bisect_left(self._vocabulary, token), token)
+            ids.insert(bisect_left(ids, car_id), car_id)
+        for facet, key in zip(FACETS, keys):
+            if key is not None:
+                ids = self._values[facet].setdefault(key, array('q'))
+                ids.insert(bisect_left(ids, car_id), car_id)
+
+    def remove(self, car_id: int) -> None:
+        keys = self._keys_of.pop(car_id, None)
+        if keys is None:
+            return
+        self._combos[keys] -= 1
+        if not self._combos[keys]:
+            del self._combos[keys]
+
+        position = self._position(self._price_of.pop(car_id), car_id)
+        del self._prices[position]
+        del self._price_ids[position]
+        del self._ids[bisect_left(self._ids, car_id)]
+        for token in set(self._texts.pop(car_id).split()):
+            ids = self._postings[token]
+            del ids[bisect_left(ids, car_id)]
+        for facet, key in zip(FACETS, keys):
+            if key is not None:
+                ids = self._values[facet][key]
+                del ids[bisect_left(ids, car_id)]
+
+    def search(
+        self,
+        model: str | None = None,
+        price_min: int = 0,
+        price_max: int = 999_999_999,
+        filters: Filters | None = None,
+        after_id: int | None = None,
+        limit: int = 10,
+    ) -> tuple[list[int], int | None]:
+        """Eng yangi id lardan boshlab bitta sahifa va keyingi kursor."""
+        base = self._base(model, price_min, price_max)
+        checks = self._checks(filters or {})
+        if base is not None:
+            ids = heapq.nlargest(
+                limit + 1,
+                (
+                    car_id for car_id in base
+                    if (after_id is None or car_id < after_id) and self._passes(car_id, checks)
+                ),
+            )
+            return ids[:limit], (ids[limit - 1] if len(ids) > limit else None)
+
+        if checks:
+            # Oqim: eng kam postingli tanlangan facet, qolganlari id bo'yicha tekshiriladi
+            position, selected = min(checks, key=lambda check: self._selection_size(*check))
+            checks = [check for check in checks if check[0] != position]
+            postings = [self._values[FACETS[position]].get(key, array('q')) for key in selected]
+            stream = heapq.merge(*(_descending(ids, after_id) for ids in postings), reverse=True)
+        else:
+            stream = _descending(self._ids, after_id)
+
+        ids = []
+        for car_id in stream:
+            if self._passes(car_id, checks):
+                ids.append(car_id)
+                if len(ids) > limit:
+                    break
+        return ids[:limit], (ids[limit - 1] if len(ids) > limit else None)
+
+    def count(
+        self,
+        model: str | None = None,
+        price_min: int = 0,
+        price_max: int = 999_999_999,
+        filters: Filters | None = None,
+    ) -> int:
+        base = self._base(model, price_min, price_max)
+        checks = self._checks(filters or {})
+        if base is None:
+            return sum(
+                count for keys, count in self._combos.items()
+                if all(keys[position] in selected for position, selected in checks)
+            )
+        if not checks:
+            return len(base)
+        return sum(1 for car_id in base if self._passes(car_id, checks))
+
+    def counts(
+        self,
+        model: str | None = None,
+        price_min: int = 0,
+        price_max: int = 999_999_999,
+        filters: Filters | None = None,
+    ) -> tuple[int, FacetCounts]:
+        """Filtrga mos jami va har bir facet qiymati uchun sanoq (count_facets)."""
+        base = self._base(model, price_min, price_max)
+        combos = self._combos if base is None else Counter(self._keys_of[car_id] for car_id in base)
+        return count_facets(combos, filters or {}, self._labels)
+
+    def key(self, facet: str, code: str) -> str | None:
+        """Tugmadagi kod bo'yicha kalit; noma'lum kod (eskirgan tugma) -- None."""
+        return self._keys[facet].get(code)
+
+    def _base(self, model: str | None, price_min: int, price_max: int) -> set[int] | None:
+        """Model (prefiks tokenlar) va narxga mos id lar; cheklov bo'lmasa None (barcha aktivlar)."""
+        query = tokenize(model)
+        low, high = bisect_left(self._prices, price_min), bisect_right(self._prices, price_max)
+        priced = low > 0 or high < len(self._prices)
+        if not query:
+            return set(self._price_ids[low:high]) if priced else None
+
+        # Eng kam postingli token yoki narx kesimi oqim bo'ladi, qolgani id bo'yicha tekshiriladi
+        groups = {prefix: self._prefix_postings(prefix) for prefix in query}
+        driver = min(groups, key=lambda prefix: sum(len(ids) for ids in groups[prefix]))
+        if priced and high - low < sum(len(ids) for ids in groups[driver]):
+            stream, rest = self._price_ids[low:high], query
+        else:
+            stream, rest = chain.from_iterable(groups[driver]), [prefix for prefix in query if prefix != driver]
+            if not priced and not rest:
+                return set(stream)
+        texts, price_of = self._texts, self._price_of
+        return {
+            car_id for car_id in stream
+            if price_min <= price_of[car_id] <= price_max
+            and all(f' {prefix}' in texts[car_id] for prefix in rest)
+        }
+
+    @staticmethod
+    def _checks(filters: Filters) -> list[tuple[int, set[str]]]:
+        return [
+            (FACETS.index(facet), set(keys))
+            for facet, keys in filters.items()
+            if keys and facet in FACETS
+        ]
+
+    def _passes(self, car_id: int, checks: list[tuple[int, set[str]]]) -> bool:
+        keys = self._keys_of[car_id]
+        return all(keys[position] in selected for position, selected in checks)
+
+    def _selection_size(self, position: int, selected: set[str]) -> int:
+        values = self._values[FACETS[position]]
+        return sum(len(values.get(key, ())) for key in selected)
+
+    def _prefix_postings(self, prefix: str) -> list[array]:
+        start = bisect_left(self._vocabulary, prefix)
+        end = bisect_right(self._vocabulary, prefix + '\uffff')
+        return [self._postings[token] for token in self._vocabulary[start:end] if self._postings[token]]
+
+    def _position(self, price: int, car_id: int) -> int:
+        low = bisect_left(self._prices, price)
+        high = bisect_right(self._prices, price, lo=low)
+        return bisect_left(self._price_ids, car_id, lo=low, hi=high)
@@ -0,0 +1,254 @@
+import asyncio
+import json
+import logging
+import time
+from collections import OrderedDict
+from typing import Any
+
+import aiosqlite
+from aiogram.fsm.state import State
+from aiogram.fsm.storage.base import BaseStorage, StateType, StorageKey
+from aiogram.fsm.storage.memory import MemoryStorage
+
+from config import FSM_DB_FILE, FSM_SESSION_TTL_HOURS, FSM_STORAGE
+from database.manager import CONNECTION_PRAGMAS
+
+logger = logging.getLogger(__name__)
+
+# Har bir FSM kaliti (bot:chat:user:thread:destiny) uchun bitta qator.
+# updated_at -- oxirgi yozuvning unix vaqti (jarayonlar orasida umumiy).
+FSM_TABLE = '''
+CREATE TABLE IF NOT EXISTS fsm_sessions (
+    key TEXT PRIMARY KEY,
+    state TEXT,
+    data TEXT NOT NULL DEFAULT '{}',
+    updated_at REAL NOT NULL
+) WITHOUT ROWID
+'''
+FSM_INDEX = 'CREATE INDEX IF NOT EXISTS idx_fsm_sessions_updated ON fsm_sessions (updated_at)'
+
+# Write-behind: o'zgargan sessiyalar shu oraliqda bitta tranzaksiyada yoziladi.
+# Jarayon kutilmaganda o'lsa, oxirgi FLUSH_INTERVAL soniyadagi o'zgarishlar yo'qoladi.
+FLUSH_INTERVAL = 1.0
+# Issiq qatlam: o'zgarmagan yozuv HOT_CACHE_TTL soniyadan keyin jadvaldan qayta o'qiladi
+HOT_CACHE_SIZE = 50_000
+HOT_CACHE_TTL = 30.0
+# Eskirgan sessiyalarni tozalash oralig'i (soniya)
+EXPIRE_INTERVAL = 600.0
+
+_EMPTY = '{}'
+
+
+class _Session:
+    __slots__ = ('state', 'data', 'updated_at', 'loaded_at')
+
+    def __init__(self, state: str | None, data: str, updated_at: float, loaded_at: float):
+        self.state = state
+        # JSON ko'rinishida: get_data har safar mustaqil nusxa qaytaradi,
+        # serializatsiya xatosi esa handler ichida chiqadi.
+        self.data = data
+        self.updated_at = updated_at
+        self.loaded_at = loaded_at
+
+
+def storage_key(key: StorageKey) -> str:
+    return f'{key.bot_id}:{key.chat_id}:{key.user_id}:{key.thread_id or ""}:{key.destiny}'
+
+
+class SQLiteStorage(BaseStorage):
+    """FSM holati va ma'lumotlari uchun SQLite'dagi fsm_sessions jadvali.
+
+    O'qish issiq (xotiradagi) qatlamdan, yozuvlar esa avval xotiraga
+    tushadi va fon vazifasi ularni FLUSH_INTERVAL da bir marta guruhlab
+    saqlaydi; close() qolganini yozib tugatadi. ttl soniya davomida
+    yozilmagan sessiya eskirgan hisoblanadi va jadvaldan o'chiriladi.
+
+    Bir nechta jarayon bitta faylni ishlatishi mumkin: eskiroq yozuv
+    yangisini bosib ketmaydi (updated_at), o'zgarmagan issiq yozuvlar
+    HOT_CACHE_TTL dan keyin qayta o'qiladi. Bitta chat bir vaqtda bitta
+    jarayonda ishlansa (chat bo'yicha marshrutlash), holat doim aniq.
+    """
+
+    def __init__(self, db_path: str, ttl: float = 24 * 3600, clock=time.time):
+        self.db_path = db_path
+        self.ttl = ttl
+        self._clock = clock
+        self._db: aiosqlite.Connection | None = None
+        self._sessions: OrderedDict[str, _Session] = OrderedDict()
+        self._dirty: set[str] = set()
+        self._flush_task: asyncio.Task | None = None
+        self._last_expire = 0.0
+        self.flushes = 0
+        self.written = 0
+
+    async def initialize(self) -> None:
+        self._db = await aiosqlite.connect(self.db_path)
+        for pragma in CONNECTION_PRAGMAS:
+            await self._db.execute(pragma)
+        await self._db.execute('PRAGMA journal_mode = WAL')
+        await self._db.execute(FSM_TABLE)
+        await self._db.execute(FSM_INDEX)
+        await self._db.commit()
+        await self._expire()
+        self._flush_task = asyncio.create_task(self._flush_loop())
+
+    async def close(self) -> None:
+        if self._flush_task is not None:
+            self._flush_task.cancel()
+            await asyncio.gather(self._flush_task, return_exceptions=True)
+            self._flush_task = None
+        if self._db is not None:
+            await self.flush()
+            await self._db.close()
+            self._db = None
+
+    async def set_state(self, key: StorageKey, state: StateType = None) -> None:
+        session = await self._session(storage_key(key))
+        session.state = state.state if isinstance(state, State) else state
+        self._touch(storage_key(key), session)
+
+    async def get_state(self, key: StorageKey) -> str | None:
+        return (await self._session(storage_key(key))).state
+
+    async def set_data(self, key: StorageKey, data: dict[str, Any]) -> None:
+        payload = json.dumps(data, ensure_ascii=False)
+        session = await self._session(storage_key(key))
+        session.data = payload
+        self._touch(storage_key(key), session)
+
+    async def get_data(self, key: StorageKey) -> dict[str, Any]:
+        return json.loads((await self._session(storage_key(key))).data)
+
+    async def flush(self) -> None:
+        """O'zgargan sessiyalarni bitta tranzaksiyada saqlaydi."""
+        if not self._dirty or self._db is None:
+            return
+        keys, self._dirty = self._dirty, set()
+
+        upserts = []
+        deletes = []
+        for key in keys:
+            session = self._sessions[key]
+            if session.state is None and session.data == _EMPTY:
+                deletes.append((key, session.updated_at))
+            else:
+                upserts.append((key, session.state, session.data, session.updated_at))
+
+        try:
+            # Boshqa jarayon yangiroq yozgan bo'lsa, uning qatori saqlanib qoladi
+            await self._db.executemany(
+                '''
+                INSERT INTO fsm_sessions (key, state, data, updated_at) VALUES (?, ?, ?, ?)
+                ON CONFLICT (key) DO UPDATE SET
+                    state = excluded.state,
+                    data = excluded.data,
+                    updated_at = excluded.updated_at
+                WHERE excluded.updated_at >= fsm_sessions.updated_at
+                ''',
+                upserts,
+            )
+            await self._db.executemany(
+                'DELETE FROM fsm_sessions WHERE key = ? AND updated_at <= ?',
+                deletes,
+            )
+            await self._db.commit()
+        except Exception:
+            await self._db.rollback()
+            self._dirty |= keys
+            raise
+
+        self.flushes += 1
+        self.written += len(keys)
+        self._evict()
+
+    def stats(self) -> dict:
+        return {
+            'sessions': len(self._sessions),
+            'dirty': len(self._dirty),
+            'flushes': self.flushes,
+            'written': self.written,
+        }
+
+    async def _session(self, key: str) -> _Session:
+        if self._db is None:
+            raise RuntimeError('SQLiteStorage.initialize() chaqirilmagan')
+
+        now = self._clock()
+        session = self._sessions.get(key)
+        if session is not None:
+            if session.updated_at + self.ttl <= now:
+                # Eskirgan sessiya: toza holatdan boshlanadi
+                session.state, session.data = None, _EMPTY
+                session.loaded_at = now
+            elif key not in self._dirty and session.loaded_at + HOT_CACHE_TTL <= now:
+                session = None
+            if session is not None:
+                self._sessions.move_to_end(key)
+                return session
+
+        async with self._db.execute(
+            'SELECT state, data, updated_at FROM fsm_sessions WHERE key = ?', (key,)
+        ) as cursor:
+            row = await cursor.fetchone()
+
+        # Kutish paytida boshqa coroutine shu kalitni yozgan bo'lishi mumkin
+        existing = self._sessions.get(key)
+        if existing is not None and key in self._dirty:
+            return existing
+
+        if row is None or row[2] + self.ttl <= now:
+            session = _Session(None, _EMPTY, 0.0, now)
+        else:
+            session = _Session(row[0], row[1], row[2], now)
+        self._sessions[key] = session
+        self._sessions.move_to_end(key)
+        self._evict()
+        return session
+
+    def _touch(self, key: str, session: _Session) -> None:
+        # Soat orqaga ketsa ham yozuv tartibi buzilmasin
+        session.updated_at = max(self._clock(), session.updated_at)
+        self._dirty.add(key)
+
+    def _evict(self) -> None:
+        # Saqlanmagan sessiyalar flush'gacha xotirada qoladi
+        excess = len(self._sessions) - HOT_CACHE_SIZE
+        if excess <= 0:
+            return
+        for key in list(self._sessions):
+            if excess <= 0:
+                break
+            if key not in self._dirty:
+                del self._sessions[key]
+                excess -= 1
+
+    async def _expire(self) -> None:
+        now = self._clock()
+        self._last_expire = now
+        await self._db.execute('DELETE FROM fsm_sessions WHERE updated_at <= ?', (now - self.ttl,))
+        await self._db.commit()
+        stale = [
+            key for key, session in self._sessions.items()
+            if key not in self._dirty and session.updated_at + self.ttl <= now
+        ]
+        for key in stale:
+            del self._sessions[key]
+
+    async def _flush_loop(self) -> None:
+        while True:
+            await asyncio.sleep(FLUSH_INTERVAL)
+            try:
+                await self.flush()
+                if self._clock() - self._last_expire >= EXPIRE_INTERVAL:
+                    await self._expire()
+            except Exception as e:
+                logger.error(f'FSM sessiyalarini saqlashda xato: {e}')
+
+
+def create_fsm_storage(kind: str = FSM_STORAGE) -> BaseStorage:
+    """FSM_STORAGE=sqlite (standart) yoki memory (aiogram MemoryStorage)."""
+    if kind == 'memory':
+        return MemoryStorage()
+    if kind == 'sqlite':
+        return SQLiteStorage(FSM_DB_FILE, ttl=FSM_SESSION_TTL_HOURS * 3600)
+    raise ValueError(f"Noma'lum FSM_STORAGE: {kind}")
@@ -1,93 +1,288 @@
+import asyncio
 import aiosqlite
-import json
+import logging
+import operator
+from bisect import bisect_right
+from contextlib import asynccontextmanager
+from typing import Any, AsyncIterator, Awaitable, Callable
 
-from config import DB_FILE
+from config import DB_ENGINE, DB_FILE, DB_READERS, FACET_INDEX, SEARCH_INDEX
+from database import counters
+from database.base import CarStorage, ChangeListener
+from database.facets import (
+    FACETS, FacetCounts, FacetIndex, Filters, count_facets, facet_code, facet_key, facet_value,
+)
+from database.migrations import run_migrations
+from database.price_index import PriceIndex
+from database.records import CAR_COLUMNS, SAVED_SEARCH_COLUMNS, Car, normalize_photos
+from database.search_cache import SearchCache, SearchIds, SearchKey, search_key
+from utils.cache import MISSING, TTLCache
+from utils.translit import fts_query, normalize_text
+
+# Har bir ulanish ochilganda qo'llanadigan sozlamalar.
+# journal_mode=WAL faylda saqlanadi, qolganlari ulanishga tegishli.
+CONNECTION_PRAGMAS = (
+    'PRAGMA synchronous = NORMAL',
+    'PRAGMA cache_size = -16000',
+    'PRAGMA mmap_size = 268435456',
+    'PRAGMA temp_store = MEMORY',
+    'PRAGMA busy_timeout = 5000',
+)
+
+# sqlite3 ning tayyorlangan (prepared) so'rovlar keshi hajmi
+STATEMENT_CACHE_SIZE = 256
+
+# Group commit: yozuvlar navbatga tushadi va bitta tranzaksiyada
+# (WRITE_BATCH_SIZE tagacha yoki WRITE_BATCH_WINDOW soniya ichida) saqlanadi.
+WRITE_QUEUE_SIZE = 1000
+WRITE_BATCH_SIZE = 100
+WRITE_BATCH_WINDOW = 0.002
+
+# Arxivga ko'chirishda aktiv (eskirgan) e'lonlar 'expired' holatini oladi
+ARCHIVE_COLUMNS = ', '.join(CAR_COLUMNS)
+ARCHIVE_SELECT = ', '.join(
+    "CASE status WHEN 'active' THEN 'expired' ELSE status END" if column == 'status' else column
+    for column in CAR_COLUMNS
+)
+
+# Ro'yxatdan o'tgan userlar keshi (topilmagan userlar ham keshlanadi)
+USER_CACHE_SIZE = 50_000
+USER_CACHE_TTL = 600.0
+
+# Qidiruv natijalari keshi: har bir so'rov uchun SEARCH_CACHE_MAX_IDS tagacha id
+SEARCH_CACHE_SIZE = 2_000
+SEARCH_CACHE_TTL = 300.0
+SEARCH_CACHE_MAX_IDS = 500
+
+# Xotiradagi indekslar (facet, narx indeksi, qidiruv keshi) uchun kerakli ustunlar
+INDEX_COLUMNS = ('model', 'color', 'region', 'price', 'condition', 'transmission', 'mileage')
+
+WriteOp = Callable[[aiosqlite.Connection], Awaitable[Any]]
+
+logger = logging.getLogger(__name__)
 
 
 class DatabaseManager:
-    def __init__(self, db_path: str):
+    def __init__(self, db_path: str, readers: int = 4, search_index: bool = False, facet_index: bool = False):
         self.db_path = db_path
+        self.readers = max(1, readers)
+        self._writer: aiosqlite.Connection | None = None
+        self._write_queue: asyncio.Queue[tuple[WriteOp, asyncio.Future] | None] | None = None
+        self._writer_task: asyncio.Task | None = None
+        self._reader_pool: asyncio.Queue[aiosqlite.Connection] | None = None
+        self._reader_connections: list[aiosqlite.Connection] = []
+        self.user_cache = TTLCache(maxsize=USER_CACHE_SIZE, ttl=USER_CACHE_TTL)
+        self._user_writes = 0
+        self.search_cache = SearchCache(maxsize=SEARCH_CACHE_SIZE, ttl=SEARCH_CACHE_TTL)
+        # FACET_INDEX: filtrlar va sanoqlar bazaga emas, xotiradagi indeksga boradi
+        self.facets = FacetIndex() if facet_index else None
+        # Indekssiz: facet_counts ko'rsatgan qiymatlar, tugma kodi -> kalit
+        self._facet_keys: dict[str, dict[str, str]] = {facet: {} for facet in FACETS}
+        # SEARCH_INDEX: search_cars_page bazaga emas, xotiradagi indeksga boradi
+        self.price_index = PriceIndex() if search_index else None
+        # Bir nechta worker jarayonida: o'zgarishlar boshqa jarayonlarning
+        # indekslariga apply_change() orqali yetkaziladi (services.workers)
+        self.on_change: ChangeListener | None = None
 
     async def initialize(self) -> None:
-        async with aiosqlite.connect(self.db_path) as db:
-            await db.execute(
-                '''
-                CREATE TABLE IF NOT EXISTS users (
-                    user_id TEXT PRIMARY KEY,
-                    phone TEXT,
-                    username TEXT
-                )
-                '''
-            )
-            await db.execute(
-                '''
-                CREATE TABLE IF NOT EXISTS cars (
-                    id INTEGER PRIMARY KEY AUTOINCREMENT,
-                    user_id TEXT,
-                    model TEXT,
-                    price INTEGER,
-                    condition TEXT,
-                    transmission TEXT,
-                    color TEXT,
-                    mileage INTEGER,
-                    region TEXT,
-                    photo TEXT,
-                    phone TEXT,
-                    username TEXT,
-                    photos TEXT,
-                    status TEXT DEFAULT 'active',
-                    channel_message_id INTEGER,
-                    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                    sold_at TIMESTAMP
-                )
-                '''
-            )
+        self._writer = await self._open()
+        await self._prepare(self._writer)
+        await self._load_indexes()
+
+        self._write_queue = asyncio.Queue(maxsize=WRITE_QUEUE_SIZE)
+        self._writer_task = asyncio.create_task(self._writer_loop())
+
+        self._reader_pool = asyncio.Queue()
+        for _ in range(self.readers):
+            reader = await self._open()
+            await reader.execute('PRAGMA query_only = ON')
+            self._reader_connections.append(reader)
+            self._reader_pool.put_nowait(reader)
 
-            await self._ensure_column(db, 'cars', 'photos', 'TEXT')
-            await self._ensure_column(db, 'cars', 'status', "TEXT DEFAULT 'active'")
-            await self._ensure_column(db, 'cars', 'channel_message_id', 'INTEGER')
-            await self._ensure_column(db, 'cars', 'sold_at', 'TIMESTAMP')
+    async def close(self) -> None:
+        for reader in self._reader_connections:
+            await reader.close()
+        self._reader_connections.clear()
+        self._reader_pool = None
 
+        if self._writer_task is not None:
+            # Navbatdagi barcha yozuvlar saqlanib bo'lgach writer to'xtaydi
+            await self._write_queue.put(None)
+            await self._writer_task
+            self._writer_task = None
+            self._write_queue = None
+
+        if self._writer is not None:
+            await self._writer.close()
+            self._writer = None
+
+    async def migrate(self) -> int:
+        """Faqat sxemani yangilaydi: workerlar ishga tushishidan oldin supervisor chaqiradi."""
+        db = await self._open()
+        try:
+            return await self._prepare(db)
+        finally:
+            await db.close()
+
+    async def _prepare(self, db: aiosqlite.Connection) -> int:
+        # Faqat yangi (bo'sh) bazada kuchga kiradi; arxivdan keyin bo'shagan
+        # sahifalarni incremental_vacuum() bilan qaytarish imkonini beradi.
+        await db.execute('PRAGMA auto_vacuum = INCREMENTAL')
+        await db.execute('PRAGMA journal_mode = WAL')
+        return await run_migrations(db)
+
+    async def _load_indexes(self) -> None:
+        if self.facets is None and self.price_index is None:
+            return
+        async with self._writer.execute(
+            f"SELECT id, {', '.join(INDEX_COLUMNS)} FROM cars WHERE status = 'active'"
+        ) as cursor:
+            columns = [column[0] for column in cursor.description]
+            active = [(row[0], dict(zip(columns, row))) async for row in cursor]
+
+        if self.facets is not None:
+            self.facets.load(active)
+        if self.price_index is not None:
+            self.price_index.load(active)
+
+    async def _open(self) -> aiosqlite.Connection:
+        db = await aiosqlite.connect(self.db_path, cached_statements=STATEMENT_CACHE_SIZE)
+        await db.create_function('car_norm', 1, normalize_text, deterministic=True)
+        await db.create_function('car_facet', 2, facet_key, deterministic=True)
+        for pragma in CONNECTION_PRAGMAS:
+            await db.execute(pragma)
+        return db
+
+    @asynccontextmanager
+    async def _read(self) -> AsyncIterator[aiosqlite.Connection]:
+        if self._reader_pool is None:
+            raise RuntimeError('DatabaseManager.initialize() chaqirilmagan')
+        db = await self._reader_pool.get()
+        try:
+            yield db
+        finally:
+            self._reader_pool.put_nowait(db)
+
+    async def _submit(self, op: WriteOp) -> Any:
+        """Yozuvni navbatga qo'yadi va u commit bo'lgach natijasini qaytaradi.
+
+        Navbat to'lgan bo'lsa, joy bo'shaguncha kutiladi (back-pressure).
+        """
+        if self._write_queue is None:
+            raise RuntimeError('DatabaseManager.initialize() chaqirilmagan')
+        future = asyncio.get_running_loop().create_future()
+        await self._write_queue.put((op, future))
+        return await future
+
+    async def _writer_loop(self) -> None:
+        queue = self._write_queue
+
+        while True:
+            item = await queue.get()
+            if item is None:
+                break
+
+            batch = [item]
+            stopping = self._drain_writes(batch)
+            if not stopping and len(batch) < WRITE_BATCH_SIZE:
+                await asyncio.sleep(WRITE_BATCH_WINDOW)
+                stopping = self._drain_writes(batch)
+
+            await self._commit_batch(batch)
+            if stopping:
+                break
+
+    def _drain_writes(self, batch: list[tuple[WriteOp, asyncio.Future]]) -> bool:
+        """Navbatdagi tayyor yozuvlarni guruhga qo'shadi; to'xtash belgisi kelsa True."""
+        while len(batch) < WRITE_BATCH_SIZE and not self._write_queue.empty():
+            item = self._write_queue.get_nowait()
+            if item is None:
+                return True
+            batch.append(item)
+        return False
+
+    async def _commit_batch(self, batch: list[tuple[WriteOp, asyncio.Future]]) -> None:
+        db = self._writer
+        results: list[tuple[asyncio.Future, Any, BaseException | None]] = []
+
+        try:
+            await db.execute('BEGIN')
+            for op, future in batch:
+                # Har bir yozuv o'z savepoint'ida: bittasining xatosi
+                # butun guruhni bekor qilmaydi.
+                await db.execute('SAVEPOINT write_op')
+                try:
+                    result = await op(db)
+                except Exception as e:
+                    await db.execute('ROLLBACK TO write_op')
+                    results.append((future, None, e))
+                else:
+                    results.append((future, result, None))
+                await db.execute('RELEASE write_op')
             await db.commit()
+        except Exception as e:
+            logger.error(f'Yozuvlar guruhini saqlashda xatolik: {e}', exc_info=True)
+            if db.in_transaction:
+                await db.rollback()
+            results = [(future, None, e) for _, future in batch]
 
-    async def _ensure_column(self, db: aiosqlite.Connection, table: str, column: str, ddl: str) -> None:
-        async with db.execute(f"PRAGMA table_info({table})") as cursor:
-            rows = await cursor.fetchall()
-        existing = {row[1] for row in rows}
-        if column not in existing:
-            await db.execute(f"ALTER TABLE {table} ADD COLUMN {column} {ddl}")
+        for future, result, error in results:
+            if future.done():
+                continue
+            if error is not None:
+                future.set_exception(error)
+            else:
+                future.set_result(result)
 
     async def add_user(self, user_id: str, phone: str, username: str | None) -> None:
-        async with aiosqlite.connect(self.db_path) as db:
+        async def op(db: aiosqlite.Connection) -> None:
+            async with db.execute('SELECT 1 FROM users WHERE user_id = ?', (user_id,)) as cursor:
+                exists = await cursor.fetchone() is not None
+            if not exists:
+                await counters.bump(db, 'total', 'users')
+
             await db.execute(
                 'INSERT OR REPLACE INTO users (user_id, phone, username) VALUES (?, ?, ?)',
                 (user_id, phone, username),
             )
-            await db.commit()
+
+        self._user_writes += 1
+        self.user_cache.invalidate(user_id)
+        await self._submit(op)
+        self._user_writes += 1
+        self.user_cache.set(user_id, {'user_id': user_id, 'phone': phone, 'username': username})
 
     async def get_user(self, user_id: str) -> dict | None:
-        async with aiosqlite.connect(self.db_path) as db:
+        cached = self.user_cache.get(user_id)
+        if cached is not MISSING:
+            return dict(cached) if cached else None
+
+        # O'qish davomida add_user ishlagan bo'lsa, eskirgan javob keshga yozilmaydi
+        writes_before = self._user_writes
+        async with self._read() as db:
             async with db.execute(
                 'SELECT user_id, phone, username FROM users WHERE user_id = ?',
                 (user_id,),
             ) as cursor:
                 row = await cursor.fetchone()
-                if not row:
-                    return None
-                return {'user_id': row[0], 'phone': row[1], 'username': row[2]}
+
+        user = {'user_id': row[0], 'phone': row[1], 'username': row[2]} if row else None
+        if writes_before == self._user_writes:
+            self.user_cache.set(user_id, user)
+        return dict(user) if user else None
 
     async def add_car(self, car_data: dict) -> int:
-        photos = car_data.get('photos') or []
-        photo = car_data.get('photo') or (photos[0] if photos else None)
+        photos = normalize_photos(car_data)
+        photo = photos[0][0] if photos else None
 
-        async with aiosqlite.connect(self.db_path) as db:
+        async def op(db: aiosqlite.Connection) -> int:
             cursor = await db.execute(
                 '''
                 INSERT INTO cars (
                     user_id, model, price, condition, transmission,
                     color, mileage, region, photo, phone, username,
-                    photos, status
-                ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+                    status
+                ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
                 ''',
                 (
                     car_data.get('user_id'),
@@ -101,35 +296,56 @@ class DatabaseManager:
                     photo,
                     car_data.get('phone'),
                     car_data.get('username'),
-                    json.dumps(photos, ensure_ascii=False),
                     'active',
                 ),
             )
-            await db.commit()
-            return int(cursor.lastrowid)
+            car_id = int(cursor.lastrowid)
+            await db.executemany(
+                '''
+                INSERT INTO car_photos (car_id, position, file_id, file_unique_id)
+                VALUES (?, ?, ?, ?)
+                ''',
+                [
+                    (car_id, position, file_id, file_unique_id)
+                    for position, (file_id, file_unique_id) in enumerate(photos)
+                ],
+            )
+            await counters.bump(db, 'total', 'cars')
+            await counters.bump(db, 'total', 'active')
+            await counters.bump(db, 'day', counters.today_key())
+            await counters.bump(db, 'region', car_data.get('region'))
+            return car_id
+
+        car_id = await self._submit(op)
+        self._car_added(car_id, car_data)
+        self._changed('car_added', {'id': car_id, **{column: car_data.get(column) for column in INDEX_COLUMNS}})
+        return car_id
 
     async def set_channel_message_id(self, car_id: int, message_id: int | None) -> None:
-        async with aiosqlite.connect(self.db_path) as db:
+        async def op(db: aiosqlite.Connection) -> None:
             await db.execute(
                 'UPDATE cars SET channel_message_id = ? WHERE id = ?',
                 (message_id, car_id),
             )
-            await db.commit()
 
-    async def get_car(self, car_id: int) -> dict | None:
-        async with aiosqlite.connect(self.db_path) as db:
+        await self._submit(op)
+
+    async def get_car(self, car_id: int) -> Car | None:
+        async with self._read() as db:
             async with db.execute(
                 'SELECT * FROM cars WHERE id = ?',
                 (car_id,),
             ) as cursor:
                 columns = [column[0] for column in cursor.description]
                 row = await cursor.fetchone()
-                if not row:
-                    return None
-                return self._row_to_dict(columns, row)
+            if not row:
+                return None
+            car = Car.from_row(columns, row)
+            await self._attach_photos(db, [car])
+            return car
 
-    async def mark_car_sold(self, car_id: int, owner_user_id: str) -> dict | None:
-        async with aiosqlite.connect(self.db_path) as db:
+    async def mark_car_sold(self, car_id: int, owner_user_id: str) -> Car | None:
+        async def op(db: aiosqlite.Connection) -> Car | None:
             async with db.execute(
                 "SELECT * FROM cars WHERE id = ? AND user_id = ? AND status != 'sold'",
                 (car_id, owner_user_id),
@@ -143,95 +359,509 @@ class DatabaseManager:
                 "UPDATE cars SET status = 'sold', sold_at = CURRENT_TIMESTAMP WHERE id = ?",
                 (car_id,),
             )
-            await db.commit()
-            return self._row_to_dict(columns, row, override={'status': 'sold'})
+            await counters.bump(db, 'total', 'active', -1)
+            await counters.bump(db, 'total', 'sold')
+            return Car.from_row(columns, row).replace(status='sold')
+
+        car = await self._submit(op)
+        if car is not None:
+            self._car_removed(car_id, car)
+            self._changed('car_removed', {'id': car_id, **{column: car.get(column) for column in INDEX_COLUMNS}})
+        return car
 
     async def search_cars(
         self,
         model: str | None = None,
         price_min: int = 0,
         price_max: int = 999_999_999,
-    ) -> list[dict]:
-        async with aiosqlite.connect(self.db_path) as db:
-            query = (
-                "SELECT * FROM cars "
-                "WHERE status = 'active' AND price >= ? AND price <= ?"
-            )
-            params: list = [price_min, price_max]
+    ) -> list[Car]:
+        match = fts_query(model)
+        async with self._read() as db:
+            if match:
+                # Tartib search_cars_page bilan bir xil: eng yangisi birinchi
+                query = (
+                    "SELECT cars.* FROM cars_fts JOIN cars ON cars.id = cars_fts.rowid "
+                    "WHERE cars_fts MATCH ? AND cars.status = 'active' "
+                    "AND cars.price >= ? AND cars.price <= ? "
+                    "ORDER BY cars_fts.rowid DESC"
+                )
+                params: list = [match, price_min, price_max]
+            else:
+                query = (
+                    "SELECT * FROM cars "
+                    "WHERE status = 'active' AND price >= ? AND price <= ? "
+                    "ORDER BY id DESC"
+                )
+                params = [price_min, price_max]
+
+            async with db.execute(query, params) as cursor:
+                columns = [column[0] for column in cursor.description]
+                rows = await cursor.fetchall()
+            cars = [Car.from_row(columns, row) for row in rows]
+            await self._attach_photos(db, cars)
+            return cars
+
+    async def search_cars_page(
+        self,
+        model: str | None = None,
+        price_min: int = 0,
+        price_max: int = 999_999_999,
+        after_id: int | None = None,
+        limit: int = 10,
+    ) -> tuple[list[Car], int | None]:
+        """Bitta sahifa natija va keyingi sahifa kursorini (oxirgi id) qaytaradi.
 
-            if model:
-                query += ' AND model LIKE ?'
-                params.append(f'%{model}%')
+        Sahifalar id bo'yicha kamayish tartibida (eng yangisi birinchi) keladi,
+        chunki keyset kursor barqaror tartibni talab qiladi: bm25 qiymati
+        yangi e'lonlar qo'shilganda o'zgaradi, shuning uchun relevance
+        bo'yicha saralash ishlatilmaydi. Mos id lar
+        ro'yxati search_cache da (yoki SEARCH_INDEX da price_index da) topiladi,
+        sahifa qatorlari id bo'yicha olinadi.
+        """
+        if self.price_index is not None:
+            ids, next_cursor = self.price_index.search(model, price_min, price_max, after_id, limit)
+            return await self._cars_by_ids(ids), next_cursor
 
-            query += ' ORDER BY id DESC'
+        key = search_key(model, price_min, price_max)
+        ids, complete = await self.search_cache.get_or_load(key, lambda: self._search_ids(key))
 
-            async with db.execute(query, params) as cursor:
+        position = 0 if after_id is None else bisect_right(ids, -after_id, key=operator.neg)
+        page_ids = ids[position:position + limit + 1]
+        if len(page_ids) <= limit and not complete:
+            # Keshdagi ro'yxat kesilgan: davomini to'g'ridan-to'g'ri bazadan olamiz
+            return await self._search_page(key, after_id, limit)
+
+        cars = await self._cars_by_ids(page_ids[:limit])
+        next_cursor = page_ids[limit - 1] if len(page_ids) > limit else None
+        return cars, next_cursor
+
+    async def search_cars_faceted(
+        self,
+        model: str | None = None,
+        price_min: int = 0,
+        price_max: int = 999_999_999,
+        filters: Filters | None = None,
+        after_id: int | None = None,
+        limit: int = 10,
+    ) -> tuple[list[Car], int | None]:
+        """search_cars_page + hudud/uzatma/holat/probeg filtrlari (FACET_INDEX da facets orqali)."""
+        if self.facets is not None:
+            ids, next_cursor = self.facets.search(model, price_min, price_max, filters, after_id, limit)
+            return await self._cars_by_ids(ids), next_cursor
+
+        source, params = self._active_source(model, price_min, price_max)
+        for facet, keys in (filters or {}).items():
+            if keys and facet in FACETS:
+                source += f" AND car_facet('{facet}', cars.{facet}) IN ({', '.join('?' * len(keys))})"
+                params.extend(keys)
+        if after_id is not None:
+            source += ' AND cars.id < ?'
+            params.append(after_id)
+
+        async with self._read() as db:
+            async with db.execute(
+                f'SELECT cars.id {source} ORDER BY cars.id DESC LIMIT ?',
+                (*params, limit + 1),
+            ) as cursor:
+                ids = [row[0] for row in await cursor.fetchall()]
+        next_cursor = ids[limit - 1] if len(ids) > limit else None
+        return await self._cars_by_ids(ids[:limit]), next_cursor
+
+    async def count_cars(
+        self,
+        model: str | None = None,
+        price_min: int = 0,
+        price_max: int = 999_999_999,
+    ) -> int:
+        """Qidiruvga mos aktiv e'lonlar soni."""
+        if self.facets is not None:
+            return self.facets.count(model, price_min, price_max)
+
+        source, params = self._active_source(model, price_min, price_max)
+        async with self._read() as db:
+            return await self._scalar(db, f'SELECT COUNT(*) {source}', tuple(params))
+
+    async def facet_counts(
+        self,
+        model: str | None = None,
+        price_min: int = 0,
+        price_max: int = 999_999_999,
+        filters: Filters | None = None,
+    ) -> tuple[int, FacetCounts]:
+        """Filtrlangan natijalar soni va har bir facet qiymati uchun sanoq.
+
+        Indekssiz: mos e'lonlar facet kalitlari kombinatsiyasi bo'yicha bitta
+        GROUP BY bilan sanaladi, qolgani count_facets da (FacetIndex bilan bir xil).
+        """
+        if self.facets is not None:
+            return self.facets.counts(model, price_min, price_max, filters)
+
+        source, params = self._active_source(model, price_min, price_max)
+        keys = ', '.join(f"car_facet('{facet}', cars.{facet})" for facet in FACETS)
+        samples = ', '.join(f'MIN(cars.{facet})' for facet in FACETS)
+        async with self._read() as db:
+            async with db.execute(
+                f'SELECT {keys}, COUNT(*), {samples} {source} GROUP BY {keys}',
+                params,
+            ) as cursor:
+                rows = await cursor.fetchall()
+
+        combos: dict[tuple[str | None, ...], int] = {}
+        labels: dict[tuple[str, str], str] = {}
+        width = len(FACETS)
+        for row in rows:
+            combo = row[:width]
+            combos[combo] = row[width]
+            for facet, key, sample in zip(FACETS, combo, row[width + 1:]):
+                if key is not None and (facet, key) not in labels:
+                    labels[(facet, key)] = facet_value(facet, {facet: sample})[1]
+                    self._facet_keys[facet][facet_code(key)] = key
+        return count_facets(combos, filters or {}, labels)
+
+    def facet_key(self, facet: str, code: str) -> str | None:
+        """Tugmadagi kod bo'yicha kalit; noma'lum kod (eskirgan tugma) -- None."""
+        if self.facets is not None:
+            return self.facets.key(facet, code)
+        return self._facet_keys[facet].get(code)
+
+    @staticmethod
+    def _active_source(model: str | None, price_min: int, price_max: int) -> tuple[str, list]:
+        """Model va narxga mos aktiv e'lonlar uchun FROM ... WHERE qismi va parametrlari."""
+        match = fts_query(model)
+        if match:
+            return (
+                "FROM cars_fts JOIN cars ON cars.id = cars_fts.rowid "
+                "WHERE cars_fts MATCH ? AND cars.status = 'active' "
+                "AND cars.price >= ? AND cars.price <= ?"
+            ), [match, price_min, price_max]
+        return (
+            "FROM cars WHERE cars.status = 'active' AND cars.price >= ? AND cars.price <= ?"
+        ), [price_min, price_max]
+
+    async def _search_ids(self, key: SearchKey) -> SearchIds:
+        query, price_min, price_max = key
+        match = fts_query(' '.join(query))
+        async with self._read() as db:
+            if match:
+                sql = (
+                    "SELECT cars.id FROM cars_fts JOIN cars ON cars.id = cars_fts.rowid "
+                    "WHERE cars_fts MATCH ? AND cars.status = 'active' "
+                    "AND cars.price >= ? AND cars.price <= ? "
+                    "ORDER BY cars_fts.rowid DESC LIMIT ?"
+                )
+                params: list = [match, price_min, price_max, SEARCH_CACHE_MAX_IDS + 1]
+            else:
+                sql = (
+                    "SELECT id FROM cars "
+                    "WHERE status = 'active' AND price >= ? AND price <= ? "
+                    "ORDER BY id DESC LIMIT ?"
+                )
+                params = [price_min, price_max, SEARCH_CACHE_MAX_IDS + 1]
+
+            async with db.execute(sql, params) as cursor:
+                ids = tuple(row[0] for row in await cursor.fetchall())
+        return ids[:SEARCH_CACHE_MAX_IDS], len(ids) <= SEARCH_CACHE_MAX_IDS
+
+    async def _search_page(
+        self,
+        key: SearchKey,
+        after_id: int | None,
+        limit: int,
+    ) -> tuple[list[Car], int | None]:
+        query, price_min, price_max = key
+        match = fts_query(' '.join(query))
+        cursor_id = after_id if after_id is not None else 2 ** 63 - 1
+
+        async with self._read() as db:
+            if match:
+                sql = (
+                    "SELECT cars.* FROM cars_fts JOIN cars ON cars.id = cars_fts.rowid "
+                    "WHERE cars_fts MATCH ? AND cars_fts.rowid < ? AND cars.status = 'active' "
+                    "AND cars.price >= ? AND cars.price <= ? "
+                    "ORDER BY cars_fts.rowid DESC LIMIT ?"
+                )
+                params: list = [match, cursor_id, price_min, price_max, limit + 1]
+            else:
+                sql = (
+                    "SELECT * FROM cars "
+                    "WHERE status = 'active' AND id < ? AND price >= ? AND price <= ? "
+                    "ORDER BY id DESC LIMIT ?"
+                )
+                params = [cursor_id, price_min, price_max, limit + 1]
+
+            async with db.execute(sql, params) as cursor:
                 columns = [column[0] for column in cursor.description]
                 rows = await cursor.fetchall()
-                return [self._row_to_dict(columns, row) for row in rows]
+
+            cars = [Car.from_row(columns, row) for row in rows[:limit]]
+            await self._attach_photos(db, cars)
+
+        next_cursor = cars[-1]['id'] if len(rows) > limit else None
+        return cars, next_cursor
+
+    async def _cars_by_ids(self, car_ids: list[int] | tuple[int, ...]) -> list[Car]:
+        """Aktiv e'lonlarni berilgan id tartibida qaytaradi."""
+        if not car_ids:
+            return []
+
+        placeholders = ', '.join('?' * len(car_ids))
+        async with self._read() as db:
+            async with db.execute(
+                f"SELECT * FROM cars WHERE id IN ({placeholders}) AND status = 'active'",
+                list(car_ids),
+            ) as cursor:
+                columns = [column[0] for column in cursor.description]
+                rows = await cursor.fetchall()
+
+            by_id = {car['id']: car for car in (Car.from_row(columns, row) for row in rows)}
+            cars = [by_id[car_id] for car_id in car_ids if car_id in by_id]
+            await self._attach_photos(db, cars)
+        return cars
+
+    async def get_photos_for(self, car_ids: list[int]) -> dict[int, list[str]]:
+        """Bir nechta e'lon rasmlarini bitta so'rovda oladi: {car_id: [file_id, ...]}."""
+        async with self._read() as db:
+            return await self._fetch_photos(db, car_ids)
+
+    async def _fetch_photos(self, db: aiosqlite.Connection, car_ids: list[int]) -> dict[int, list[str]]:
+        photos: dict[int, list[str]] = {car_id: [] for car_id in car_ids}
+        if not car_ids:
+            return photos
+
+        placeholders = ', '.join('?' * len(car_ids))
+        async with db.execute(
+            f'SELECT car_id, file_id FROM car_photos WHERE car_id IN ({placeholders}) '
+            'ORDER BY car_id, position',
+            car_ids,
+        ) as cursor:
+            for car_id, file_id in await cursor.fetchall():
+                photos[car_id].append(file_id)
+        return photos
+
+    async def _attach_photos(self, db: aiosqlite.Connection, cars: list[Car]) -> None:
+        photos = await self._fetch_photos(db, [car['id'] for car in cars])
+        for car in cars:
+            car.attach_photos(photos[car['id']])
 
     async def get_stats(self) -> dict:
-        async with aiosqlite.connect(self.db_path) as db:
-            total_users = await self._scalar(db, 'SELECT COUNT(*) FROM users')
-            total_cars = await self._scalar(db, 'SELECT COUNT(*) FROM cars')
-            active_cars = await self._scalar(db, "SELECT COUNT(*) FROM cars WHERE status = 'active'")
-            sold_cars = await self._scalar(db, "SELECT COUNT(*) FROM cars WHERE status = 'sold'")
+        async with self._read() as db:
+            async with db.execute(
+                "SELECT key, value FROM counters WHERE scope = 'total'"
+            ) as cursor:
+                totals = dict(await cursor.fetchall())
+
             today_ads = await self._scalar(
                 db,
-                "SELECT COUNT(*) FROM cars WHERE date(created_at) = date('now', 'localtime')",
+                "SELECT value FROM counters WHERE scope = 'day' AND key = ?",
+                (counters.today_key(),),
             )
 
             async with db.execute(
                 '''
-                SELECT region, COUNT(*) AS cnt
-                FROM cars
-                GROUP BY region
-                ORDER BY cnt DESC
+                SELECT key, value
+                FROM counters
+                WHERE scope = 'region' AND value > 0
+                ORDER BY value DESC
                 LIMIT 1
                 '''
             ) as cursor:
                 top_region_row = await cursor.fetchone()
 
         return {
-            'total_users': int(total_users or 0),
-            'total_cars': int(total_cars or 0),
-            'active_cars': int(active_cars or 0),
-            'sold_cars': int(sold_cars or 0),
+            'total_users': int(totals.get('users') or 0),
+            'total_cars': int(totals.get('cars') or 0),
+            'active_cars': int(totals.get('active') or 0),
+            'sold_cars': int(totals.get('sold') or 0),
             'today_ads': int(today_ads or 0),
-            'top_region': top_region_row[0] if top_region_row else None,
+            'top_region': (top_region_row[0] or None) if top_region_row else None,
             'top_region_count': int(top_region_row[1]) if top_region_row else 0,
+            'archived_cars': int(totals.get('archived') or 0),
         }
 
-    async def get_recent_cars(self, limit: int = 5) -> list[dict]:
-        async with aiosqlite.connect(self.db_path) as db:
+    async def check_counters(self, repair: bool = False) -> list[tuple[str, str, int, int]]:
+        """counters jadvalini haqiqiy sanoqlar bilan solishtiradi.
+
+        Mos kelmagan yozuvlarni (scope, key, haqiqiy, saqlangan) ko'rinishida
+        qaytaradi; repair=True bo'lsa jadval qayta hisoblanadi.
+        """
+        async def op(db: aiosqlite.Connection) -> list[tuple[str, str, int, int]]:
+            mismatches = await counters.diff(db)
+            if mismatches and repair:
+                await counters.rebuild(db)
+            return mismatches
+
+        return await self._submit(op)
+
+    async def archive_cars(self, max_age_days: int | None = None, limit: int = 500) -> int:
+        """Sotilgan (va max_age_days dan eski aktiv) e'lonlarning bir qismini
+        cars_archive ga ko'chiradi. Ko'chirilganlar sonini qaytaradi.
+
+        Bitta chaqiruv bitta qisqa tranzaksiya: katta hajm bir necha marta
+        chaqirib ko'chiriladi, shu orada boshqa yozuvlar ham navbatdan o'tadi.
+        """
+        age = f'-{max_age_days} days' if max_age_days else None
+
+        async def op(db: aiosqlite.Connection) -> list[int]:
+            async with db.execute(
+                '''
+                SELECT id, status FROM cars
+                WHERE status = 'sold'
+                   OR (? IS NOT NULL AND status = 'active' AND created_at < datetime('now', ?))
+                ORDER BY id
+                LIMIT ?
+                ''',
+                (age, age, limit),
+            ) as cursor:
+                rows = await cursor.fetchall()
+            if not rows:
+                return []
+
+            ids = [row[0] for row in rows]
+            placeholders = ', '.join('?' * len(ids))
+            await db.execute(
+                f'''
+                INSERT INTO cars_archive ({ARCHIVE_COLUMNS})
+                SELECT {ARCHIVE_SELECT} FROM cars WHERE id IN ({placeholders})
+                ''',
+                ids,
+            )
+            await db.execute(f'DELETE FROM cars WHERE id IN ({placeholders})', ids)
+
+            expired = sum(1 for _, status in rows if status == 'active')
+            if expired:
+                await counters.bump(db, 'total', 'active', -expired)
+            await counters.bump(db, 'total', 'archived', len(ids))
+            return ids
+
+        moved = await self._submit(op)
+        if moved:
+            self._cars_archived(moved)
+            self._changed('cars_archived', {'ids': moved})
+        return len(moved)
+
+    def apply_change(self, kind: str, payload: dict) -> None:
+        """Boshqa jarayonda bajarilgan yozuvni shu jarayon indekslariga qo'llaydi."""
+        if kind == 'car_added':
+            self._car_added(payload['id'], payload)
+        elif kind == 'car_removed':
+            self._car_removed(payload['id'], payload)
+        elif kind == 'cars_archived':
+            self._cars_archived(payload['ids'])
+        else:
+            logger.warning(f"Noma'lum o'zgarish turi: {kind}")
+
+    def _changed(self, kind: str, payload: dict) -> None:
+        if self.on_change is not None:
+            self.on_change(kind, payload)
+
+    def _car_added(self, car_id: int, car: dict) -> None:
+        self.search_cache.invalidate_car(car)
+        if self.facets is not None:
+            self.facets.add(car_id, car)
+        if self.price_index is not None:
+            self.price_index.add(car_id, car)
+
+    def _car_removed(self, car_id: int, car: dict) -> None:
+        self.search_cache.invalidate_car(car)
+        if self.facets is not None:
+            self.facets.remove(car_id)
+        if self.price_index is not None:
+            self.price_index.remove(car_id)
+
+    def _cars_archived(self, car_ids: list[int]) -> None:
+        # Arxiv kamdan-kam ishlaydi: tanlab o'chirish o'rniga keshni tozalaymiz
+        self.search_cache.clear()
+        for car_id in car_ids:
+            if self.facets is not None:
+                self.facets.remove(car_id)
+            if self.price_index is not None:
+                self.price_index.remove(car_id)
+
+    async def incremental_vacuum(self, pages: int = 1000) -> None:
+        """auto_vacuum=INCREMENTAL bazalarda bo'sh sahifalarni faylga qaytaradi."""
+        async def op(db: aiosqlite.Connection) -> None:
+            async with db.execute('PRAGMA auto_vacuum') as cursor:
+                mode = (await cursor.fetchone())[0]
+            if mode == 2:
+                async with db.execute(f'PRAGMA incremental_vacuum({int(pages)})') as cursor:
+                    await cursor.fetchall()
+
+        await self._submit(op)
+
+    async def get_recent_cars(self, limit: int = 5) -> list[Car]:
+        async with self._read() as db:
             async with db.execute(
                 'SELECT * FROM cars ORDER BY id DESC LIMIT ?',
                 (limit,),
             ) as cursor:
                 columns = [column[0] for column in cursor.description]
                 rows = await cursor.fetchall()
-                return [self._row_to_dict(columns, row) for row in rows]
+            cars = [Car.from_row(columns, row) for row in rows]
+            await self._attach_photos(db, cars)
+            return cars
+
+    async def add_saved_search(
+        self,
+        user_id: str,
+        model: str | None,
+        price_min: int,
+        price_max: int,
+    ) -> dict:
+        """Qidiruvni saqlaydi; xuddi shunday obuna bo'lsa, mavjudini qaytaradi."""
+        params = (user_id, normalize_text(model), price_min, price_max)
+
+        async def op(db: aiosqlite.Connection) -> dict:
+            await db.execute(
+                '''
+                INSERT OR IGNORE INTO saved_searches (user_id, model, query, price_min, price_max)
+                VALUES (?, ?, ?, ?, ?)
+                ''',
+                (user_id, model, *params[1:]),
+            )
+            async with db.execute(
+                f'''
+                SELECT {', '.join(SAVED_SEARCH_COLUMNS)} FROM saved_searches
+                WHERE user_id = ? AND query = ? AND price_min = ? AND price_max = ?
+                ''',
+                params,
+            ) as cursor:
+                return dict(zip(SAVED_SEARCH_COLUMNS, await cursor.fetchone()))
 
-    async def _scalar(self, db: aiosqlite.Connection, query: str):
-        async with db.execute(query) as cursor:
+        return await self._submit(op)
+
+    async def delete_saved_search(self, search_id: int, user_id: str) -> bool:
+        async def op(db: aiosqlite.Connection) -> bool:
+            cursor = await db.execute(
+                'DELETE FROM saved_searches WHERE id = ? AND user_id = ?',
+                (search_id, user_id),
+            )
+            return cursor.rowcount > 0
+
+        return await self._submit(op)
+
+    async def get_saved_searches(self) -> list[dict]:
+        async with self._read() as db:
+            async with db.execute(
+                f"SELECT {', '.join(SAVED_SEARCH_COLUMNS)} FROM saved_searches ORDER BY id"
+            ) as cursor:
+                return [dict(zip(SAVED_SEARCH_COLUMNS, row)) for row in await cursor.fetchall()]
+
+    async def _scalar(self, db: aiosqlite.Connection, query: str, params: tuple = ()):
+        async with db.execute(query, params) as cursor:
             row = await cursor.fetchone()
             return row[0] if row else 0
 
-    def _row_to_dict(self, columns: list[str], row: tuple, override: dict | None = None) -> dict:
-        data = dict(zip(columns, row))
-        raw_photos = data.get('photos')
-
-        if raw_photos:
-            try:
-                data['photos'] = json.loads(raw_photos)
-            except json.JSONDecodeError:
-                data['photos'] = [data.get('photo')] if data.get('photo') else []
-        else:
-            data['photos'] = [data.get('photo')] if data.get('photo') else []
 
-        if override:
-            data.update(override)
-        return data
+def create_storage(engine: str = DB_ENGINE) -> CarStorage:
+    """DB_ENGINE bo'yicha saqlash engine'ini yaratadi: 'sqlite' yoki 'memory'."""
+    if engine == 'sqlite':
+        return DatabaseManager(
+            DB_FILE, readers=DB_READERS, search_index=SEARCH_INDEX, facet_index=FACET_INDEX
+        )
+    if engine == 'memory':
+        from database.memory import MemoryDatabaseManager
+        return MemoryDatabaseManager()
+    raise ValueError(f"Noma'lum DB_ENGINE: {engine}")
 
 
-db_manager = DatabaseManager(DB_FILE)
+db_manager: CarStorage = create_storage()
@@ -0,0 +1,302 @@
+import logging
+from collections import Counter
+from datetime import datetime, timedelta, timezone
+from itertools import islice
+
+from database import counters
+from database.base import ChangeListener
+from database.facets import FacetCounts, FacetIndex, Filters
+from database.price_index import PriceIndex
+from database.records import CAR_COLUMNS, Car, normalize_photos
+from utils.translit import normalize_text, tokenize
+
+logger = logging.getLogger(__name__)
+
+_USER_ID = CAR_COLUMNS.index('user_id')
+_REGION = CAR_COLUMNS.index('region')
+_STATUS = CAR_COLUMNS.index('status')
+_CREATED_AT = CAR_COLUMNS.index('created_at')
+_SOLD_AT = CAR_COLUMNS.index('sold_at')
+_CHANNEL_MESSAGE_ID = CAR_COLUMNS.index('channel_message_id')
+
+
+def _utc_now() -> str:
+    return datetime.now(timezone.utc).strftime('%Y-%m-%d %H:%M:%S')
+
+
+def _local_day(created_at: str) -> str:
+    moment = datetime.strptime(created_at, '%Y-%m-%d %H:%M:%S').replace(tzinfo=timezone.utc)
+    return moment.astimezone().date().isoformat()
+
+
+class MemoryDatabaseManager:
+    """To'liq xotirada ishlaydigan engine (DB_ENGINE=memory).
+
+    Disk I/O siz benchmark va tezkor sinovlar uchun. Aktiv e'lonlar
+    qidiruvi PriceIndex, filtrlar FacetIndex orqali (SQLite engine'dagi
+    SEARCH_INDEX va FACET_INDEX bilan bir xil), qidiruv tokenlari SQLite FTS
+    bilan bir xil normallashtiriladi.
+    Jarayon to'xtasa ma'lumotlar yo'qoladi.
+    """
+
+    user_cache = None
+    search_cache = None
+
+    def __init__(self):
+        self._users: dict[str, dict] = {}
+        self._cars: dict[int, tuple] = {}
+        self._archive: dict[int, tuple] = {}
+        self._photos: dict[int, list[str]] = {}
+        self._index = PriceIndex()
+        self._counters: Counter[tuple[str, str]] = Counter()
+        self._saved_searches: dict[int, dict] = {}
+        self.facets = FacetIndex()
+        self._next_id = 1
+        self._next_search_id = 1
+        # Bitta jarayonli engine: o'zgarishlarni tarqatadigan boshqa worker yo'q
+        self.on_change: ChangeListener | None = None
+
+    async def initialize(self) -> None:
+        pass
+
+    async def close(self) -> None:
+        pass
+
+    async def migrate(self) -> int:
+        return 0
+
+    def apply_change(self, kind: str, payload: dict) -> None:
+        # BOT_WORKERS > 1 xotira engine'ida taqiqlangan (config.py), bu yerga kelmaydi
+        logger.warning(f"Xotira engine'i boshqa jarayon o'zgarishini qabul qilmaydi: {kind}")
+
+    async def add_user(self, user_id: str, phone: str, username: str | None) -> None:
+        if user_id not in self._users:
+            self._counters[('total', 'users')] += 1
+        self._users[user_id] = {'user_id': user_id, 'phone': phone, 'username': username}
+
+    async def get_user(self, user_id: str) -> dict | None:
+        user = self._users.get(user_id)
+        return dict(user) if user else None
+
+    async def add_car(self, car_data: dict) -> int:
+        car_id = self._next_id
+        self._next_id += 1
+
+        photos = normalize_photos(car_data)
+        values = {
+            **{column: car_data.get(column) for column in CAR_COLUMNS},
+            'id': car_id,
+            'photo': photos[0][0] if photos else None,
+            'photos': None,
+            'status': 'active',
+            'channel_message_id': None,
+            'created_at': _utc_now(),
+            'sold_at': None,
+        }
+        self._cars[car_id] = tuple(values[column] for column in CAR_COLUMNS)
+        self._photos[car_id] = [file_id for file_id, _ in photos]
+        self._index.add(car_id, values)
+        self.facets.add(car_id, values)
+
+        self._counters[('total', 'cars')] += 1
+        self._counters[('total', 'active')] += 1
+        self._counters[('day', counters.today_key())] += 1
+        self._counters[('region', values['region'] or '')] += 1
+        return car_id
+
+    async def set_channel_message_id(self, car_id: int, message_id: int | None) -> None:
+        row = self._cars.get(car_id)
+        if row is not None:
+            self._cars[car_id] = self._replace(row, _CHANNEL_MESSAGE_ID, message_id)
+
+    async def get_car(self, car_id: int) -> Car | None:
+        return self._car(car_id) if car_id in self._cars else None
+
+    async def mark_car_sold(self, car_id: int, owner_user_id: str) -> Car | None:
+        row = self._cars.get(car_id)
+        if row is None or row[_USER_ID] != owner_user_id or row[_STATUS] == 'sold':
+            return None
+
+        car = self._car(car_id)
+        row = self._replace(row, _STATUS, 'sold')
+        self._cars[car_id] = self._replace(row, _SOLD_AT, _utc_now())
+        if car['status'] == 'active':
+            self._index.remove(car_id)
+            self.facets.remove(car_id)
+
+        self._counters[('total', 'active')] -= 1
+        self._counters[('total', 'sold')] += 1
+        return car.replace(status='sold')
+
+    async def search_cars(
+        self,
+        model: str | None = None,
+        price_min: int = 0,
+        price_max: int = 999_999_999,
+    ) -> list[Car]:
+        query = tokenize(model)
+        matches = [
+            car_id for car_id in self._index.price_range(price_min, price_max)
+            if self._index.matches(car_id, query)
+        ]
+        matches.sort(reverse=True)
+        return [self._car(car_id) for car_id in matches]
+
+    async def search_cars_page(
+        self,
+        model: str | None = None,
+        price_min: int = 0,
+        price_max: int = 999_999_999,
+        after_id: int | None = None,
+        limit: int = 10,
+    ) -> tuple[list[Car], int | None]:
+        ids, next_cursor = self._index.search(model, price_min, price_max, after_id, limit)
+        return [self._car(car_id) for car_id in ids], next_cursor
+
+    async def search_cars_faceted(
+        self,
+        model: str | None = None,
+        price_min: int = 0,
+        price_max: int = 999_999_999,
+        filters: Filters | None = None,
+        after_id: int | None = None,
+        limit: int = 10,
+    ) -> tuple[list[Car], int | None]:
+        ids, next_cursor = self.facets.search(model, price_min, price_max, filters, after_id, limit)
+        return [self._car(car_id) for car_id in ids], next_cursor
+
+    async def count_cars(
+        self,
+        model: str | None = None,
+        price_min: int = 0,
+        price_max: int = 999_999_999,
+    ) -> int:
+        return self.facets.count(model, price_min, price_max)
+
+    async def facet_counts(
+        self,
+        model: str | None = None,
+        price_min: int = 0,
+        price_max: int = 999_999_999,
+        filters: Filters | None = None,
+    ) -> tuple[int, FacetCounts]:
+        return self.facets.counts(model, price_min, price_max, filters)
+
+    def facet_key(self, facet: str, code: str) -> str | None:
+        return self.facets.key(facet, code)
+
+    async def get_photos_for(self, car_ids: list[int]) -> dict[int, list[str]]:
+        return {car_id: list(self._photos.get(car_id, [])) for car_id in car_ids}
+
+    async def get_stats(self) -> dict:
+        regions = [
+            (key, value) for (scope, key), value in self._counters.items()
+            if scope == 'region' and value > 0
+        ]
+        top_region = max(regions, key=lambda item: item[1], default=None)
+        return {
+            'total_users': self._counters[('total', 'users')],
+            'total_cars': self._counters[('total', 'cars')],
+            'active_cars': self._counters[('total', 'active')],
+            'sold_cars': self._counters[('total', 'sold')],
+            'today_ads': self._counters[('day', counters.today_key())],
+            'top_region': (top_region[0] or None) if top_region else None,
+            'top_region_count': top_region[1] if top_region else 0,
+            'archived_cars': self._counters[('total', 'archived')],
+        }
+
+    async def check_counters(self, repair: bool = False) -> list[tuple[str, str, int, int]]:
+        real: Counter[tuple[str, str]] = Counter()
+        real[('total', 'users')] = len(self._users)
+        real[('total', 'archived')] = len(self._archive)
+        for row in [*self._cars.values(), *self._archive.values()]:
+            real[('total', 'cars')] += 1
+            if row[_STATUS] == 'sold' or (row[_STATUS] == 'active' and row[0] in self._cars):
+                real[('total', row[_STATUS])] += 1
+            real[('day', _local_day(row[_CREATED_AT]))] += 1
+            real[('region', row[_REGION] or '')] += 1
+
+        stored = +self._counters
+        real = +real
+        mismatches = [
+            (scope, key, real[(scope, key)], stored[(scope, key)])
+            for scope, key in sorted(real.keys() | stored.keys())
+            if real[(scope, key)] != stored[(scope, key)]
+        ]
+        if mismatches and repair:
+            self._counters = real
+        return mismatches
+
+    async def archive_cars(self, max_age_days: int | None = None, limit: int = 500) -> int:
+        cutoff = None
+        if max_age_days:
+            cutoff = (datetime.now(timezone.utc) - timedelta(days=max_age_days)).strftime('%Y-%m-%d %H:%M:%S')
+
+        ids = [
+            car_id for car_id, row in self._cars.items()
+            if row[_STATUS] == 'sold'
+            or (cutoff and row[_STATUS] == 'active' and row[_CREATED_AT] < cutoff)
+        ][:limit]
+
+        for car_id in ids:
+            row = self._cars.pop(car_id)
+            if row[_STATUS] == 'active':
+                self._index.remove(car_id)
+                self.facets.remove(car_id)
+                self._counters[('total', 'active')] -= 1
+                row = self._replace(row, _STATUS, 'expired')
+            self._archive[car_id] = row
+
+        self._counters[('total', 'archived')] += len(ids)
+        return len(ids)
+
+    async def incremental_vacuum(self, pages: int = 1000) -> None:
+        pass
+
+    async def get_recent_cars(self, limit: int = 5) -> list[Car]:
+        return [self._car(car_id) for car_id in islice(reversed(self._cars), limit)]
+
+    async def add_saved_search(
+        self,
+        user_id: str,
+        model: str | None,
+        price_min: int,
+        price_max: int,
+    ) -> dict:
+        query = normalize_text(model)
+        for saved in self._saved_searches.values():
+            if (saved['user_id'], saved['query'], saved['price_min'], saved['price_max']) == (
+                user_id, query, price_min, price_max,
+            ):
+                return dict(saved)
+
+        saved = {
+            'id': self._next_search_id,
+            'user_id': user_id,
+            'model': model,
+            'query': query,
+            'price_min': price_min,
+            'price_max': price_max,
+        }
+        self._next_search_id += 1
+        self._saved_searches[saved['id']] = saved
+        return dict(saved)
+
+    async def delete_saved_search(self, search_id: int, user_id: str) -> bool:
+        saved = self._saved_searches.get(search_id)
+        if saved is None or saved['user_id'] != user_id:
+            return False
+        del self._saved_searches[search_id]
+        return True
+
+    async def get_saved_searches(self) -> list[dict]:
+        return [dict(saved) for saved in self._saved_searches.values()]
+
+    def _car(self, car_id: int) -> Car:
+        car = Car.from_row(CAR_COLUMNS, self._cars[car_id])
+        car.attach_photos(list(self._photos.get(car_id, [])))
+        return car
+
+    @staticmethod
+    def _replace(row: tuple, position: int, value) -> tuple:
+        return row[:position] + (value,) + row[position + 1:]
@@ -0,0 +1,277 @@
+from typing import Awaitable, Callable
+
+import aiosqlite
+
+from database import counters
+
+USERS_TABLE = '''
+CREATE TABLE IF NOT EXISTS users (
+    user_id TEXT PRIMARY KEY,
+    phone TEXT,
+    username TEXT
+)
+'''
+
+CARS_TABLE = '''
+CREATE TABLE IF NOT EXISTS cars (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    user_id TEXT,
+    model TEXT,
+    price INTEGER,
+    condition TEXT,
+    transmission TEXT,
+    color TEXT,
+    mileage INTEGER,
+    region TEXT,
+    photo TEXT,
+    phone TEXT,
+    username TEXT,
+    photos TEXT,
+    status TEXT DEFAULT 'active',
+    channel_message_id INTEGER,
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    sold_at TIMESTAMP
+)
+'''
+
+# Eski bazalarda keyinroq qo'shilgan ustunlar
+LEGACY_CAR_COLUMNS = (
+    ('photos', 'TEXT'),
+    ('status', "TEXT DEFAULT 'active'"),
+    ('channel_message_id', 'INTEGER'),
+    ('sold_at', 'TIMESTAMP'),
+)
+
+# search_cars: status + narx oralig'i, get_stats: status/hudud sanog'i va
+# bugungi e'lonlar (created_at oralig'i bo'yicha).
+CAR_INDEXES = (
+    'CREATE INDEX IF NOT EXISTS idx_cars_status_price_id ON cars (status, price, id)',
+    'CREATE INDEX IF NOT EXISTS idx_cars_status_region ON cars (status, region)',
+    'CREATE INDEX IF NOT EXISTS idx_cars_region ON cars (region)',
+    'CREATE INDEX IF NOT EXISTS idx_cars_created_at ON cars (created_at)',
+)
+
+# model/rang/hudud bo'yicha to'liq matnli qidiruv. Indeksga car_norm() orqali
+# transliteratsiya qilingan matn yoziladi, shuning uchun bu funksiya har bir
+# ulanishda ro'yxatdan o'tkazilgan bo'lishi kerak (DatabaseManager._open).
+CARS_FTS_TABLE = '''
+CREATE VIRTUAL TABLE IF NOT EXISTS cars_fts USING fts5(
+    model, color, region,
+    prefix = '2 3'
+)
+'''
+
+CARS_FTS_TRIGGERS = (
+    '''
+    CREATE TRIGGER IF NOT EXISTS cars_fts_insert AFTER INSERT ON cars BEGIN
+        INSERT INTO cars_fts (rowid, model, color, region)
+        VALUES (new.id, car_norm(new.model), car_norm(new.color), car_norm(new.region));
+    END
+    ''',
+    '''
+    CREATE TRIGGER IF NOT EXISTS cars_fts_update AFTER UPDATE OF model, color, region ON cars BEGIN
+        DELETE FROM cars_fts WHERE rowid = old.id;
+        INSERT INTO cars_fts (rowid, model, color, region)
+        VALUES (new.id, car_norm(new.model), car_norm(new.color), car_norm(new.region));
+    END
+    ''',
+    '''
+    CREATE TRIGGER IF NOT EXISTS cars_fts_delete AFTER DELETE ON cars BEGIN
+        DELETE FROM cars_fts WHERE rowid = old.id;
+    END
+    ''',
+)
+
+# Har bir e'lon rasmlari alohida qatorda; cars.photo muqova sifatida qoladi
+CAR_PHOTOS_TABLE = '''
+CREATE TABLE IF NOT EXISTS car_photos (
+    car_id INTEGER NOT NULL,
+    position INTEGER NOT NULL,
+    file_id TEXT NOT NULL,
+    file_unique_id TEXT,
+    PRIMARY KEY (car_id, position)
+) WITHOUT ROWID
+'''
+
+PHOTO_MIGRATION_CHUNK = 5000
+
+# Sotilgan va eskirgan e'lonlar shu yerga ko'chiriladi (database.manager.archive_cars).
+# id lar cars bilan kesishmaydi (AUTOINCREMENT), car_photos ikkalasiga ham xizmat qiladi.
+CARS_ARCHIVE_TABLE = '''
+CREATE TABLE IF NOT EXISTS cars_archive (
+    id INTEGER PRIMARY KEY,
+    user_id TEXT,
+    model TEXT,
+    price INTEGER,
+    condition TEXT,
+    transmission TEXT,
+    color TEXT,
+    mileage INTEGER,
+    region TEXT,
+    photo TEXT,
+    phone TEXT,
+    username TEXT,
+    photos TEXT,
+    status TEXT,
+    channel_message_id INTEGER,
+    created_at TIMESTAMP,
+    sold_at TIMESTAMP,
+    archived_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+)
+'''
+
+# Obuna bo'lingan qidiruvlar; query -- normallashtirilgan model tokenlari
+SAVED_SEARCHES_TABLE = '''
+CREATE TABLE IF NOT EXISTS saved_searches (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    user_id TEXT NOT NULL,
+    model TEXT,
+    query TEXT NOT NULL DEFAULT '',
+    price_min INTEGER NOT NULL DEFAULT 0,
+    price_max INTEGER NOT NULL,
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    UNIQUE (user_id, query, price_min, price_max)
+)
+'''
+
+Migration = Callable[[aiosqlite.Connection], Awaitable[None]]
+
+
+async def _create_base_tables(db: aiosqlite.Connection) -> None:
+    await db.execute(USERS_TABLE)
+    await db.execute(CARS_TABLE)
+
+    async with db.execute('PRAGMA table_info(cars)') as cursor:
+        existing = {row[1] for row in await cursor.fetchall()}
+    for column, ddl in LEGACY_CAR_COLUMNS:
+        if column not in existing:
+            await db.execute(f'ALTER TABLE cars ADD COLUMN {column} {ddl}')
+
+
+async def _add_car_indexes(db: aiosqlite.Connection) -> None:
+    # created_at doim 'YYYY-MM-DD HH:MM:SS' (UTC) ko'rinishida bo'lsin,
+    # shunda sana so'rovlari indeks bo'yicha oraliq qidiruviga aylanadi.
+    await db.execute(
+        '''
+        UPDATE cars SET created_at = datetime(created_at)
+        WHERE datetime(created_at) IS NOT NULL AND created_at != datetime(created_at)
+        '''
+    )
+    for statement in CAR_INDEXES:
+        await db.execute(statement)
+
+
+async def _add_keyset_index(db: aiosqlite.Connection) -> None:
+    # search_cars_page: status = 'active' AND id < ? ORDER BY id DESC LIMIT ?
+    await db.execute('CREATE INDEX IF NOT EXISTS idx_cars_status_id ON cars (status, id)')
+
+
+async def _create_cars_fts(db: aiosqlite.Connection) -> None:
+    await db.execute(CARS_FTS_TABLE)
+    for statement in CARS_FTS_TRIGGERS:
+        await db.execute(statement)
+    await db.execute(
+        '''
+        INSERT INTO cars_fts (rowid, model, color, region)
+        SELECT id, car_norm(model), car_norm(color), car_norm(region) FROM cars
+        '''
+    )
+
+
+async def _create_counters(db: aiosqlite.Connection) -> None:
+    await db.execute(counters.COUNTERS_TABLE)
+    await counters.rebuild(db)
+
+
+async def _create_car_photos(db: aiosqlite.Connection) -> None:
+    await db.execute(CAR_PHOTOS_TABLE)
+    await db.execute(
+        'CREATE INDEX IF NOT EXISTS idx_car_photos_unique ON car_photos (file_unique_id)'
+    )
+
+    async with db.execute('SELECT COALESCE(MAX(id), 0) FROM cars') as cursor:
+        max_id = (await cursor.fetchone())[0]
+
+    # photos JSON ustunini bo'laklab car_photos ga yoyamiz; har bo'lak alohida
+    # commit qilinadi, qayta ishga tushsa INSERT OR IGNORE takrorlanmaydi.
+    for start in range(0, max_id, PHOTO_MIGRATION_CHUNK):
+        end = start + PHOTO_MIGRATION_CHUNK
+        await db.execute(
+            '''
+            INSERT OR IGNORE INTO car_photos (car_id, position, file_id)
+            SELECT cars.id, CAST(items.key AS INTEGER), items.value
+            FROM cars, json_each(cars.photos) AS items
+            WHERE cars.id > ? AND cars.id <= ?
+              AND json_valid(cars.photos) AND json_type(cars.photos) = 'array'
+              AND items.type = 'text'
+            ''',
+            (start, end),
+        )
+        await db.execute(
+            '''
+            INSERT OR IGNORE INTO car_photos (car_id, position, file_id)
+            SELECT id, 0, photo FROM cars
+            WHERE id > ? AND id <= ? AND photo IS NOT NULL
+              AND NOT EXISTS (SELECT 1 FROM car_photos WHERE car_id = cars.id)
+            ''',
+            (start, end),
+        )
+        await db.execute(
+            'UPDATE cars SET photos = NULL WHERE id > ? AND id <= ? AND photos IS NOT NULL',
+            (start, end),
+        )
+        await db.commit()
+
+
+async def _create_cars_archive(db: aiosqlite.Connection) -> None:
+    await db.execute(CARS_ARCHIVE_TABLE)
+    await db.execute(
+        'CREATE INDEX IF NOT EXISTS idx_cars_archive_user ON cars_archive (user_id)'
+    )
+
+
+async def _create_saved_searches(db: aiosqlite.Connection) -> None:
+    await db.execute(SAVED_SEARCHES_TABLE)
+
+
+# Tartib raqami faqat o'sib boradi; qo'llangan migratsiyani o'zgartirmang,
+# yangisini ro'yxat oxiriga qo'shing.
+MIGRATIONS: tuple[tuple[int, Migration], ...] = (
+    (1, _create_base_tables),
+    (2, _add_car_indexes),
+    (3, _create_cars_fts),
+    (4, _add_keyset_index),
+    (5, _create_counters),
+    (6, _create_car_photos),
+    (7, _create_cars_archive),
+    (8, _create_saved_searches),
+)
+
+
+async def run_migrations(db: aiosqlite.Connection) -> int:
+    """Qo'llanmagan migratsiyalarni ketma-ket bajaradi va joriy versiyani qaytaradi."""
+    await db.execute(
+        '''
+        CREATE TABLE IF NOT EXISTS schema_version (
+            version INTEGER PRIMARY KEY,
+            applied_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+        '''
+    )
+    async with db.execute('SELECT MAX(version) FROM schema_version') as cursor:
+        row = await cursor.fetchone()
+    current = row[0] or 0
+
+    for version, migration in MIGRATIONS:
+        if version <= current:
+            continue
+        try:
+            await migration(db)
+            await db.execute('INSERT INTO schema_version (version) VALUES (?)', (version,))
+            await db.commit()
+        except BaseException:
+            await db.rollback()
+            raise
+        current = version
+
+    return current
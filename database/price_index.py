@@ -0,0 +1,213 @@
+import heapq
+from array import array
+from bisect import bisect_left, bisect_right
+from collections.abc import Iterable, Iterator, Mapping
+
+from utils.translit import tokenize
+
+# Narx/probeg noma'lum bo'lsa: har qanday oraliqdan tashqarida qoladi
+UNKNOWN = -1
+
+
+def _number(value) -> int:
+    try:
+        return int(value) if value is not None and value != '' else UNKNOWN
+    except (TypeError, ValueError):
+        return UNKNOWN
+
+
+def _descending(ids: array, before: int | None) -> Iterator[int]:
+    """Saralangan id massivini oxiridan (before dan kichiklaridan) yuradi."""
+    position = len(ids) if before is None else bisect_left(ids, before)
+    for index in range(position - 1, -1, -1):
+        yield ids[index]
+
+
+class PriceIndex:
+    """Aktiv e'lonlarning xotiradagi ustunli indeksi (SEARCH_INDEX=1).
+
+    (narx, id) bo'yicha saralangan array('q') ustunlari narx oralig'ini
+    bisect bilan kesadi; id bo'yicha narx/probeg massivlari va token
+    postinglari (o'suvchi id lar) kalit-to'plam sahifalashni bazaga
+    bormasdan bajaradi. Natija tartibi search_cars_page bilan bir xil:
+    id kamayish tartibida.
+    """
+
+    def __init__(self):
+        self._prices = array('q')
+        self._price_ids = array('q')
+        self._ids = array('q')
+        self._price_of = array('q')
+        self._mileage_of = array('q')
+        self._postings: dict[str, array] = {}
+        self._vocabulary: list[str] = []
+        self._texts: dict[int, str] = {}
+
+    def __len__(self) -> int:
+        return len(self._ids)
+
+    def load(self, cars: Iterable[tuple[int, Mapping]]) -> None:
+        """Boshlang'ich yuklash: massivlar bir marta saralanadi (add ning O(n) qo'yishisiz)."""
+        entries = []
+        postings: dict[str, list[int]] = {}
+        for car_id, car in cars:
+            self._grow(car_id)
+            price = _number(car.get('price'))
+            self._price_of[car_id] = price
+            self._mileage_of[car_id] = _number(car.get('mileage'))
+            entries.append((price, car_id))
+            for token in self._index_text(car_id, car):
+                postings.setdefault(token, []).append(car_id)
+
+        entries.extend(zip(self._prices, self._price_ids))
+        entries.sort()
+        self._prices = array('q', (price for price, _ in entries))
+        self._price_ids = array('q', (car_id for _, car_id in entries))
+        self._ids = array('q', sorted(car_id for _, car_id in entries))
+        for token, ids in postings.items():
+            merged = sorted(set(ids).union(self._postings.get(token, ())))
+            self._postings[token] = array('q', merged)
+        self._vocabulary = sorted(self._postings)
+
+    def add(self, car_id: int, car: Mapping) -> None:
+        if car_id in self._texts:
+            self.remove(car_id)
+        self._grow(car_id)
+        price = _number(car.get('price'))
+        self._price_of[car_id] = price
+        self._mileage_of[car_id] = _number(car.get('mileage'))
+
+        position = self._position(price, car_id)
+        self._prices.insert(position, price)
+        self._price_ids.insert(position, car_id)
+        self._ids.insert(bisect_left(self._ids, car_id), car_id)
+
+        for token in self._index_text(car_id, car):
+            ids = self._postings.get(token)
+            if ids is None:
+                ids = self._postings[token] = array('q')
+                self._vocabulary.insert(bisect_left(self._vocabulary, token), token)
+            ids.insert(bisect_left(ids, car_id), car_id)
+
+    def remove(self, car_id: int) -> None:
+        text = self._texts.pop(car_id, None)
+        if text is None:
+            return
+        price = self._price_of[car_id]
+        position = self._position(price, car_id)
+        del self._prices[position]
+        del self._price_ids[position]
+        del self._ids[bisect_left(self._ids, car_id)]
+        self._price_of[car_id] = UNKNOWN
+        self._mileage_of[car_id] = UNKNOWN
+
+        for token in set(text.split()):
+            ids = self._postings[token]
+            del ids[bisect_left(ids, car_id)]
+
+    def price_range(self, price_min: int, price_max: int) -> array:
+        """Narx oralig'idagi id lar (narx bo'yicha o'sish tartibida)."""
+        low, high = self._bounds(price_min, price_max)
+        return self._price_ids[low:high]
+
+    def matches(self, car_id: int, query: list[str]) -> bool:
+        text = self._texts[car_id]
+        return all(f' {prefix}' in text for prefix in query)
+
+    def search(
+        self,
+        model: str | None = None,
+        price_min: int = 0,
+        price_max: int = 999_999_999,
+        after_id: int | None = None,
+        limit: int = 10,
+        mileage_min: int | None = None,
+        mileage_max: int | None = None,
+    ) -> tuple[list[int], int | None]:
+        """search_cars_page bilan bir xil sahifa: (id lar, keyingi kursor)."""
+        query = tokenize(model)
+        low, high = self._bounds(price_min, price_max)
+        in_range = high - low
+        if not in_range or not self._ids:
+            return [], None
+
+        def accept(car_id: int) -> bool:
+            if mileage_min is not None or mileage_max is not None:
+                mileage = self._mileage_of[car_id]
+                if mileage == UNKNOWN:
+                    return False
+                if mileage_min is not None and mileage < mileage_min:
+                    return False
+                if mileage_max is not None and mileage > mileage_max:
+                    return False
+            return not query or self.matches(car_id, query)
+
+        # Oqim: eng kam postingli token (yoki barcha aktiv id lar) id kamayish tartibida
+        postings = None
+        stream_size = len(self._ids)
+        for prefix in query:
+            arrays = self._prefix_postings(prefix)
+            size = sum(len(ids) for ids in arrays)
+            if postings is None or size < stream_size:
+                postings, stream_size = arrays, size
+        if postings is not None and not stream_size:
+            return [], None
+
+        # Oqimdan sahifa yig'ish taxminan (limit+1) * aktiv / in_range qator ko'radi,
+        # narx kesimi esa in_range qator; arzonini tanlaymiz.
+        scan_cost = min(stream_size, (limit + 1) * len(self._ids) / in_range)
+        if in_range <= scan_cost:
+            candidates = self._price_ids[low:high]
+            ids = heapq.nlargest(
+                limit + 1,
+                (
+                    car_id for car_id in candidates
+                    if (after_id is None or car_id < after_id) and accept(car_id)
+                ),
+            )
+        else:
+            if postings is None:
+                stream = _descending(self._ids, after_id)
+            elif len(postings) == 1:
+                stream = _descending(postings[0], after_id)
+            else:
+                stream = heapq.merge(*(_descending(ids, after_id) for ids in postings), reverse=True)
+
+            ids = []
+            price_of = self._price_of
+            for car_id in stream:
+                if price_min <= price_of[car_id] <= price_max and accept(car_id):
+                    if ids and ids[-1] == car_id:
+                        continue
+                    ids.append(car_id)
+                    if len(ids) > limit:
+                        break
+
+        return ids[:limit], (ids[limit - 1] if len(ids) > limit else None)
+
+    def _prefix_postings(self, prefix: str) -> list[array]:
+        start = bisect_left(self._vocabulary, prefix)
+        end = bisect_right(self._vocabulary, prefix + '\uffff')
+        return [self._postings[token] for token in self._vocabulary[start:end] if self._postings[token]]
+
+    def _index_text(self, car_id: int, car: Mapping) -> set[str]:
+        # " token1 token2" ko'rinishida: prefiks tekshiruvi oddiy substring qidiruvi
+        tokens = tokenize(car.get('model')) + tokenize(car.get('color')) + tokenize(car.get('region'))
+        self._texts[car_id] = ''.join(f' {token}' for token in tokens)
+        return set(tokens)
+
+    def _grow(self, car_id: int) -> None:
+        missing = car_id + 1 - len(self._price_of)
+        if missing > 0:
+            # Har safar bittadan emas, zaxira bilan kengaytiramiz
+            missing = max(missing, len(self._price_of) // 2, 1024)
+            self._price_of.extend([UNKNOWN] * missing)
+            self._mileage_of.extend([UNKNOWN] * missing)
+
+    def _bounds(self, price_min: int, price_max: int) -> tuple[int, int]:
+        return bisect_left(self._prices, price_min), bisect_right(self._prices, price_max)
+
+    def _position(self, price: int, car_id: int) -> int:
+        low = bisect_left(self._prices, price)
+        high = bisect_right(self._prices, price, lo=low)
+        return bisect_left(self._price_ids, car_id, lo=low, hi=high)
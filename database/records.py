@@ -0,0 +1,125 @@
+import json
+from collections.abc import Mapping
+from typing import Any, Iterator
+
+_UNSET = object()
+
+# cars jadvali ustunlari (migrations.CARS_TABLE tartibida)
+CAR_COLUMNS = (
+    'id', 'user_id', 'model', 'price', 'condition', 'transmission', 'color',
+    'mileage', 'region', 'photo', 'phone', 'username', 'photos', 'status',
+    'channel_message_id', 'created_at', 'sold_at',
+)
+
+# saved_searches jadvalidan o'qiladigan ustunlar
+SAVED_SEARCH_COLUMNS = ('id', 'user_id', 'model', 'query', 'price_min', 'price_max')
+
+# Bir xil ustunlar ro'yxati uchun nom -> indeks jadvali barcha qatorlarga umumiy
+_INDEXES: dict[tuple[str, ...], dict[str, int]] = {}
+
+
+def _index_for(columns: tuple[str, ...]) -> dict[str, int]:
+    index = _INDEXES.get(columns)
+    if index is None:
+        index = _INDEXES[columns] = {name: position for position, name in enumerate(columns)}
+    return index
+
+
+class Car(Mapping):
+    """cars jadvalidagi bitta qator.
+
+    Qator tuple ko'rinishida saqlanadi, ustun nomlari esa so'rovdagi barcha
+    qatorlar uchun umumiy indeks orqali topiladi. photos JSON faqat birinchi
+    murojaatda o'qiladi. Mapping interfeysi (car['model'], car.get(...))
+    format_car va handlerlar uchun dict bilan bir xil ishlaydi.
+    """
+
+    __slots__ = ('_row', '_index', '_photos')
+
+    def __init__(self, row: tuple, index: dict[str, int]):
+        self._row = row
+        self._index = index
+        self._photos = _UNSET
+
+    @classmethod
+    def from_row(cls, columns: list[str] | tuple[str, ...], row: tuple) -> 'Car':
+        return cls(row, _index_for(tuple(columns)))
+
+    @property
+    def photos(self) -> list[str]:
+        if self._photos is _UNSET:
+            self._photos = self._decode_photos()
+        return self._photos
+
+    def attach_photos(self, file_ids: list[str]) -> None:
+        """car_photos jadvalidan olingan rasmlarni biriktiradi."""
+        self._photos = file_ids
+
+    def _decode_photos(self) -> list[str]:
+        # car_photos biriktirilmagan bo'lsa: eski photos JSON yoki muqova rasm
+        photo = self.get('photo')
+        fallback = [photo] if photo else []
+
+        position = self._index.get('photos')
+        raw_photos = self._row[position] if position is not None else None
+        if not raw_photos:
+            return fallback
+        try:
+            return json.loads(raw_photos)
+        except json.JSONDecodeError:
+            return fallback
+
+    def replace(self, **fields: Any) -> 'Car':
+        """Ko'rsatilgan ustunlari almashtirilgan yangi Car qaytaradi."""
+        row = list(self._row)
+        for name, value in fields.items():
+            row[self._index[name]] = value
+        car = Car(tuple(row), self._index)
+        car._photos = self._photos
+        return car
+
+    def __getitem__(self, key: str) -> Any:
+        if key == 'photos':
+            return self.photos
+        return self._row[self._index[key]]
+
+    def get(self, key: str, default: Any = None) -> Any:
+        if key == 'photos':
+            return self.photos
+        position = self._index.get(key)
+        return default if position is None else self._row[position]
+
+    def __getattr__(self, name: str) -> Any:
+        if name.startswith('_'):
+            raise AttributeError(name)
+        try:
+            return self[name]
+        except KeyError:
+            raise AttributeError(name) from None
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self._index)
+
+    def __len__(self) -> int:
+        return len(self._index)
+
+    def __repr__(self) -> str:
+        return f"Car(id={self.get('id')!r}, model={self.get('model')!r}, price={self.get('price')!r})"
+
+
+def normalize_photos(car_data: dict) -> list[tuple[str, str | None]]:
+    """FSM'dagi rasmlarni (file_id, file_unique_id) ro'yxatiga keltiradi.
+
+    photos elementlari file_id satri yoki {'file_id', 'file_unique_id'} bo'lishi mumkin.
+    """
+    photos: list[tuple[str, str | None]] = []
+    for item in car_data.get('photos') or []:
+        if isinstance(item, dict):
+            if item.get('file_id'):
+                photos.append((item['file_id'], item.get('file_unique_id')))
+        elif item:
+            photos.append((item, None))
+
+    if not photos and car_data.get('photo'):
+        photos.append((car_data['photo'], car_data.get('photo_unique_id')))
+    return photos
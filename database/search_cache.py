@@ -0,0 +1,98 @@
+import asyncio
+from collections.abc import Mapping
+from typing import Awaitable, Callable
+
+from utils.cache import MISSING, TTLCache
+from utils.translit import tokenize
+
+# (model tokenlari, price_min, price_max)
+SearchKey = tuple[tuple[str, ...], int, int]
+# (id lar kamayish tartibida, ro'yxat to'liqmi)
+SearchIds = tuple[tuple[int, ...], bool]
+
+
+def search_key(model: str | None, price_min: int, price_max: int) -> SearchKey:
+    """"Кобальт" va "cobalt " bitta kalitga tushadi."""
+    return tuple(tokenize(model)), int(price_min), int(price_max)
+
+
+class SearchCache:
+    """Qidiruv natijalari (aktiv e'lon id lari) keshi.
+
+    Bir xil so'rov bir vaqtda kelsa, bazaga bitta so'rov boradi va
+    qolganlar uning natijasini kutadi (single-flight). add_car /
+    mark_car_sold dan keyin faqat shu e'longa mos keladigan yozuvlar
+    o'chiriladi; o'qish davomida yozuv bo'lsa, natija keshga yozilmaydi.
+    """
+
+    def __init__(self, maxsize: int, ttl: float):
+        self._entries = TTLCache(maxsize=maxsize, ttl=ttl)
+        self._inflight: dict[SearchKey, asyncio.Task] = {}
+        self._generation = 0
+        self.coalesced = 0
+        self.invalidations = 0
+
+    async def get_or_load(
+        self,
+        key: SearchKey,
+        loader: Callable[[], Awaitable[SearchIds]],
+    ) -> SearchIds:
+        cached = self._entries.get(key)
+        if cached is not MISSING:
+            return cached
+
+        task = self._inflight.get(key)
+        if task is None:
+            task = asyncio.create_task(self._load(key, loader))
+            self._inflight[key] = task
+        else:
+            self.coalesced += 1
+        # Kutayotganlardan biri bekor qilinsa ham so'rov boshqalar uchun davom etadi
+        return await asyncio.shield(task)
+
+    async def _load(self, key: SearchKey, loader: Callable[[], Awaitable[SearchIds]]) -> SearchIds:
+        generation = self._generation
+        try:
+            result = await loader()
+        finally:
+            if self._inflight.get(key) is asyncio.current_task():
+                del self._inflight[key]
+        if generation == self._generation:
+            self._entries.set(key, result)
+        return result
+
+    def invalidate_car(self, car: Mapping) -> int:
+        """car qo'shilgan/o'zgargan: uni o'z ichiga oladigan so'rovlarni o'chiradi."""
+        self._generation += 1
+        tokens = [
+            token
+            for column in ('model', 'color', 'region')
+            for token in tokenize(car.get(column))
+        ]
+        price = car.get('price')
+
+        def affected(key: SearchKey) -> bool:
+            query, price_min, price_max = key
+            if price is None or not price_min <= price <= price_max:
+                return False
+            # FTS kabi: so'rovdagi har bir token e'lonning biror tokeniga prefiks
+            return all(any(token.startswith(prefix) for token in tokens) for prefix in query)
+
+        removed = self._entries.invalidate_where(affected)
+        for key in [key for key in self._inflight if affected(key)]:
+            del self._inflight[key]
+        self.invalidations += removed
+        return removed
+
+    def clear(self) -> None:
+        self._generation += 1
+        self.invalidations += len(self._entries)
+        self._entries.clear()
+        self._inflight.clear()
+
+    def stats(self) -> dict:
+        return {
+            **self._entries.stats(),
+            'coalesced': self.coalesced,
+            'invalidations': self.invalidations,
+        }
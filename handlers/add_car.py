@@ -4,21 +4,29 @@ from aiogram.types import (
     CallbackQuery,
     InlineKeyboardMarkup,
     InlineKeyboardButton,
+    InputMediaPhoto,
+    ReplyParameters,
     WebAppInfo,
 )
 from aiogram.fsm.context import FSMContext
+from aiogram.methods import SendMediaGroup, SendMessage, SendPhoto
 
 from states.add_car import AddCarStates
 from keyboards.inline import confirm_keyboard, buy_button
 from database.manager import db_manager
 from utils.formatter import format_car
 from config import CHANNEL_ID
-from loader import bot
+from loader import sender, subscriptions
+from services.albums import ALBUM_LIMIT, MediaGroupCollector
+from services.sender import Priority
 
-router = Router()
+router = Router(name='add_car')
 
 MINI_APP_URL = "https://avto-miniapp-starter.vercel.app"
 
+# Albom qismlari (media_group_id) yig'ilib, FSM'ga bir marta yoziladi
+albums = MediaGroupCollector()
+
 
 def add_entry_keyboard() -> InlineKeyboardMarkup:
     return InlineKeyboardMarkup(
@@ -69,13 +77,13 @@ async def add_start(message: Message, state: FSMContext):
     )
 
 
-@router.callback_query(F.data == "add_car_bot")
+@router.callback_query(F.data == "add_car_bot", flags={'registered': True})
 async def add_start_in_bot(call: CallbackQuery, state: FSMContext):
     await state.clear()
     await state.set_state(AddCarStates.photos)
 
     await call.message.answer(
-        "📸 Mashina rasmini yuboring\n\n"
+        f"📸 Mashina rasmini yuboring (albom qilib {ALBUM_LIMIT} tagacha)\n\n"
         "Ushbu jarayonda quyidagi ma'lumotlarni kiritish kerak bo'ladi:\n"
         "• Mashina modeli\n"
         "• Narxi\n"
@@ -97,9 +105,24 @@ async def add_entry_cancel(call: CallbackQuery, state: FSMContext):
 
 @router.message(AddCarStates.photos, F.photo)
 async def get_photo(message: Message, state: FSMContext):
-    await state.update_data(photo=message.photo[-1].file_id)
+    if message.media_group_id:
+        albums.add(message, lambda messages: save_photos(messages, state))
+        return
+    await save_photos([message], state)
+
+
+async def save_photos(messages: list[Message], state: FSMContext):
+    photos = [
+        {"file_id": message.photo[-1].file_id, "file_unique_id": message.photo[-1].file_unique_id}
+        for message in messages
+    ]
+    await state.update_data(photo=photos[0]["file_id"], photos=photos)
     await state.set_state(AddCarStates.model)
-    await message.answer("🚗 Mashina modeli? (Masalan: Toyota Camry)")
+
+    text = "🚗 Mashina modeli? (Masalan: Toyota Camry)"
+    if len(photos) > 1:
+        text = f"📷 {len(photos)} ta rasm qabul qilindi.\n\n" + text
+    await messages[0].answer(text)
 
 
 @router.message(AddCarStates.model, F.text)
@@ -152,19 +175,11 @@ async def get_mileage(message: Message, state: FSMContext):
     await message.answer("📍 Qaysi viloyatda?\n\nToshkent, Samarqand, Buxoro va boshqalar")
 
 
-@router.message(AddCarStates.region, F.text)
-async def get_region(message: Message, state: FSMContext):
-    user_id = str(message.from_user.id)
-    user = await db_manager.get_user(user_id)
-
-    if not user:
-        await message.answer("❌ Xatolik! Iltimos /start buyrug'ini bosing")
-        await state.clear()
-        return
-
+@router.message(AddCarStates.region, F.text, flags={'registered': True})
+async def get_region(message: Message, state: FSMContext, user: dict):
     await state.update_data(
         region=message.text,
-        user_id=user_id,
+        user_id=user["user_id"],
         phone=user["phone"],
         username=user["username"],
     )
@@ -178,27 +193,59 @@ async def get_region(message: Message, state: FSMContext):
     )
 
 
-@router.callback_query(F.data == "confirm_send")
+@router.callback_query(F.data == "confirm_send", flags={'throttle': 'publish'})
 async def confirm_send(call: CallbackQuery, state: FSMContext):
     data = await state.get_data()
 
-    await db_manager.add_car(data)
+    car_id = await db_manager.add_car(data)
+    # Obunachilarga xabar fon vazifasida ketadi, sotuvchi kutmaydi
+    subscriptions.notify_new_car(data)
 
     channel_reply_markup = buy_button(data["username"]) if data.get("username") else None
-
-    # Keyinchalik mini app admin paneldan tahrirlash uchun:
-    # shu joyda send_photo natijasidagi message_id ni saqlab qo'yish mumkin.
-    sent = await bot.send_photo(
-        chat_id=CHANNEL_ID,
-        photo=data["photo"],
-        caption=format_car(data),
-        parse_mode="HTML",
-        reply_markup=channel_reply_markup,
-    )
-
-    # Agar keyin channel_message_id qo'shmoqchi bo'lsang:
-    # sent.message_id shu yerda tayyor turadi
-    _ = sent.message_id
+    photos = [item["file_id"] for item in data.get("photos") or []] or [data["photo"]]
+    if len(photos) > 1:
+        # Albom bitta sendMediaGroup: caption birinchi rasmda
+        sent = await sender.send(
+            SendMediaGroup(
+                chat_id=CHANNEL_ID,
+                media=[
+                    InputMediaPhoto(
+                        media=file_id,
+                        caption=format_car(data) if index == 0 else None,
+                        parse_mode="HTML",
+                    )
+                    for index, file_id in enumerate(photos)
+                ],
+            ),
+            Priority.BULK,
+        )
+        channel_message_id = sent[0].message_id
+        if channel_reply_markup is not None:
+            # Albomga tugma biriktirib bo'lmaydi: u albomga javob xabarida
+            await sender.send(
+                SendMessage(
+                    chat_id=CHANNEL_ID,
+                    text="💬 Sotuvchi bilan bog‘lanish",
+                    reply_parameters=ReplyParameters(message_id=channel_message_id),
+                    reply_markup=channel_reply_markup,
+                ),
+                Priority.BULK,
+            )
+    else:
+        sent = await sender.send(
+            SendPhoto(
+                chat_id=CHANNEL_ID,
+                photo=photos[0],
+                caption=format_car(data),
+                parse_mode="HTML",
+                reply_markup=channel_reply_markup,
+            ),
+            Priority.BULK,
+        )
+        channel_message_id = sent.message_id
+
+    # Mini app admin paneldan tahrirlash uchun kanal xabari saqlanadi
+    await db_manager.set_channel_message_id(car_id, channel_message_id)
 
     await call.message.answer(
         "✅ E’lon kanalga yuborildi!\n\n"
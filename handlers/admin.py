@@ -1,11 +1,16 @@
+from html import escape
+
 from aiogram import Router, F
+from aiogram.filters import Command, CommandObject
 from aiogram.types import CallbackQuery, Message
 
 from config import ADMIN_IDS
 from database.manager import db_manager
 from keyboards.inline import admin_panel_keyboard
+from loader import sender, throttling
+from services import metrics
 
-router = Router()
+router = Router(name='admin')
 
 
 def _is_admin(user_id: int) -> bool:
@@ -35,7 +40,7 @@ async def admin_stats(call: CallbackQuery) -> None:
         return
 
     stats = await db_manager.get_stats()
-    top_region = stats['top_region'] or '—'
+    top_region = escape(stats['top_region']) if stats['top_region'] else '—'
 
     text = (
         "📊 <b>Bot statistikasi</b>\n\n"
@@ -43,9 +48,30 @@ async def admin_stats(call: CallbackQuery) -> None:
         f"📢 Jami e’lonlar: <b>{stats['total_cars']}</b>\n"
         f"🟢 Aktiv e’lonlar: <b>{stats['active_cars']}</b>\n"
         f"✅ Sotilganlar: <b>{stats['sold_cars']}</b>\n"
+        f"🗄 Arxivda: <b>{stats['archived_cars']}</b>\n"
         f"🗓 Bugungi e’lonlar: <b>{stats['today_ads']}</b>\n"
         f"📍 Eng faol hudud: <b>{top_region}</b> ({stats['top_region_count']})"
     )
+    if db_manager.user_cache is not None:
+        user_cache = db_manager.user_cache.stats()
+        text += (
+            f"\n\n🧠 User kesh: {user_cache['size']} ta, hit {user_cache['hits']}, "
+            f"miss {user_cache['misses']}, evict {user_cache['evictions']}"
+        )
+    if db_manager.search_cache is not None:
+        search_cache = db_manager.search_cache.stats()
+        text += (
+            f"\n🔎 Qidiruv kesh: {search_cache['size']} ta, hit {search_cache['hits']}, "
+            f"miss {search_cache['misses']}, birlashtirilgan {search_cache['coalesced']}, "
+            f"tozalangan {search_cache['invalidations']}"
+        )
+    queue = sender.metrics()
+    text += (
+        f"\n📤 Yuborish navbati: {queue['queue_interactive']} + {queue['queue_bulk']} (bulk), "
+        f"kutayotgan chatlar {queue['waiting_chats']}, 429 {queue['retries']}, xato {queue['failed']}"
+    )
+    limits = throttling.stats()
+    text += f"\n🚦 Cheklov: {limits['users']} user kuzatilmoqda, {limits['blocked']} ta so‘rov to‘xtatildi"
 
     await call.message.answer(text)
     await call.answer()
@@ -67,8 +93,41 @@ async def admin_recent(call: CallbackQuery) -> None:
     for car in recent:
         status = '✅ sotilgan' if car.get('status') == 'sold' else '🟢 aktiv'
         lines.append(
-            f"#{car['id']} — {car.get('model')} — {car.get('price')}$ — {status}"
+            f"#{car['id']} — {escape(str(car.get('model')))} — {car.get('price')}$ — {status}"
         )
 
     await call.message.answer("\n".join(lines))
     await call.answer()
+
+
+@router.message(Command('counters'))
+async def admin_check_counters(message: Message, command: CommandObject) -> None:
+    if not _is_admin(message.from_user.id):
+        await message.answer(_deny_text())
+        return
+
+    repair = (command.args or '').strip().lower() == 'fix'
+    mismatches = await db_manager.check_counters(repair=repair)
+    if not mismatches:
+        await message.answer("✅ Statistika hisoblagichlari to‘g‘ri.")
+        return
+
+    lines = [f"⚠️ <b>{len(mismatches)} ta hisoblagich mos emas</b>", ""]
+    for scope, key, real, stored in mismatches[:30]:
+        lines.append(f"{scope}:{escape(key) if key else '—'} — haqiqiy {real}, saqlangan {stored}")
+
+    if repair:
+        lines += ["", "🔧 Hisoblagichlar qayta hisoblandi."]
+    else:
+        lines += ["", "Tuzatish uchun: /counters fix"]
+
+    await message.answer("\n".join(lines))
+
+
+@router.message(Command('metrics'))
+async def admin_metrics(message: Message) -> None:
+    if not _is_admin(message.from_user.id):
+        await message.answer(_deny_text())
+        return
+
+    await message.answer(metrics.summary())
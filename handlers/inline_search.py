@@ -0,0 +1,77 @@
+import logging
+import re
+
+from aiogram import Router
+from aiogram.types import (
+    InlineQuery,
+    InlineQueryResultArticle,
+    InlineQueryResultCachedPhoto,
+    InputTextMessageContent,
+)
+
+from database.manager import db_manager
+from database.records import Car
+from keyboards.inline import buy_button
+from utils.formatter import format_car, format_car_short
+
+logger = logging.getLogger(__name__)
+router = Router(name='inline_search')
+
+# Telegram bitta javobda 50 tagacha natija qabul qiladi
+INLINE_PAGE_SIZE = 20
+# Telegram tomonida javob keshi (soniya); bazadagi qidiruv keshi alohida
+INLINE_CACHE_TIME = 60
+
+# "8000-12000", "8000$-12000$", "8000-" yoki "-12000"
+_PRICE_RANGE_RE = re.compile(r'(?:^|\s)(\d*)\$?\s*-\s*(\d*)\$?(?=\s|$)')
+
+
+def parse_inline_query(text: str) -> tuple[str, int, int]:
+    """"cobalt 8000-12000" -> ('cobalt', 8000, 12000)."""
+    price_min, price_max = 0, 999_999_999
+    match = _PRICE_RANGE_RE.search(text)
+    if match and (match.group(1) or match.group(2)):
+        price_min = int(match.group(1) or 0)
+        price_max = int(match.group(2) or 999_999_999)
+        text = text[:match.start()] + ' ' + text[match.end():]
+    return ' '.join(text.split()), price_min, price_max
+
+
+def _result(car: Car) -> InlineQueryResultCachedPhoto | InlineQueryResultArticle:
+    reply_markup = buy_button(car['username']) if car.get('username') else None
+    if car.get('photo'):
+        return InlineQueryResultCachedPhoto(
+            id=str(car['id']),
+            photo_file_id=car['photo'],
+            caption=format_car(car),
+            reply_markup=reply_markup,
+        )
+    return InlineQueryResultArticle(
+        id=str(car['id']),
+        title=f"{car.get('model') or 'Noma’lum'} — {car.get('price') or 0}$",
+        description=f"{car.get('region') or '—'} · {car.get('mileage') or '—'} km",
+        input_message_content=InputTextMessageContent(message_text=format_car_short(car)),
+        reply_markup=reply_markup,
+    )
+
+
+@router.inline_query(flags={'throttle': 'inline', 'registered': True})
+async def inline_search(query: InlineQuery) -> None:
+    model, price_min, price_max = parse_inline_query(query.query)
+    after_id = int(query.offset) if query.offset.isdigit() else None
+
+    # FSM qidiruvi bilan bir xil yo'l: search_cars_page va uning keshi
+    cars, next_cursor = await db_manager.search_cars_page(
+        model=model,
+        price_min=price_min,
+        price_max=price_max,
+        after_id=after_id,
+        limit=INLINE_PAGE_SIZE,
+    )
+
+    await query.answer(
+        [_result(car) for car in cars],
+        cache_time=INLINE_CACHE_TIME,
+        is_personal=True,
+        next_offset=str(next_cursor) if next_cursor is not None else '',
+    )
@@ -4,7 +4,7 @@ from aiogram.fsm.context import FSMContext
 
 from keyboards.reply import main_menu
 
-router = Router()
+router = Router(name='menu')
 
 
 @router.message()
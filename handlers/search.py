@@ -1,32 +1,32 @@
 import logging
 
 from aiogram import Router, F
+from aiogram.exceptions import TelegramBadRequest
 from aiogram.fsm.context import FSMContext
-from aiogram.types import Message
+from aiogram.types import CallbackQuery, InputMediaPhoto, Message
 
+from database.facets import FACETS, facet_code
 from database.manager import db_manager
+from database.records import Car
+from keyboards.inline import facet_keyboard, search_more_keyboard, search_subscribe_keyboard
+from loader import sender, subscriptions
+from services.subscriptions import MAX_SAVED_SEARCHES_PER_USER
+from services.sender import Priority
 from states.search import SearchCarStates
-from utils.formatter import format_car
+from utils.formatter import format_car_short
 
 logger = logging.getLogger(__name__)
-router = Router()
+router = Router(name='search')
 
 CANCEL_TEXTS = {'bekor', '/cancel', 'cancel'}
+SEARCH_PAGE_SIZE = 10
+MEDIA_GROUP_LIMIT = 10
+# Filtr klaviaturasida ko'rsatiladigan hududlar soni (eng ko'p e'lonlisi)
+REGION_FACET_LIMIT = 6
 
 
-async def _ensure_registered(message: Message) -> bool:
-    user = await db_manager.get_user(str(message.from_user.id))
-    if user:
-        return True
-    await message.answer("❌ Avval /start bosing va telefon raqamingizni yuboring.")
-    return False
-
-
-@router.message(F.text == '🔍 Mashina qidirish')
+@router.message(F.text == '🔍 Mashina qidirish', flags={'throttle': 'search_start', 'registered': True})
 async def search_start(message: Message, state: FSMContext) -> None:
-    if not await _ensure_registered(message):
-        return
-
     await state.clear()
     await state.set_state(SearchCarStates.waiting_for_model)
     await message.answer(
@@ -78,7 +78,7 @@ async def get_price_min(message: Message, state: FSMContext) -> None:
     )
 
 
-@router.message(SearchCarStates.waiting_for_price_max, F.text)
+@router.message(SearchCarStates.waiting_for_price_max, F.text, flags={'throttle': 'search'})
 async def get_price_max(message: Message, state: FSMContext) -> None:
     text = message.text.strip()
     if text.lower() in CANCEL_TEXTS:
@@ -98,39 +98,284 @@ async def get_price_max(message: Message, state: FSMContext) -> None:
     price_min = data.get('price_min', 0)
     await state.clear()
 
-    results = await db_manager.search_cars(
+    results, next_cursor = await db_manager.search_cars_page(
         model=model,
         price_min=price_min,
         price_max=price_max,
+        limit=SEARCH_PAGE_SIZE,
     )
 
     max_label = price_max if price_max != 999_999_999 else 'cheksiz'
 
+    # "Ko'proq" va "Obuna" tugmalari uchun so'rov parametrlari FSM data'da qoladi,
+    # callback_data'da esa faqat so'rov belgisi (va keyingi sahifa kursori).
+    query = {
+        'tag': message.message_id,
+        'model': model,
+        'price_min': price_min,
+        'price_max': price_max,
+    }
+    await state.update_data(search=query)
+
     if not results:
         await message.answer(
             f"❌ Hech narsa topilmadi.\n\n"
             f"Model: {model}\n"
-            f"Narx oralig‘i: {price_min}$ - {max_label}$"
+            f"Narx oralig‘i: {price_min}$ - {max_label}$\n\n"
+            f"🔔 Obuna bo‘lsangiz, mos e’lon chiqqanda xabar beramiz.",
+            reply_markup=search_subscribe_keyboard(query['tag']),
         )
         return
 
+    total = await db_manager.count_cars(model=model, price_min=price_min, price_max=price_max)
     await message.answer(
-        f"✅ {len(results)} ta mashina topildi.\n\n"
+        f"✅ {max(total, len(results))} ta mashina topildi.\n\n"
         f"Model: {model}\n"
-        f"Narx oralig‘i: {price_min}$ - {max_label}$"
+        f"Narx oralig‘i: {price_min}$ - {max_label}$",
+        reply_markup=search_subscribe_keyboard(query['tag'], filters=True),
+    )
+    await _send_page(message, query, results, next_cursor)
+
+
+@router.callback_query(F.data.startswith('search_more:'), flags={'throttle': 'search'})
+async def search_more(call: CallbackQuery, state: FSMContext) -> None:
+    data = await state.get_data()
+    query = data.get('search')
+    _, tag, cursor = (call.data.split(':') + ['', ''])[:3]
+
+    if not query or tag != str(query['tag']) or not cursor.isdigit():
+        await call.answer("Qidiruv eskirgan, iltimos qaytadan qidiring.", show_alert=True)
+        return
+
+    await call.message.edit_reply_markup(reply_markup=None)
+    await call.answer()
+
+    results, next_cursor = await _fetch_page(query, after_id=int(cursor))
+    if not results:
+        await call.message.answer("ℹ️ Boshqa natija yo‘q.")
+        return
+
+    await _send_page(call.message, query, results, next_cursor)
+
+
+async def _fetch_page(query: dict, after_id: int | None = None) -> tuple[list[Car], int | None]:
+    if query.get('filters'):
+        return await db_manager.search_cars_faceted(
+            model=query['model'],
+            price_min=query['price_min'],
+            price_max=query['price_max'],
+            filters=query['filters'],
+            after_id=after_id,
+            limit=SEARCH_PAGE_SIZE,
+        )
+    return await db_manager.search_cars_page(
+        model=query['model'],
+        price_min=query['price_min'],
+        price_max=query['price_max'],
+        after_id=after_id,
+        limit=SEARCH_PAGE_SIZE,
+    )
+
+
+async def _current_query(call: CallbackQuery, state: FSMContext) -> dict | None:
+    data = await state.get_data()
+    query = data.get('search')
+    tag = (call.data.split(':') + [''])[1]
+    if not query or tag != str(query['tag']):
+        await call.answer("Qidiruv eskirgan, iltimos qaytadan qidiring.", show_alert=True)
+        return None
+    return query
+
+
+async def _facet_markup(query: dict):
+    filters = query.get('filters') or {}
+    total, counts = await db_manager.facet_counts(
+        model=query['model'],
+        price_min=query['price_min'],
+        price_max=query['price_max'],
+        filters=filters,
+    )
+
+    facets = []
+    for number, facet in enumerate(FACETS):
+        selected = set(filters.get(facet) or ())
+        values = counts[facet]
+        if facet == 'region':
+            values = [
+                value for position, value in enumerate(values)
+                if position < REGION_FACET_LIMIT or value[0] in selected
+            ]
+        facets.append((
+            number,
+            facet,
+            [
+                (facet_code(key), label, count, key in selected)
+                for key, label, count in values
+            ],
+        ))
+    return facet_keyboard(query['tag'], facets, total)
+
+
+@router.callback_query(F.data.startswith('flt_open:'), flags={'throttle': 'facet'})
+async def filters_open(call: CallbackQuery, state: FSMContext) -> None:
+    query = await _current_query(call, state)
+    if query is None:
+        return
+
+    await call.message.answer(
+        "🎛 Filtrlarni tanlang (qavs ichida -- mos e’lonlar soni):",
+        reply_markup=await _facet_markup(query),
+    )
+    await call.answer()
+
+
+@router.callback_query(F.data.startswith('flt:'), flags={'throttle': 'facet'})
+async def filters_toggle(call: CallbackQuery, state: FSMContext) -> None:
+    query = await _current_query(call, state)
+    if query is None:
+        return
+
+    _, _, facet_number, code = (call.data.split(':') + ['', '', ''])[:4]
+    key = None
+    if facet_number.isdigit() and int(facet_number) < len(FACETS):
+        facet = FACETS[int(facet_number)]
+        key = db_manager.facet_key(facet, code)
+    if key is None:
+        await call.answer("Filtr eskirgan, iltimos filtrlarni qaytadan oching.", show_alert=True)
+        return
+
+    filters = dict(query.get('filters') or {})
+    selected = list(filters.get(facet) or [])
+    if key in selected:
+        selected.remove(key)
+    else:
+        selected.append(key)
+    if selected:
+        filters[facet] = selected
+    else:
+        filters.pop(facet, None)
+    query = {**query, 'filters': filters}
+    await state.update_data(search=query)
+
+    await _edit_facet_markup(call, query)
+
+
+@router.callback_query(F.data.startswith('flt_reset:'), flags={'throttle': 'facet'})
+async def filters_reset(call: CallbackQuery, state: FSMContext) -> None:
+    query = await _current_query(call, state)
+    if query is None:
+        return
+
+    query = {**query, 'filters': {}}
+    await state.update_data(search=query)
+    await _edit_facet_markup(call, query)
+
+
+async def _edit_facet_markup(call: CallbackQuery, query: dict) -> None:
+    try:
+        await call.message.edit_reply_markup(reply_markup=await _facet_markup(query))
+    except TelegramBadRequest:
+        # Sanoqlar o'zgarmagan bo'lsa Telegram "message is not modified" qaytaradi
+        pass
+    await call.answer()
+
+
+@router.callback_query(F.data.startswith('flt_show:'), flags={'throttle': 'search'})
+async def filters_show(call: CallbackQuery, state: FSMContext) -> None:
+    query = await _current_query(call, state)
+    if query is None:
+        return
+
+    await call.answer()
+    results, next_cursor = await _fetch_page(query)
+    if not results:
+        await call.message.answer("❌ Bu filtrlar bo‘yicha e’lon topilmadi.")
+        return
+
+    await _send_page(call.message, query, results, next_cursor)
+
+
+@router.callback_query(F.data.startswith('search_sub:'))
+async def search_subscribe(call: CallbackQuery, state: FSMContext) -> None:
+    query = await _current_query(call, state)
+    if query is None:
+        return
+
+    saved = await subscriptions.subscribe(
+        user_id=str(call.from_user.id),
+        model=query['model'],
+        price_min=query['price_min'],
+        price_max=query['price_max'],
     )
+    if saved is None:
+        await call.answer(
+            f"Ko‘pi bilan {MAX_SAVED_SEARCHES_PER_USER} ta obuna mumkin.",
+            show_alert=True,
+        )
+        return
+
+    await call.answer("🔔 Obuna bo‘ldingiz! Yangi e’lon chiqsa xabar beramiz.", show_alert=True)
+
 
-    for car in results:
+@router.callback_query(F.data.startswith('unsub:'))
+async def unsubscribe(call: CallbackQuery) -> None:
+    _, search_id = (call.data.split(':') + [''])[:2]
+    if search_id.isdigit():
+        await subscriptions.unsubscribe(int(search_id), str(call.from_user.id))
+
+    await call.message.edit_reply_markup(reply_markup=None)
+    await call.answer("🔕 Obuna bekor qilindi.")
+
+
+async def _send_page(
+    message: Message,
+    query: dict,
+    cars: list[Car],
+    next_cursor: int | None,
+) -> None:
+    # Rasmli e'lonlar 10 tadan media group bo'lib, rasmsizlari bitta matnda
+    # yuboriladi: 10 ta natija uchun 10 emas, 1-2 ta Bot API chaqiruvi.
+    with_photo = [car for car in cars if car.get('photo')]
+    without_photo = [car for car in cars if not car.get('photo')]
+
+    for start in range(0, len(with_photo), MEDIA_GROUP_LIMIT):
+        chunk = with_photo[start:start + MEDIA_GROUP_LIMIT]
         try:
-            photo = car.get('photo')
-            caption = format_car(car)
-            if photo:
-                await message.answer_photo(photo=photo, caption=caption)
+            if len(chunk) == 1:
+                # sendMediaGroup kamida 2 ta element talab qiladi
+                method = message.answer_photo(photo=chunk[0]['photo'], caption=format_car_short(chunk[0]))
             else:
-                await message.answer(caption)
+                method = message.answer_media_group(
+                    media=[
+                        InputMediaPhoto(media=car['photo'], caption=format_car_short(car))
+                        for car in chunk
+                    ]
+                )
+            await sender.send(method, Priority.INTERACTIVE)
         except Exception as e:
             logger.error(f'Search result yuborishda xatolik: {e}', exc_info=True)
 
+    lines = [format_car_short(car) for car in without_photo]
+    if next_cursor is not None:
+        lines.append('⬇️ Yana natijalar bor.')
+    if not lines:
+        return
+
+    try:
+        await sender.send(
+            message.answer(
+                '\n\n'.join(lines),
+                reply_markup=(
+                    search_more_keyboard(query['tag'], next_cursor)
+                    if next_cursor is not None
+                    else None
+                ),
+            ),
+            Priority.INTERACTIVE,
+        )
+    except Exception as e:
+        logger.error(f'Search result yuborishda xatolik: {e}', exc_info=True)
+
 
 @router.message(SearchCarStates.waiting_for_model)
 @router.message(SearchCarStates.waiting_for_price_min)
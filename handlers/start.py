@@ -10,7 +10,7 @@ from aiogram.types import (
 from keyboards.reply import phone_keyboard, main_menu
 from database.manager import db_manager
 
-router = Router()
+router = Router(name='start')
 
 MINI_APP_URL = "https://avto-miniapp-starter.vercel.app"
 
@@ -44,12 +44,16 @@ async def start(message: Message):
 
 
 @router.message(lambda m: m.contact)
-async def save_contact(message: Message):
-    await db_manager.add_user(
-        user_id=str(message.from_user.id),
-        phone=message.contact.phone_number,
-        username=message.from_user.username,
-    )
+async def save_contact(message: Message, user: dict | None):
+    phone = message.contact.phone_number
+    username = message.from_user.username
+    # Qayta yuborilgan bir xil kontakt bazaga yozilmaydi
+    if user is None or (user["phone"], user["username"]) != (phone, username):
+        await db_manager.add_user(
+            user_id=str(message.from_user.id),
+            phone=phone,
+            username=username,
+        )
 
     await message.answer(
         "✅ Rahmat! Endi foydalanishingiz mumkin.",
@@ -35,6 +35,67 @@ def post_keyboard(
     return InlineKeyboardMarkup(inline_keyboard=buttons)
 
 
+def search_more_keyboard(tag: int, cursor: int) -> InlineKeyboardMarkup:
+    return InlineKeyboardMarkup(
+        inline_keyboard=[
+            [InlineKeyboardButton(text='⬇️ Ko‘proq', callback_data=f'search_more:{tag}:{cursor}')],
+        ]
+    )
+
+
+def search_subscribe_keyboard(tag: int, filters: bool = False) -> InlineKeyboardMarkup:
+    buttons = [[InlineKeyboardButton(text='🔔 Obuna bo‘lish', callback_data=f'search_sub:{tag}')]]
+    if filters:
+        buttons.append([InlineKeyboardButton(text='🎛 Filtrlar', callback_data=f'flt_open:{tag}')])
+    return InlineKeyboardMarkup(inline_keyboard=buttons)
+
+
+FACET_ICONS = {'region': '📍', 'transmission': '🔧', 'condition': '⚙️', 'mileage': '📏'}
+
+
+def facet_keyboard(
+    tag: int,
+    facets: list[tuple[int, str, list[tuple[str, str, int, bool]]]],
+    total: int,
+) -> InlineKeyboardMarkup:
+    """facets: [(facet raqami, facet nomi, [(qiymat kodi, yorliq, sanoq, tanlangan), ...])]."""
+    buttons: list[list[InlineKeyboardButton]] = []
+    for facet_number, facet, values in facets:
+        row: list[InlineKeyboardButton] = []
+        for code, label, count, selected in values:
+            row.append(
+                InlineKeyboardButton(
+                    text=f"{'✅' if selected else FACET_ICONS.get(facet, '')} {label} ({count})",
+                    callback_data=f'flt:{tag}:{facet_number}:{code}',
+                )
+            )
+            if len(row) == 2:
+                buttons.append(row)
+                row = []
+        if row:
+            buttons.append(row)
+
+    buttons.append(
+        [
+            InlineKeyboardButton(text=f'🔍 Ko‘rsatish ({total})', callback_data=f'flt_show:{tag}'),
+            InlineKeyboardButton(text='♻️ Tozalash', callback_data=f'flt_reset:{tag}'),
+        ]
+    )
+    return InlineKeyboardMarkup(inline_keyboard=buttons)
+
+
+def subscription_keyboard(search_id: int, username: str | None) -> InlineKeyboardMarkup:
+    buttons: list[list[InlineKeyboardButton]] = []
+    if username:
+        buttons.append(
+            [InlineKeyboardButton(text='💬 Sotuvchiga yozish', url=f'https://t.me/{username}')]
+        )
+    buttons.append(
+        [InlineKeyboardButton(text='🔕 Obunani bekor qilish', callback_data=f'unsub:{search_id}')]
+    )
+    return InlineKeyboardMarkup(inline_keyboard=buttons)
+
+
 def admin_panel_keyboard() -> InlineKeyboardMarkup:
     return InlineKeyboardMarkup(
         inline_keyboard=[
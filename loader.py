@@ -2,10 +2,47 @@ from aiogram import Bot, Dispatcher
 from aiogram.client.default import DefaultBotProperties
 from aiogram.enums import ParseMode
 
-from config import BOT_TOKEN
+from config import BOT_TOKEN, BOT_WORKERS
+from database.fsm_storage import create_fsm_storage
+from database.manager import db_manager
+from middlewares.metrics import BotApiMetricsMiddleware, UpdateMetricsMiddleware
+from middlewares.throttling import ThrottlingMiddleware
+from middlewares.user import UserMiddleware
+from services import metrics
+from services.sender import SendScheduler
+from services.subscriptions import SubscriptionService
+from utils.metrics import timed_methods
 
 bot = Bot(
     token=BOT_TOKEN,
     default=DefaultBotProperties(parse_mode=ParseMode.HTML),
 )
-dp = Dispatcher()
\ No newline at end of file
+# FSM_STORAGE=sqlite: dialoglar qayta ishga tushirishdan keyin ham davom etadi
+fsm_storage = create_fsm_storage()
+dp = Dispatcher(storage=fsm_storage)
+
+# Userlar bo'yicha so'rov chegarasi; handler narxi throttle flagida
+throttling = ThrottlingMiddleware()
+dp.message.middleware(throttling)
+dp.callback_query.middleware(throttling)
+dp.inline_query.middleware(throttling)
+
+# User yozuvi update boshiga bir marta (keshdan): handler `user` argumenti,
+# flags={'registered': True} -- ro'yxatdan o'tmaganlar handlerga yetmaydi
+users = UserMiddleware(db_manager)
+dp.message.middleware(users)
+dp.callback_query.middleware(users)
+dp.inline_query.middleware(users)
+
+# Kechikish metrikalari (METRICS_PORT dagi /metrics va admin /metrics).
+# Routerlar bo'yicha vaqt app.include_routers da ulanadi
+dp.update.outer_middleware(UpdateMetricsMiddleware())
+bot.session.middleware(BotApiMetricsMiddleware())
+timed_methods(db_manager, metrics.db_latency, metrics.db_errors)
+
+# Barcha chiqish xabarlari Bot API limitlarini hisobga oluvchi navbat orqali
+# Worker jarayonlari umumiy Bot API limitini teng bo'lishadi
+sender = SendScheduler(bot, share=1 / BOT_WORKERS)
+
+# Saqlangan qidiruvlar: yangi e'lonlar haqida obunachilarga xabar
+subscriptions = SubscriptionService(db_manager, sender)
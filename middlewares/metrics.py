@@ -0,0 +1,118 @@
+import time
+from typing import Any, Awaitable, Callable
+
+from aiogram import BaseMiddleware, Router
+from aiogram.client.session.middlewares.base import BaseRequestMiddleware, NextRequestMiddlewareType
+from aiogram.dispatcher.event.bases import UNHANDLED
+from aiogram.methods import Response, TelegramMethod
+from aiogram.types import TelegramObject, Update
+
+from services import metrics
+
+INSTRUMENTED_EVENTS = ('message', 'callback_query', 'inline_query')
+
+
+class UpdateMetricsMiddleware(BaseMiddleware):
+    """Butun update vaqti (outer middleware, dp.update).
+
+    Filtrlar, FSM va boshqa middlewarelar ham shu vaqtga kiradi.
+    """
+
+    async def __call__(
+        self,
+        handler: Callable[[TelegramObject, dict[str, Any]], Awaitable[Any]],
+        event: Update,
+        data: dict[str, Any],
+    ) -> Any:
+        started = time.perf_counter()
+        try:
+            return await handler(event, data)
+        finally:
+            metrics.update_latency.observe(time.perf_counter() - started, event.event_type)
+
+
+class RouterMetricsMiddleware(BaseMiddleware):
+    """Router bo'yicha ishlash vaqti va xatolar (router observerida outer middleware).
+
+    Vaqtga routerning filtrlari, inner middlewarelar (throttling, user)
+    va handler kiradi. Update shu routerda ushlanmasa (UNHANDLED) yozilmaydi:
+    oldingi routerlar filtrlarining vaqti bot_update_seconds da ko'rinadi.
+    """
+
+    def __init__(self, router: str, event_type: str):
+        self.router = router
+        self.event_type = event_type
+
+    async def __call__(
+        self,
+        handler: Callable[[TelegramObject, dict[str, Any]], Awaitable[Any]],
+        event: TelegramObject,
+        data: dict[str, Any],
+    ) -> Any:
+        started = time.perf_counter()
+        try:
+            result = await handler(event, data)
+        except Exception as e:
+            metrics.router_errors.inc(self.router, type(e).__name__)
+            metrics.router_latency.observe(time.perf_counter() - started, self.router, self.event_type)
+            raise
+        if result is not UNHANDLED:
+            metrics.router_latency.observe(time.perf_counter() - started, self.router, self.event_type)
+        return result
+
+
+class HandlerMetricsMiddleware(BaseMiddleware):
+    """Handler bo'yicha ishlash vaqti va xatolar (router observerida inner middleware).
+
+    Filtrlar o'tib, handler tanlangandan keyin ishlaydi: data['handler']
+    dan funksiya nomi olinadi. Dispatcher darajasidagi inner middlewarelar
+    (throttling, user) undan oldin turadi, vaqtga faqat handler kiradi.
+    """
+
+    def __init__(self, router: str):
+        self.router = router
+
+    async def __call__(
+        self,
+        handler: Callable[[TelegramObject, dict[str, Any]], Awaitable[Any]],
+        event: TelegramObject,
+        data: dict[str, Any],
+    ) -> Any:
+        name = getattr(data['handler'].callback, '__name__', 'unknown')
+        started = time.perf_counter()
+        try:
+            return await handler(event, data)
+        except Exception as e:
+            metrics.handler_errors.inc(self.router, name, type(e).__name__)
+            raise
+        finally:
+            metrics.handler_latency.observe(time.perf_counter() - started, self.router, name)
+
+
+def instrument_router(router: Router) -> None:
+    """Routerning message, callback_query va inline_query observerlariga ulaydi."""
+    handler_metrics = HandlerMetricsMiddleware(router.name)
+    for event_type in INSTRUMENTED_EVENTS:
+        observer = router.observers[event_type]
+        observer.outer_middleware(RouterMetricsMiddleware(router.name, event_type))
+        observer.middleware(handler_metrics)
+
+
+class BotApiMetricsMiddleware(BaseRequestMiddleware):
+    """Bot API chaqiruvlari: metod bo'yicha vaqt va xatolar (bot.session)."""
+
+    async def __call__(
+        self,
+        make_request: NextRequestMiddlewareType,
+        bot,
+        method: TelegramMethod,
+    ) -> Response:
+        name = type(method).__name__
+        started = time.perf_counter()
+        try:
+            return await make_request(bot, method)
+        except Exception as e:
+            metrics.api_errors.inc(name, type(e).__name__)
+            raise
+        finally:
+            metrics.api_latency.observe(time.perf_counter() - started, name)
@@ -0,0 +1,111 @@
+import math
+import time
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable
+
+from aiogram import BaseMiddleware
+from aiogram.dispatcher.flags import get_flag
+from aiogram.types import CallbackQuery, InlineQuery, Message, TelegramObject, User
+
+from config import ADMIN_IDS
+from services.sender import TokenBucket
+
+# Har bir user uchun token bucket: THROTTLE_BURST tagacha zaxira,
+# soniyasiga THROTTLE_RATE token tiklanadi.
+THROTTLE_RATE = 1.0
+THROTTLE_BURST = 20.0
+
+# Handler narxi: @router.message(..., flags={'throttle': 'search'}).
+# Flagsiz handlerlar (menyu, FSM qadamlari) 'default' narxida.
+ACTION_COSTS = {
+    'default': 1.0,
+    'search_start': 2.0,
+    'facet': 2.0,
+    'inline': 2.0,
+    # To'liq qidiruv sahifasi: bazaga so'rov va media group yuborish
+    'search': 5.0,
+    'publish': 5.0,
+}
+
+# Xotira chegarasi: eng uzoq faol bo'lmagan userning bucket'i o'chiriladi
+MAX_TRACKED_USERS = 10_000
+
+
+class _UserLimit:
+    __slots__ = ('bucket', 'warned')
+
+    def __init__(self, bucket: TokenBucket):
+        self.bucket = bucket
+        # Limitda bir marta ogohlantiramiz: spamga javob ham spam bo'lmasin
+        self.warned = False
+
+
+class ThrottlingMiddleware(BaseMiddleware):
+    """Userlar bo'yicha so'rov chegarasi (inner middleware).
+
+    Limitga tushgan update handlerga yetmaydi; userga bir marta
+    "kuting" javobi boriladi. Adminlar cheklanmaydi.
+    """
+
+    def __init__(
+        self,
+        rate: float = THROTTLE_RATE,
+        burst: float = THROTTLE_BURST,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        self.rate = rate
+        self.burst = burst
+        self._clock = clock
+        self._users: OrderedDict[int, _UserLimit] = OrderedDict()
+        self.blocked = 0
+
+    async def __call__(
+        self,
+        handler: Callable[[TelegramObject, dict[str, Any]], Awaitable[Any]],
+        event: TelegramObject,
+        data: dict[str, Any],
+    ) -> Any:
+        user: User | None = data.get('event_from_user')
+        if user is None or user.id in ADMIN_IDS:
+            return await handler(event, data)
+
+        cost = ACTION_COSTS.get(get_flag(data, 'throttle', default='default'), ACTION_COSTS['default'])
+        limit = self._limit(user.id)
+        wait = limit.bucket.delay(cost)
+        if wait <= 0:
+            limit.bucket.consume(cost)
+            limit.warned = False
+            return await handler(event, data)
+
+        self.blocked += 1
+        if not limit.warned:
+            limit.warned = True
+            await self._reply(event, math.ceil(wait))
+        elif isinstance(event, CallbackQuery):
+            # Tugma "yuklanmoqda" holatida qolmasin
+            await event.answer()
+        return None
+
+    def stats(self) -> dict:
+        return {'users': len(self._users), 'blocked': self.blocked}
+
+    def _limit(self, user_id: int) -> _UserLimit:
+        limit = self._users.get(user_id)
+        if limit is None:
+            limit = _UserLimit(TokenBucket(self.rate, self.burst, self._clock))
+            self._users[user_id] = limit
+            while len(self._users) > MAX_TRACKED_USERS:
+                self._users.popitem(last=False)
+        else:
+            self._users.move_to_end(user_id)
+        return limit
+
+    @staticmethod
+    async def _reply(event: TelegramObject, wait: int) -> None:
+        text = f"⏳ Juda ko‘p so‘rov. Iltimos, {wait} soniyadan keyin qayta urinib ko‘ring."
+        if isinstance(event, Message):
+            await event.answer(text)
+        elif isinstance(event, CallbackQuery):
+            await event.answer(text, show_alert=True)
+        elif isinstance(event, InlineQuery):
+            await event.answer([], cache_time=wait, is_personal=True)
@@ -0,0 +1,62 @@
+from typing import Any, Awaitable, Callable
+
+from aiogram import BaseMiddleware
+from aiogram.dispatcher.flags import get_flag
+from aiogram.types import CallbackQuery, InlineQuery, InlineQueryResultsButton, Message, TelegramObject, User
+
+from database.base import CarStorage
+
+REGISTER_TEXT = "❌ Avval /start bosing va telefon raqamingizni yuboring."
+REGISTER_BUTTON_TEXT = "📱 Avval ro‘yxatdan o‘ting"
+# Ro'yxatdan o'tmagan userga bo'sh inline javob: ro'yxatdan o'tgach darhol yangilansin
+REGISTER_INLINE_CACHE_TIME = 5
+
+
+class UserMiddleware(BaseMiddleware):
+    """Ro'yxatdan o'tgan user yozuvini handlerga `user` argumenti sifatida beradi (inner middleware).
+
+    Yozuv faqat kerak bo'lganda o'qiladi: handler `user` parametrini
+    so'rasa yoki flags={'registered': True} bilan belgilangan bo'lsa.
+    O'qish storage.get_user orqali -- SQLite'da user keshidan.
+    'registered' handlerga ro'yxatdan o'tmagan user yetib bormaydi,
+    unga /start haqida eslatma boriladi.
+    """
+
+    def __init__(self, storage: CarStorage):
+        self.storage = storage
+
+    async def __call__(
+        self,
+        handler: Callable[[TelegramObject, dict[str, Any]], Awaitable[Any]],
+        event: TelegramObject,
+        data: dict[str, Any],
+    ) -> Any:
+        from_user: User | None = data.get('event_from_user')
+        required = get_flag(data, 'registered', default=False)
+        if from_user is None or not (required or 'user' in data['handler'].params):
+            return await handler(event, data)
+
+        user = await self.storage.get_user(str(from_user.id))
+        if user is None and required:
+            state = data.get('state')
+            if state is not None:
+                await state.clear()
+            await self._deny(event)
+            return None
+
+        data['user'] = user
+        return await handler(event, data)
+
+    @staticmethod
+    async def _deny(event: TelegramObject) -> None:
+        if isinstance(event, Message):
+            await event.answer(REGISTER_TEXT)
+        elif isinstance(event, CallbackQuery):
+            await event.answer(REGISTER_TEXT, show_alert=True)
+        elif isinstance(event, InlineQuery):
+            await event.answer(
+                [],
+                cache_time=REGISTER_INLINE_CACHE_TIME,
+                is_personal=True,
+                button=InlineQueryResultsButton(text=REGISTER_BUTTON_TEXT, start_parameter='register'),
+            )
@@ -0,0 +1,66 @@
+import asyncio
+import logging
+from typing import Awaitable, Callable
+
+from aiogram.types import Message
+
+logger = logging.getLogger(__name__)
+
+# Albom qismlari alohida updatelarda keladi; oxirgisidan keyin shuncha
+# sukut bo'lsa albom to'liq deb hisoblanadi (soniya)
+ALBUM_WINDOW = 0.6
+# Telegram albomida ko'pi bilan 10 ta element
+ALBUM_LIMIT = 10
+
+AlbumCallback = Callable[[list[Message]], Awaitable[None]]
+
+
+class _Album:
+    __slots__ = ('messages', 'callback', 'timer')
+
+    def __init__(self, callback: AlbumCallback):
+        self.messages: list[Message] = []
+        self.callback = callback
+        self.timer: asyncio.Task | None = None
+
+
+class MediaGroupCollector:
+    """media_group_id bo'yicha xabarlarni yig'ib, albomni bir marta qaytaradi.
+
+    Handler kutib turmaydi: har bir qism add() bilan qo'shiladi va darhol
+    qaytadi, taymer har yangi qismda qayta boshlanadi. Shu sababli bitta
+    chat updatelarini ketma-ket ishlovchi runnerlarda (webhook, workerlar)
+    ham albomning keyingi qismlari to'planadi. callback xabarlarni
+    message_id tartibida, ALBUM_LIMIT tagacha oladi.
+    """
+
+    def __init__(self, window: float = ALBUM_WINDOW, limit: int = ALBUM_LIMIT):
+        self.window = window
+        self.limit = limit
+        self._albums: dict[str, _Album] = {}
+        self._tasks: set[asyncio.Task] = set()
+
+    def add(self, message: Message, callback: AlbumCallback) -> None:
+        key = message.media_group_id
+        album = self._albums.get(key)
+        if album is None:
+            album = self._albums[key] = _Album(callback)
+        elif album.timer is not None:
+            album.timer.cancel()
+
+        if len(album.messages) < self.limit:
+            album.messages.append(message)
+        album.timer = asyncio.create_task(self._complete(key))
+        self._tasks.add(album.timer)
+        album.timer.add_done_callback(self._tasks.discard)
+
+    async def _complete(self, key: str) -> None:
+        await asyncio.sleep(self.window)
+        # Taymer uxlashdan chiqqach albom lug'atdan olinadi: shundan keyin
+        # add() bu taskni bekor qilmaydi, callback oxirigacha ishlaydi
+        album = self._albums.pop(key)
+        messages = sorted(album.messages, key=lambda message: message.message_id)
+        try:
+            await album.callback(messages)
+        except Exception as e:
+            logger.error(f'Albomni saqlashda xatolik: {e}', exc_info=True)
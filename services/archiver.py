@@ -0,0 +1,47 @@
+import asyncio
+import logging
+
+from database.base import CarStorage
+
+logger = logging.getLogger(__name__)
+
+# Bo'laklar orasidagi pauza: navbatdagi boshqa yozuvlar ham o'tib olsin
+BATCH_PAUSE = 0.05
+
+
+async def archive_once(
+    storage: CarStorage,
+    max_age_days: int | None,
+    batch_size: int,
+    vacuum: bool = True,
+) -> int:
+    """Arxivlanishi kerak bo'lgan barcha e'lonlarni bo'laklab ko'chiradi."""
+    total = 0
+    while True:
+        moved = await storage.archive_cars(max_age_days=max_age_days, limit=batch_size)
+        total += moved
+        if moved < batch_size:
+            break
+        await asyncio.sleep(BATCH_PAUSE)
+
+    if total and vacuum:
+        await storage.incremental_vacuum()
+    return total
+
+
+async def run_archiver(
+    storage: CarStorage,
+    interval: float,
+    max_age_days: int | None,
+    batch_size: int,
+    vacuum: bool = True,
+) -> None:
+    """Har interval soniyada archive_once ni ishga tushiradigan fon vazifasi."""
+    while True:
+        try:
+            moved = await archive_once(storage, max_age_days, batch_size, vacuum)
+            if moved:
+                logger.info(f"🗄 {moved} ta e'lon arxivga ko'chirildi")
+        except Exception as e:
+            logger.error(f'Arxivlashda xatolik: {e}', exc_info=True)
+        await asyncio.sleep(interval)
@@ -0,0 +1,86 @@
+import logging
+
+from aiohttp import web
+
+from utils.metrics import Histogram, Registry
+
+logger = logging.getLogger(__name__)
+
+registry = Registry()
+
+update_latency = registry.histogram(
+    'bot_update_seconds', 'Update ishlash vaqti (filtrlar va middlewarelar bilan)', ('type',)
+)
+router_latency = registry.histogram(
+    'bot_router_seconds', 'Router ishlash vaqti (filtrlar, middlewarelar va handler)', ('router', 'type')
+)
+router_errors = registry.counter(
+    'bot_router_errors_total', 'Routerdagi xatolar', ('router', 'error')
+)
+handler_latency = registry.histogram(
+    'bot_handler_seconds', 'Handler funksiyasining o‘zi ishlash vaqti', ('router', 'handler')
+)
+handler_errors = registry.counter(
+    'bot_handler_errors_total', 'Handlerlardagi xatolar', ('router', 'handler', 'error')
+)
+db_latency = registry.histogram(
+    'bot_db_seconds', 'DatabaseManager metodlari vaqti', ('method',)
+)
+db_errors = registry.counter(
+    'bot_db_errors_total', 'DatabaseManager metodlaridagi xatolar', ('method',)
+)
+api_latency = registry.histogram(
+    'bot_api_seconds', 'Bot API chaqiruvlari vaqti', ('method',)
+)
+api_errors = registry.counter(
+    'bot_api_errors_total', 'Bot API xatolari', ('method', 'error')
+)
+
+# Admin xulosasida har bo'limdan shuncha qator
+SUMMARY_ROWS = 6
+
+
+async def start_metrics_server(host: str, port: int) -> web.AppRunner:
+    """GET /metrics -- Prometheus text formati."""
+    async def handle(request: web.Request) -> web.Response:
+        return web.Response(text=registry.render(), content_type='text/plain', charset='utf-8')
+
+    app = web.Application()
+    app.router.add_get('/metrics', handle)
+    runner = web.AppRunner(app, access_log=None)
+    await runner.setup()
+    await web.TCPSite(runner, host, port).start()
+    logger.info(f'Metrikalar: http://{host}:{port}/metrics')
+    return runner
+
+
+def _rows(histogram: Histogram) -> list[str]:
+    # Umumiy vaqt bo'yicha eng "qimmat"lari
+    ranked = sorted(histogram.series.items(), key=lambda item: item[1].total, reverse=True)
+    rows = []
+    for labels, series in ranked[:SUMMARY_ROWS]:
+        average = series.total / series.count * 1000
+        p95 = histogram.quantile(0.95, *labels) * 1000
+        rows.append(f"• {'.'.join(labels)}: {series.count} ta, o‘rtacha {average:.1f} ms, p95 {p95:.0f} ms")
+    return rows or ['• —']
+
+
+def summary() -> str:
+    """Admin /metrics buyrug'i uchun qisqa matn."""
+    router_fails = sum(router_errors.values.values())
+    handler_fails = sum(handler_errors.values.values())
+    db_fails = sum(db_errors.values.values())
+    api_fails = sum(api_errors.values.values())
+    return '\n'.join([
+        f'⏱ <b>Routerlar</b> (xato: {router_fails:g})',
+        *_rows(router_latency),
+        '',
+        f'🧩 <b>Handlerlar</b> (xato: {handler_fails:g})',
+        *_rows(handler_latency),
+        '',
+        f'🗄 <b>Baza</b> (xato: {db_fails:g})',
+        *_rows(db_latency),
+        '',
+        f'📡 <b>Bot API</b> (xato: {api_fails:g})',
+        *_rows(api_latency),
+    ])
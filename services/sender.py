@@ -0,0 +1,278 @@
+import asyncio
+import itertools
+import logging
+import time
+from collections import OrderedDict, deque
+from enum import IntEnum
+from typing import Callable, TypeVar
+
+from aiogram import Bot
+from aiogram.exceptions import TelegramRetryAfter
+from aiogram.methods import SendMediaGroup, TelegramMethod
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar('T')
+
+# Bot API cheklovlari (taxminiy): jami ~30 xabar/s, bitta chatga ~1 xabar/s,
+# guruh/kanalga ~20 xabar/daqiqa. Media group har bir elementi alohida hisoblanadi.
+GLOBAL_RATE = 30.0
+CHAT_RATE = 1.0
+CHAT_BURST = 3
+GROUP_RATE = 20 / 60
+GROUP_BURST = 5
+MAX_CHAT_BUCKETS = 10_000
+MAX_RETRIES = 5
+
+
+class Priority(IntEnum):
+    INTERACTIVE = 0
+    BULK = 1
+
+
+class TokenBucket:
+    def __init__(self, rate: float, capacity: float, clock: Callable[[], float] = time.monotonic):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.blocked_until = 0.0
+        self._clock = clock
+        self._updated = clock()
+
+    def delay(self, cost: float = 1.0) -> float:
+        """Tokenlar yetishi uchun kutish kerak bo'lgan vaqt (0 -- hozir mumkin)."""
+        now = self._clock()
+        self.tokens = min(self.capacity, self.tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+        wait = max(0.0, self.blocked_until - now)
+        cost = min(cost, self.capacity)
+        if self.tokens < cost:
+            wait = max(wait, (cost - self.tokens) / self.rate)
+        return wait
+
+    def consume(self, cost: float = 1.0) -> None:
+        self.tokens -= min(cost, self.capacity)
+
+    def block(self, seconds: float) -> None:
+        self.blocked_until = max(self.blocked_until, self._clock() + seconds)
+
+
+class _Job:
+    __slots__ = ('method', 'future', 'attempts', 'cost')
+
+    def __init__(self, method: TelegramMethod, future: asyncio.Future):
+        self.method = method
+        self.future = future
+        self.attempts = 0
+        self.cost = len(method.media) if isinstance(method, SendMediaGroup) else 1
+
+
+class SendScheduler:
+    """loader.bot ustidagi yuborish navbati.
+
+    Har bir Bot API chaqiruvi (TelegramMethod obyekti) navbatga tushadi va
+    umumiy hamda chat/kanal token bucket'lari ruxsat berganda yuboriladi.
+    INTERACTIVE navbati BULK dan oldin xizmat qiladi. Limitga tushgan chat
+    xabarlari o'z navbatida tartib bilan kutadi, workerlar esa boshqa
+    chatlarga xizmat qilishda davom etadi. TelegramRetryAfter kelsa chat
+    ko'rsatilgan vaqtga to'xtatiladi va so'rov qayta yuboriladi.
+    Sinov uchun Bot'ni soxta session bilan berish kifoya.
+
+    share -- umumiy va guruh/kanal limitlarining shu jarayonga tegishli
+    ulushi (BOT_WORKERS jarayonida 1/BOT_WORKERS); shaxsiy chatlar
+    workerlar orasida bo'lingani uchun ularning limiti o'zgarmaydi.
+    """
+
+    def __init__(
+        self,
+        bot: Bot,
+        workers: int = 4,
+        queue_size: int = 10_000,
+        clock: Callable[[], float] = time.monotonic,
+        share: float = 1.0,
+    ):
+        self.bot = bot
+        self.workers = workers
+        self.share = share
+        self._clock = clock
+        self._queue: asyncio.PriorityQueue | None = None
+        self._queue_size = queue_size
+        self._tasks: list[asyncio.Task] = []
+        self._sequence = itertools.count()
+        self._global = TokenBucket(GLOBAL_RATE * share, max(1.0, GLOBAL_RATE * share), clock)
+        self._chats: OrderedDict[int | str, TokenBucket] = OrderedDict()
+        self._pending: dict[int | str, deque[tuple[Priority, _Job]]] = {}
+        # chat_id siz metodlarning 429 qayta urinishlari (umumiy bucket bo'yicha)
+        self._deferred: deque[tuple[Priority, _Job]] = deque()
+        self._drainers: set[asyncio.Task] = set()
+        self._depth = {priority: 0 for priority in Priority}
+        self.sent = 0
+        self.retries = 0
+        self.failed = 0
+
+    async def send(self, method: TelegramMethod[T], priority: Priority = Priority.INTERACTIVE) -> T:
+        """Metodni navbatga qo'yadi va Bot API javobini qaytaradi."""
+        self.start()
+        future = asyncio.get_running_loop().create_future()
+        await self._put(priority, _Job(method, future))
+        return await future
+
+    def start(self) -> None:
+        if self._queue is None:
+            self._queue = asyncio.PriorityQueue(maxsize=self._queue_size)
+            self._tasks = [asyncio.create_task(self._worker()) for _ in range(self.workers)]
+
+    async def stop(self) -> None:
+        """Navbatdagi xabarlar yuborilib bo'lgach workerlarni to'xtatadi."""
+        if self._queue is None:
+            return
+        await self._queue.join()
+        while self._drainers:
+            await asyncio.gather(*self._drainers, return_exceptions=True)
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks.clear()
+        self._queue = None
+
+    def metrics(self) -> dict:
+        return {
+            'queue_interactive': self._depth[Priority.INTERACTIVE],
+            'queue_bulk': self._depth[Priority.BULK],
+            'waiting_chats': len(self._pending),
+            'waiting_messages': sum(len(pending) for pending in self._pending.values()) + len(self._deferred),
+            'sent': self.sent,
+            'retries': self.retries,
+            'failed': self.failed,
+        }
+
+    async def _put(self, priority: Priority, job: _Job) -> None:
+        self._depth[priority] += 1
+        await self._queue.put((priority, next(self._sequence), job))
+
+    async def _worker(self) -> None:
+        while True:
+            priority, _, job = await self._queue.get()
+            self._depth[priority] -= 1
+            try:
+                await self._dispatch(priority, job)
+            except Exception as e:
+                logger.error(f'Yuborish navbatida xatolik: {e}', exc_info=True)
+            finally:
+                self._queue.task_done()
+
+    async def _dispatch(self, priority: Priority, job: _Job) -> None:
+        if job.future.done():
+            return
+
+        chat_id = getattr(job.method, 'chat_id', None)
+        if chat_id is None:
+            if await self._execute(job, None):
+                # Workerdan to'lgan navbatga put() qilib bo'lmaydi: navbatni
+                # bo'shatadigan hamma kutib qolishi mumkin
+                self._defer(priority, job)
+            return
+
+        bucket = self._chat_bucket(chat_id)
+        if chat_id not in self._pending and bucket.delay(job.cost) <= 0:
+            # Yuborish tugaguncha chat band: boshqa workerlar olgan keyingi
+            # xabarlar shu navbatga tushadi va bu xabardan oldin ketmaydi
+            pending = self._pending[chat_id] = deque()
+            try:
+                if await self._execute(job, bucket):
+                    # 429: xabar chat navbatining boshiga qaytadi, tartib buzilmaydi
+                    pending.appendleft((priority, job))
+            finally:
+                if pending:
+                    self._start_drainer(chat_id, bucket)
+                else:
+                    del self._pending[chat_id]
+            return
+
+        # Chat limitda yoki band: xabar shu chatning tartibli navbatiga o'tadi
+        pending = self._pending.get(chat_id)
+        if pending is None:
+            pending = self._pending[chat_id] = deque()
+            self._start_drainer(chat_id, bucket)
+        pending.append((priority, job))
+
+    def _start_drainer(self, chat_id: int | str, bucket: TokenBucket) -> None:
+        drainer = asyncio.create_task(self._drain_chat(chat_id, bucket))
+        self._drainers.add(drainer)
+        drainer.add_done_callback(self._drainers.discard)
+
+    def _defer(self, priority: Priority, job: _Job) -> None:
+        if not self._deferred:
+            drainer = asyncio.create_task(self._drain_deferred())
+            self._drainers.add(drainer)
+            drainer.add_done_callback(self._drainers.discard)
+        self._deferred.append((priority, job))
+
+    async def _drain_deferred(self) -> None:
+        # _execute umumiy bucket (429 dagi blok bilan) bo'shaguncha kutadi
+        while self._deferred:
+            _, job = self._deferred[0]
+            if not await self._execute(job, None):
+                self._deferred.popleft()
+
+    async def _drain_chat(self, chat_id: int | str, bucket: TokenBucket) -> None:
+        pending = self._pending[chat_id]
+        try:
+            while pending:
+                _, job = pending[0]
+                wait = bucket.delay(job.cost)
+                if wait > 0:
+                    await asyncio.sleep(wait)
+                    continue
+                if not await self._execute(job, bucket):
+                    pending.popleft()
+        finally:
+            del self._pending[chat_id]
+
+    async def _execute(self, job: _Job, bucket: TokenBucket | None) -> bool:
+        """Metodni yuboradi; qayta urinish kerak bo'lsa True qaytaradi."""
+        if job.future.done():
+            return False
+
+        while (wait := self._global.delay(job.cost)) > 0:
+            await asyncio.sleep(wait)
+        self._global.consume(job.cost)
+        if bucket is not None:
+            bucket.consume(job.cost)
+
+        try:
+            result = await self.bot(job.method)
+        except TelegramRetryAfter as e:
+            job.attempts += 1
+            self.retries += 1
+            logger.warning(f'Bot API 429: chat={getattr(job.method, "chat_id", None)}, {e.retry_after}s kutiladi')
+            (bucket or self._global).block(e.retry_after)
+            if job.attempts <= MAX_RETRIES:
+                return True
+            self.failed += 1
+            job.future.set_exception(e)
+        except Exception as e:
+            self.failed += 1
+            job.future.set_exception(e)
+        else:
+            self.sent += 1
+            job.future.set_result(result)
+        return False
+
+    def _chat_bucket(self, chat_id: int | str) -> TokenBucket:
+        bucket = self._chats.get(chat_id)
+        if bucket is None:
+            # Manfiy id yoki @username -- guruh/kanal
+            is_group = isinstance(chat_id, str) or chat_id < 0
+            bucket = TokenBucket(
+                GROUP_RATE * self.share if is_group else CHAT_RATE,
+                max(1.0, GROUP_BURST * self.share) if is_group else CHAT_BURST,
+                self._clock,
+            )
+            self._chats[chat_id] = bucket
+            while len(self._chats) > MAX_CHAT_BUCKETS:
+                self._chats.popitem(last=False)
+        else:
+            self._chats.move_to_end(chat_id)
+        return bucket
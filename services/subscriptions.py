@@ -0,0 +1,192 @@
+import asyncio
+import logging
+from bisect import bisect_right, insort
+from collections.abc import Mapping
+from typing import Callable
+
+from aiogram.methods import SendMessage, SendPhoto
+
+from database.base import CarStorage
+from keyboards.inline import subscription_keyboard
+from services.sender import Priority, SendScheduler
+from utils.formatter import format_car_short
+from utils.translit import tokenize
+
+logger = logging.getLogger(__name__)
+
+# Bitta userning saqlangan qidiruvlari soni
+MAX_SAVED_SEARCHES_PER_USER = 10
+
+_NO_IDS: frozenset[int] = frozenset()
+
+
+def _car_tokens(car: Mapping) -> set[str]:
+    # Qidiruv (cars_fts) bilan bir xil: model, rang va hudud tokenlari
+    return {
+        token
+        for column in ('model', 'color', 'region')
+        for token in tokenize(car.get(column))
+    }
+
+
+class SubscriptionIndex:
+    """Saqlangan qidiruvlarning xotiradagi indeksi.
+
+    Modelli qidiruv eng uzun (eng kam uchraydigan) tokeni bo'yicha
+    inverted indeksga tushadi: yangi e'lon tokenlarining prefikslari
+    orqali faqat nomzod obunalar topiladi. Modelsiz qidiruvlar
+    price_min bo'yicha saralangan oraliqlar ro'yxatida turadi.
+    """
+
+    def __init__(self):
+        self._searches: dict[int, dict] = {}
+        self._by_token: dict[str, set[int]] = {}
+        self._any_model: list[tuple[int, int, int]] = []
+        self._by_user: dict[str, set[int]] = {}
+
+    def add(self, saved: dict) -> None:
+        if saved['id'] in self._searches:
+            return
+        self._searches[saved['id']] = saved
+        self._by_user.setdefault(saved['user_id'], set()).add(saved['id'])
+
+        query = saved['query'].split()
+        if query:
+            self._by_token.setdefault(max(query, key=len), set()).add(saved['id'])
+        else:
+            insort(self._any_model, (saved['price_min'], saved['price_max'], saved['id']))
+
+    def remove(self, search_id: int) -> None:
+        saved = self._searches.pop(search_id, None)
+        if saved is None:
+            return
+
+        user_ids = self._by_user[saved['user_id']]
+        user_ids.discard(search_id)
+        if not user_ids:
+            del self._by_user[saved['user_id']]
+
+        query = saved['query'].split()
+        if query:
+            token = max(query, key=len)
+            self._by_token[token].discard(search_id)
+            if not self._by_token[token]:
+                del self._by_token[token]
+        else:
+            self._any_model.remove((saved['price_min'], saved['price_max'], search_id))
+
+    def user_count(self, user_id: str) -> int:
+        return len(self._by_user.get(user_id, _NO_IDS))
+
+    def match(self, car: Mapping) -> list[dict]:
+        """car ga mos keladigan saqlangan qidiruvlar."""
+        price = car.get('price')
+        if price is None:
+            return []
+        tokens = _car_tokens(car)
+
+        candidates: set[int] = set()
+        for token in tokens:
+            for end in range(1, len(token) + 1):
+                candidates |= self._by_token.get(token[:end], _NO_IDS)
+
+        matched = []
+        for search_id in candidates:
+            saved = self._searches[search_id]
+            if not saved['price_min'] <= price <= saved['price_max']:
+                continue
+            if all(any(token.startswith(prefix) for token in tokens) for prefix in saved['query'].split()):
+                matched.append(saved)
+
+        high = bisect_right(self._any_model, (price, float('inf'), float('inf')))
+        matched.extend(
+            self._searches[search_id]
+            for _, price_max, search_id in self._any_model[:high]
+            if price_max >= price
+        )
+        return matched
+
+    def __len__(self) -> int:
+        return len(self._searches)
+
+
+class SubscriptionService:
+    """Obunalarni saqlaydi va yangi e'lonlar haqida fon vazifasida xabar beradi."""
+
+    def __init__(self, storage: CarStorage, sender: SendScheduler):
+        self.storage = storage
+        self.sender = sender
+        self.index = SubscriptionIndex()
+        self._tasks: set[asyncio.Task] = set()
+        # DatabaseManager.on_change kabi: 'saved_search_added' | 'saved_search_removed'
+        self.on_change: Callable[[str, dict], None] | None = None
+
+    async def load(self) -> None:
+        for saved in await self.storage.get_saved_searches():
+            self.index.add(saved)
+
+    async def subscribe(
+        self,
+        user_id: str,
+        model: str | None,
+        price_min: int,
+        price_max: int,
+    ) -> dict | None:
+        """Obuna yaratadi; limitga yetgan bo'lsa None qaytaradi."""
+        if self.index.user_count(user_id) >= MAX_SAVED_SEARCHES_PER_USER:
+            return None
+        saved = await self.storage.add_saved_search(user_id, model, price_min, price_max)
+        self.index.add(saved)
+        if self.on_change is not None:
+            self.on_change('saved_search_added', saved)
+        return saved
+
+    async def unsubscribe(self, search_id: int, user_id: str) -> bool:
+        removed = await self.storage.delete_saved_search(search_id, user_id)
+        if removed:
+            self.index.remove(search_id)
+            if self.on_change is not None:
+                self.on_change('saved_search_removed', {'id': search_id})
+        return removed
+
+    def apply_change(self, kind: str, payload: dict) -> None:
+        """Boshqa worker jarayonidagi obuna o'zgarishini indeksga qo'llaydi."""
+        if kind == 'saved_search_added':
+            self.index.add(payload)
+        elif kind == 'saved_search_removed':
+            self.index.remove(payload['id'])
+
+    def notify_new_car(self, car: Mapping) -> None:
+        """Mos obunachilarga xabar yuborishni fon vazifasiga topshiradi."""
+        task = asyncio.create_task(self._notify(dict(car)))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def close(self) -> None:
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+
+    async def _notify(self, car: dict) -> None:
+        # Bir nechta obunasi mos kelsa ham userga bitta xabar; sotuvchining o'ziga emas
+        recipients: dict[str, dict] = {}
+        for saved in self.index.match(car):
+            if saved['user_id'] != car.get('user_id'):
+                recipients.setdefault(saved['user_id'], saved)
+        if not recipients:
+            return
+
+        results = await asyncio.gather(
+            *[self._send(user_id, saved, car) for user_id, saved in recipients.items()],
+            return_exceptions=True,
+        )
+        failed = sum(1 for result in results if isinstance(result, Exception))
+        if failed:
+            logger.warning(f'Obuna xabari: {failed}/{len(results)} ta yuborilmadi')
+
+    async def _send(self, user_id: str, saved: dict, car: dict) -> None:
+        text = f"🔔 Obunangiz bo‘yicha yangi e’lon\n\n{format_car_short(car)}"
+        reply_markup = subscription_keyboard(saved['id'], car.get('username'))
+        if car.get('photo'):
+            method = SendPhoto(chat_id=int(user_id), photo=car['photo'], caption=text, reply_markup=reply_markup)
+        else:
+            method = SendMessage(chat_id=int(user_id), text=text, reply_markup=reply_markup)
+        await self.sender.send(method, Priority.BULK)
@@ -0,0 +1,265 @@
+import asyncio
+import logging
+import signal
+from collections import deque
+from collections.abc import Mapping
+from typing import Any, Protocol
+
+from aiogram import Bot, Dispatcher
+from aiogram.methods import TelegramMethod
+from aiogram.webhook.aiohttp_server import SimpleRequestHandler, setup_application
+from aiohttp import web
+
+logger = logging.getLogger(__name__)
+
+# Qabul qilingan, lekin hali tugamagan updatelar chegarasi: to'lsa HTTP javob
+# kechikadi va Telegram max_connections doirasida yuborishni sekinlatadi.
+MAX_PENDING_UPDATES = 10_000
+# To'xtashda navbatdagi updatelarni tugatish uchun vaqt (soniya)
+DRAIN_TIMEOUT = 30.0
+
+
+def route_key(update: Mapping) -> int | None:
+    """Update tartib kaliti: chat id, chat bo'lmasa user id.
+
+    Bitta kalitdagi updatelar kelish tartibida ishlanadi (FSM holati
+    chat/user ga bog'liq); kaliti yo'q updatelar (poll va h.k.) erkin.
+    """
+    for field, event in update.items():
+        if field == 'update_id' or not isinstance(event, Mapping):
+            continue
+        chat = event.get('chat') or (event.get('message') or {}).get('chat')
+        if chat:
+            return chat['id']
+        user = event.get('from') or event.get('user')
+        if user:
+            return user['id']
+    return None
+
+
+def stop_signal() -> asyncio.Event:
+    """SIGINT/SIGTERM kelganda o'rnatiladigan event."""
+    stop = asyncio.Event()
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        try:
+            loop.add_signal_handler(sig, stop.set)
+        except NotImplementedError:
+            pass
+    return stop
+
+
+class UpdateRunner(Protocol):
+    """Webhook handleri updatelarni topshiradigan ijrochi.
+
+    OrderedUpdateRunner (shu jarayonda) yoki services.workers.WorkerPool
+    (chat bo'yicha worker jarayonlariga).
+    """
+
+    @property
+    def closing(self) -> bool: ...
+
+    async def submit(self, bot: Bot, update: dict) -> None: ...
+
+    async def drain(self, timeout: float = DRAIN_TIMEOUT) -> None: ...
+
+    def metrics(self) -> dict: ...
+
+
+class OrderedUpdateRunner:
+    """Updatelarni parallel ishlaydi, bitta chat ichida esa tartib bilan.
+
+    Har bir chat o'z navbatiga ega (sender._drain_chat kabi); bir vaqtda
+    ishlayotgan handlerlar soni max_inflight bilan cheklanadi.
+    """
+
+    def __init__(
+        self,
+        dispatcher: Dispatcher,
+        max_inflight: int = 64,
+        max_pending: int = MAX_PENDING_UPDATES,
+        **data: Any,
+    ):
+        self.dispatcher = dispatcher
+        self.data = data
+        self._inflight = asyncio.Semaphore(max_inflight)
+        self._capacity = asyncio.Semaphore(max_pending)
+        self._chats: dict[int, deque[tuple[Bot, dict]]] = {}
+        self._tasks: set[asyncio.Task] = set()
+        self._closing = False
+        self.accepted = 0
+        self.processed = 0
+        self.failed = 0
+
+    @property
+    def closing(self) -> bool:
+        return self._closing
+
+    async def submit(self, bot: Bot, update: dict) -> None:
+        if self._closing:
+            raise RuntimeError('OrderedUpdateRunner to\'xtatilmoqda')
+        await self._capacity.acquire()
+        self.accepted += 1
+
+        key = route_key(update)
+        if key is None:
+            self._spawn(self._process(bot, update))
+            return
+
+        pending = self._chats.get(key)
+        if pending is None:
+            pending = self._chats[key] = deque()
+            self._spawn(self._drain_chat(key))
+        pending.append((bot, update))
+
+    async def drain(self, timeout: float = DRAIN_TIMEOUT) -> None:
+        """Yangi updatelarni qabul qilmaydi va navbatdagilarni tugatadi."""
+        self._closing = True
+        if not self._tasks:
+            return
+        done, pending = await asyncio.wait(set(self._tasks), timeout=timeout)
+        if pending:
+            left = sum(len(updates) for updates in self._chats.values())
+            logger.warning(f'Webhook: {left} ta update {timeout:.0f} s ichida tugamadi')
+            for task in pending:
+                task.cancel()
+            await asyncio.gather(*pending, return_exceptions=True)
+
+    def metrics(self) -> dict:
+        return {
+            'accepted': self.accepted,
+            'processed': self.processed,
+            'failed': self.failed,
+            'waiting_chats': len(self._chats),
+            'waiting_updates': sum(len(updates) for updates in self._chats.values()),
+        }
+
+    def _spawn(self, coro) -> None:
+        task = asyncio.create_task(coro)
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def _drain_chat(self, key: int) -> None:
+        pending = self._chats[key]
+        try:
+            while pending:
+                bot, update = pending[0]
+                await self._process(bot, update)
+                pending.popleft()
+        finally:
+            del self._chats[key]
+
+    async def _process(self, bot: Bot, update: dict) -> None:
+        try:
+            async with self._inflight:
+                result = await self.dispatcher.feed_raw_update(bot=bot, update=update, **self.data)
+                if isinstance(result, TelegramMethod):
+                    await self.dispatcher.silent_call_request(bot=bot, result=result)
+            self.processed += 1
+        except Exception as e:
+            self.failed += 1
+            logger.error(f"Update {update.get('update_id')} ishlanmadi: {e}", exc_info=True)
+        finally:
+            self._capacity.release()
+
+
+class OrderedRequestHandler(SimpleRequestHandler):
+    """aiogram webhook handleri: updatelar runner ga (standart holda
+    OrderedUpdateRunner) topshiriladi.
+
+    Telegram'ga darhol 200 qaytadi; secret token SimpleRequestHandler
+    tomonidan tekshiriladi (X-Telegram-Bot-Api-Secret-Token).
+    """
+
+    def __init__(
+        self,
+        dispatcher: Dispatcher,
+        bot: Bot,
+        secret_token: str | None = None,
+        max_inflight: int = 64,
+        runner: UpdateRunner | None = None,
+        **data: Any,
+    ):
+        super().__init__(dispatcher, bot, handle_in_background=True, secret_token=secret_token, **data)
+        self.runner = runner or OrderedUpdateRunner(dispatcher, max_inflight=max_inflight, **data)
+
+    async def _handle_request_background(self, bot: Bot, request: web.Request) -> web.Response:
+        if self.runner.closing:
+            # Telegram keyinroq qayta yuboradi
+            return web.Response(status=503)
+        update = await request.json(loads=bot.session.json_loads)
+        await self.runner.submit(bot, update)
+        return web.json_response({}, dumps=bot.session.json_dumps)
+
+    async def close(self) -> None:
+        # Bot session'i app.py da, yuborish navbati bo'shagach yopiladi
+        await self.runner.drain()
+
+
+def build_webhook_app(
+    dispatcher: Dispatcher,
+    bot: Bot,
+    path: str,
+    secret_token: str | None,
+    max_inflight: int,
+    runner: UpdateRunner | None = None,
+    **data: Any,
+) -> tuple[web.Application, OrderedRequestHandler]:
+    app = web.Application()
+    handler = OrderedRequestHandler(
+        dispatcher,
+        bot,
+        secret_token=secret_token,
+        max_inflight=max_inflight,
+        runner=runner,
+        **data,
+    )
+    # Tartib muhim: on_shutdown'da avval navbat tugaydi, keyin dispatcher
+    # shutdown (FSM storage yopiladi)
+    handler.register(app, path=path)
+    setup_application(app, dispatcher, bot=bot, **data)
+    return app, handler
+
+
+async def run_webhook(
+    dispatcher: Dispatcher,
+    bot: Bot,
+    *,
+    host: str,
+    port: int,
+    path: str,
+    secret_token: str | None,
+    max_inflight: int,
+    public_url: str = '',
+    runner: UpdateRunner | None = None,
+) -> None:
+    """aiohttp serverini ishga tushiradi va SIGINT/SIGTERM gacha kutadi.
+
+    public_url bo'sh bo'lsa setWebhook chaqirilmaydi: lokal sinov uchun
+    updatelarni to'g'ridan-to'g'ri POST qilish mumkin, masalan:
+
+        curl -X POST localhost:8080/webhook \\
+            -H 'X-Telegram-Bot-Api-Secret-Token: <WEBHOOK_SECRET>' \\
+            -H 'Content-Type: application/json' -d @update.json
+    """
+    app, handler = build_webhook_app(dispatcher, bot, path, secret_token, max_inflight, runner)
+    app_runner = web.AppRunner(app)
+    await app_runner.setup()
+    site = web.TCPSite(app_runner, host, port)
+    await site.start()
+    logger.info(f'Webhook server: http://{host}:{port}{path}')
+
+    stop = stop_signal()
+    try:
+        if public_url:
+            await bot.set_webhook(
+                url=public_url.rstrip('/') + path,
+                secret_token=secret_token,
+                allowed_updates=dispatcher.resolve_used_update_types(),
+            )
+            logger.info('Webhook Telegram\'da o\'rnatildi')
+        await stop.wait()
+    finally:
+        # Yangi ulanishlar yopiladi, so'ng navbat tugatiladi (on_shutdown)
+        await app_runner.cleanup()
+        logger.info(f'Webhook to\'xtadi: {handler.runner.metrics()}')
@@ -0,0 +1,279 @@
+import asyncio
+import itertools
+import json
+import logging
+import os
+import shutil
+import signal
+import tempfile
+
+from aiogram import Bot, Dispatcher
+from aiohttp import ClientTimeout
+
+from database.base import CarStorage
+from services.subscriptions import SubscriptionService
+from services.webhook import DRAIN_TIMEOUT, OrderedUpdateRunner, route_key, stop_signal
+
+logger = logging.getLogger(__name__)
+
+# Supervisor worker jarayonlarini shu env orqali tanitadi
+WORKER_INDEX_ENV = 'BOT_WORKER_INDEX'
+WORKER_SOCKET_ENV = 'BOT_WORKER_SOCKET'
+
+# Supervisor <-> worker: unix socket ustida JSON qatorlar.
+#   worker -> supervisor: {"hello": N}, {"change": [tur, ma'lumot]}
+#   supervisor -> worker: {"update": {...}}, {"change": [tur, ma'lumot]}
+# change -- bitta workerdagi yozuv; supervisor uni qolgan workerlarga
+# tarqatadi, ular o'z xotiradagi indekslarini yangilaydi.
+LINE_LIMIT = 4 * 2**20
+WORKER_START_TIMEOUT = 120.0
+RESTART_DELAY = 1.0
+POLLING_TIMEOUT = 30
+
+
+def worker_slot() -> tuple[int, str] | None:
+    """Joriy jarayon worker bo'lsa (raqam, socket yo'li)."""
+    index = os.getenv(WORKER_INDEX_ENV)
+    path = os.getenv(WORKER_SOCKET_ENV)
+    if index is None or not path:
+        return None
+    return int(index), path
+
+
+def _line(message: dict) -> bytes:
+    return json.dumps(message, ensure_ascii=False).encode() + b'\n'
+
+
+class WorkerPool:
+    """N ta worker jarayoni va ularga updatelarni chat bo'yicha taqsimlash.
+
+    Bitta chat (yoki user) doim bitta workerga tushadi: FSM tartibi va
+    jarayon ichidagi keshlar (user, qidiruv) shu chat uchun to'g'ri qoladi.
+    Worker kutilmaganda to'xtasa, qayta ishga tushiriladi; shu orada
+    uning updatelari kutib turadi. services.webhook.UpdateRunner
+    interfeysini bajaradi, ya'ni webhook handleri ham shu pool'ga yozadi.
+    """
+
+    def __init__(self, count: int, command: list[str]):
+        self.count = count
+        self.command = command
+        self._directory = tempfile.mkdtemp(prefix='bot-workers-')
+        self._socket_path = os.path.join(self._directory, 'ingress.sock')
+        self._server: asyncio.AbstractServer | None = None
+        self._processes: list[asyncio.subprocess.Process | None] = [None] * count
+        self._writers: list[asyncio.StreamWriter | None] = [None] * count
+        self._ready = [asyncio.Event() for _ in range(count)]
+        self._watchers: set[asyncio.Task] = set()
+        self._round_robin = itertools.count()
+        self._closing = False
+        self.accepted = 0
+        self.relayed = 0
+        self.restarts = 0
+
+    @property
+    def closing(self) -> bool:
+        return self._closing
+
+    async def start(self) -> None:
+        self._server = await asyncio.start_unix_server(
+            self._connected, path=self._socket_path, limit=LINE_LIMIT
+        )
+        for index in range(self.count):
+            await self._spawn(index)
+        await asyncio.wait_for(
+            asyncio.gather(*(ready.wait() for ready in self._ready)),
+            timeout=WORKER_START_TIMEOUT,
+        )
+
+    async def submit(self, bot: Bot, update: dict) -> None:
+        if self._closing:
+            raise RuntimeError('WorkerPool to\'xtatilmoqda')
+        key = route_key(update)
+        index = (key if key is not None else next(self._round_robin)) % self.count
+
+        # Worker qayta ishga tushayotgan bo'lsa, ulanguncha kutiladi
+        await self._ready[index].wait()
+        writer = self._writers[index]
+        writer.write(_line({'update': update}))
+        # Worker navbati to'lsa socket bufferi ham to'ladi: ingress sekinlashadi
+        await writer.drain()
+        self.accepted += 1
+
+    async def drain(self, timeout: float = DRAIN_TIMEOUT) -> None:
+        """Workerlarga EOF yuboradi: ular navbatini tugatib chiqadi."""
+        self._closing = True
+        for writer in self._writers:
+            if writer is not None and writer.can_write_eof():
+                writer.write_eof()
+
+        processes = [process for process in self._processes if process is not None]
+        done, pending = await asyncio.wait(
+            [asyncio.create_task(process.wait()) for process in processes],
+            timeout=timeout,
+        )
+        if pending:
+            logger.warning(f'{len(pending)} ta worker {timeout:.0f} s ichida to\'xtamadi, o\'chiriladi')
+            for process in processes:
+                if process.returncode is None:
+                    process.kill()
+            await asyncio.gather(*pending, return_exceptions=True)
+
+        for watcher in self._watchers:
+            watcher.cancel()
+        await asyncio.gather(*self._watchers, return_exceptions=True)
+        if self._server is not None:
+            self._server.close()
+            await self._server.wait_closed()
+        shutil.rmtree(self._directory, ignore_errors=True)
+
+    def metrics(self) -> dict:
+        return {
+            'workers': self.count,
+            'alive': sum(1 for process in self._processes if process and process.returncode is None),
+            'accepted': self.accepted,
+            'relayed': self.relayed,
+            'restarts': self.restarts,
+        }
+
+    async def _spawn(self, index: int) -> None:
+        env = {**os.environ, WORKER_INDEX_ENV: str(index), WORKER_SOCKET_ENV: self._socket_path}
+        process = await asyncio.create_subprocess_exec(*self.command, env=env)
+        self._processes[index] = process
+        watcher = asyncio.create_task(self._watch(index, process))
+        self._watchers.add(watcher)
+        watcher.add_done_callback(self._watchers.discard)
+
+    async def _watch(self, index: int, process: asyncio.subprocess.Process) -> None:
+        code = await process.wait()
+        if self._closing:
+            return
+        logger.error(f'Worker {index} to\'xtadi (kod {code}), qayta ishga tushiriladi')
+        self._ready[index].clear()
+        self._writers[index] = None
+        self.restarts += 1
+        await asyncio.sleep(RESTART_DELAY)
+        await self._spawn(index)
+
+    async def _connected(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        index = json.loads(await reader.readline())['hello']
+        self._writers[index] = writer
+        self._ready[index].set()
+        logger.info(f'Worker {index} ulandi')
+        try:
+            async for line in reader:
+                if self._closing:
+                    continue
+                # O'zgarish yozgan workerdan boshqa hammasiga
+                for other, target in enumerate(self._writers):
+                    if other != index and target is not None:
+                        target.write(line)
+                self.relayed += 1
+        finally:
+            if self._writers[index] is writer:
+                self._writers[index] = None
+            writer.close()
+
+
+async def serve_worker(
+    dispatcher: Dispatcher,
+    bot: Bot,
+    index: int,
+    socket_path: str,
+    *,
+    max_inflight: int,
+    storage: CarStorage | None = None,
+    subscriptions: SubscriptionService | None = None,
+) -> None:
+    """Worker jarayoni: supervisor yuborgan updatelarni EOF gacha ishlaydi."""
+    reader, writer = await asyncio.open_unix_connection(socket_path, limit=LINE_LIMIT)
+
+    def publish(kind: str, payload: dict) -> None:
+        writer.write(_line({'change': [kind, payload]}))
+
+    if storage is not None:
+        storage.on_change = publish
+    if subscriptions is not None:
+        subscriptions.on_change = publish
+
+    # Ctrl+C butun jarayonlar guruhiga keladi: worker supervisor yopishini kutadi
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        try:
+            loop.add_signal_handler(sig, lambda: None)
+        except NotImplementedError:
+            pass
+
+    runner = OrderedUpdateRunner(dispatcher, max_inflight=max_inflight)
+    writer.write(_line({'hello': index}))
+    await dispatcher.emit_startup(bot=bot)
+    try:
+        async for line in reader:
+            message = json.loads(line)
+            if 'update' in message:
+                await runner.submit(bot, message['update'])
+                continue
+            kind, payload = message['change']
+            if kind.startswith('saved_search'):
+                if subscriptions is not None:
+                    subscriptions.apply_change(kind, payload)
+            elif storage is not None:
+                storage.apply_change(kind, payload)
+    finally:
+        await runner.drain()
+        await dispatcher.emit_shutdown(bot=bot)
+        logger.info(f'Worker {index} to\'xtadi: {runner.metrics()}')
+        writer.close()
+
+
+async def poll_updates(bot: Bot, runner: WorkerPool, allowed_updates: list[str]) -> None:
+    """getUpdates javobini aiogram modellariga aylantirmasdan workerlarga uzatadi.
+
+    Supervisor faqat chat id ni o'qiydi; Update obyektlari workerlarda quriladi.
+    """
+    session = await bot.session.create_session()
+    url = bot.session.api.api_url(token=bot.token, method='getUpdates')
+    timeout = ClientTimeout(total=POLLING_TIMEOUT + 10)
+    stop = stop_signal()
+    offset: int | None = None
+
+    async def poll() -> None:
+        nonlocal offset
+        failures = 0
+        while True:
+            params = {'timeout': POLLING_TIMEOUT, 'allowed_updates': json.dumps(allowed_updates)}
+            if offset is not None:
+                params['offset'] = offset
+            try:
+                async with session.post(url, data=params, timeout=timeout) as response:
+                    body = bot.session.json_loads(await response.text())
+                if not body.get('ok'):
+                    raise RuntimeError(body.get('description'))
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                failures += 1
+                logger.error(f'getUpdates xatosi: {e}')
+                await asyncio.sleep(min(failures, 5))
+                continue
+
+            failures = 0
+            for update in body['result']:
+                await runner.submit(bot, update)
+                offset = update['update_id'] + 1
+
+    polling = asyncio.create_task(poll())
+    stopping = asyncio.create_task(stop.wait())
+    await asyncio.wait({polling, stopping}, return_when=asyncio.FIRST_COMPLETED)
+    for task in (polling, stopping):
+        task.cancel()
+    await asyncio.gather(polling, stopping, return_exceptions=True)
+    if polling.done() and not polling.cancelled() and polling.exception():
+        raise polling.exception()
+
+    if offset is not None:
+        # Uzatilgan updatelarni Telegram'da tasdiqlash: qayta ishga tushganda takrorlanmaydi
+        try:
+            async with session.post(url, data={'offset': offset, 'timeout': 0, 'limit': 1}, timeout=timeout):
+                pass
+        except Exception as e:
+            logger.warning(f'Offset tasdiqlanmadi: {e}')
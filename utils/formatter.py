@@ -15,3 +15,19 @@ def format_car(data: dict) -> str:
         f"{username_line}"
         f"📷 Rasmlar soni: {len(data.get('photos') or ([data.get('photo')] if data.get('photo') else []))}"
     )
+
+
+def format_car_short(data: dict) -> str:
+    """Qidiruv natijalari uchun ixcham matn (media group caption yoki ro'yxat qatori)."""
+    username = (data.get('username') or '').strip()
+    contact = escape(str(data.get('phone') or '—'))
+    if username:
+        contact += f" · @{escape(username)}"
+    return (
+        f"🚗 <b>{escape(str(data.get('model', 'Noma’lum')))}</b> — "
+        f"<b>{escape(str(data.get('price', 0)))}$</b>\n"
+        f"⚙️ {escape(str(data.get('condition') or '—'))} · "
+        f"🔧 {escape(str(data.get('transmission') or '—'))} · "
+        f"📏 {escape(str(data.get('mileage') or '—'))} km\n"
+        f"📍 {escape(str(data.get('region') or '—'))} · 📞 {contact}"
+    )
@@ -0,0 +1,154 @@
+import functools
+import inspect
+import time
+from bisect import bisect_left
+from typing import Any, Callable
+
+# Prometheus uslubidagi kechikish oraliqlari (soniya)
+DEFAULT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+Labels = tuple[str, ...]
+
+
+def _escape(value: str) -> str:
+    return value.replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _label_text(names: Labels, values: Labels, extra: str = '') -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return '{' + ','.join(pairs) + '}' if pairs else ''
+
+
+class Counter:
+    def __init__(self, name: str, help_text: str, labels: Labels = ()):
+        self.name = name
+        self.help = help_text
+        self.labels = labels
+        self.values: dict[Labels, float] = {}
+
+    def inc(self, *labels: str, amount: float = 1.0) -> None:
+        self.values[labels] = self.values.get(labels, 0.0) + amount
+
+    def render(self) -> list[str]:
+        lines = [f'# HELP {self.name} {self.help}', f'# TYPE {self.name} counter']
+        for labels, value in sorted(self.values.items()):
+            lines.append(f'{self.name}{_label_text(self.labels, labels)} {value:g}')
+        return lines
+
+
+class _Series:
+    __slots__ = ('buckets', 'count', 'total')
+
+    def __init__(self, size: int):
+        self.buckets = [0] * size
+        self.count = 0
+        self.total = 0.0
+
+
+class Histogram:
+    """Label qiymatlari bo'yicha kechikish gistogrammasi (yig'ma emas, har bir oraliq alohida)."""
+
+    def __init__(
+        self,
+        name: str,
+        help_text: str,
+        labels: Labels = (),
+        buckets: tuple[float, ...] = DEFAULT_BUCKETS,
+    ):
+        self.name = name
+        self.help = help_text
+        self.labels = labels
+        self.bounds = buckets
+        self.series: dict[Labels, _Series] = {}
+
+    def observe(self, value: float, *labels: str) -> None:
+        series = self.series.get(labels)
+        if series is None:
+            series = self.series[labels] = _Series(len(self.bounds) + 1)
+        series.buckets[bisect_left(self.bounds, value)] += 1
+        series.count += 1
+        series.total += value
+
+    def quantile(self, q: float, *labels: str) -> float:
+        """Oraliqlar ichida chiziqli taxmin (histogram_quantile kabi)."""
+        series = self.series.get(labels)
+        if series is None or not series.count:
+            return 0.0
+        rank = q * series.count
+        seen = 0
+        for index, count in enumerate(series.buckets):
+            if seen + count >= rank and count:
+                low = self.bounds[index - 1] if index else 0.0
+                if index == len(self.bounds):
+                    return low
+                return low + (self.bounds[index] - low) * (rank - seen) / count
+            seen += count
+        return self.bounds[-1]
+
+    def render(self) -> list[str]:
+        lines = [f'# HELP {self.name} {self.help}', f'# TYPE {self.name} histogram']
+        for labels, series in sorted(self.series.items()):
+            cumulative = 0
+            for bound, count in zip(self.bounds + (float('inf'),), series.buckets):
+                cumulative += count
+                le = '+Inf' if bound == float('inf') else f'{bound:g}'
+                label_text = _label_text(self.labels, labels, 'le="' + le + '"')
+                lines.append(f'{self.name}_bucket{label_text} {cumulative}')
+            label_text = _label_text(self.labels, labels)
+            lines.append(f'{self.name}_sum{label_text} {series.total:.6f}')
+            lines.append(f'{self.name}_count{label_text} {series.count}')
+        return lines
+
+
+class Registry:
+    def __init__(self):
+        self.metrics: list[Counter | Histogram] = []
+
+    def counter(self, name: str, help_text: str, labels: Labels = ()) -> Counter:
+        metric = Counter(name, help_text, labels)
+        self.metrics.append(metric)
+        return metric
+
+    def histogram(self, name: str, help_text: str, labels: Labels = ()) -> Histogram:
+        metric = Histogram(name, help_text, labels)
+        self.metrics.append(metric)
+        return metric
+
+    def render(self) -> str:
+        """Prometheus text exposition formati (0.0.4)."""
+        lines: list[str] = []
+        for metric in self.metrics:
+            lines.extend(metric.render())
+        return '\n'.join(lines) + '\n'
+
+
+def timed_methods(
+    target: Any,
+    latency: Histogram,
+    errors: Counter,
+    clock: Callable[[], float] = time.perf_counter,
+) -> None:
+    """target ning barcha ochiq async metodlarini vaqt o'lchovchi o'ram bilan almashtiradi.
+
+    O'ramlar obyektning o'ziga yoziladi: db_manager ni import qilgan
+    barcha modullar o'lchangan metodlarni chaqiradi.
+    """
+    def timed(name: str, method: Callable) -> Callable:
+        @functools.wraps(method)
+        async def wrapper(*args, **kwargs):
+            started = clock()
+            try:
+                return await method(*args, **kwargs)
+            except Exception:
+                errors.inc(name)
+                raise
+            finally:
+                latency.observe(clock() - started, name)
+
+        return wrapper
+
+    for name, method in inspect.getmembers(target, inspect.iscoroutinefunction):
+        if not name.startswith('_'):
+            setattr(target, name, timed(name, method))
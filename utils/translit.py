@@ -0,0 +1,74 @@
+import re
+import unicodedata
+from functools import lru_cache
+
+# O'zbek (kirill) va rus harflarini yagona lotin yozuviga o'tkazish jadvali
+_CYRILLIC = {
+    'а': 'a', 'б': 'b', 'в': 'v', 'г': 'g', 'ғ': 'g', 'д': 'd', 'е': 'e',
+    'ё': 'yo', 'ж': 'j', 'з': 'z', 'и': 'i', 'й': 'y', 'к': 'k', 'қ': 'k',
+    'л': 'l', 'м': 'm', 'н': 'n', 'о': 'o', 'ў': 'o', 'п': 'p', 'р': 'r',
+    'с': 's', 'т': 't', 'у': 'u', 'ф': 'f', 'х': 'h', 'ҳ': 'h', 'ц': 's',
+    'ч': 'ch', 'ш': 'sh', 'щ': 'sh', 'ъ': '', 'ы': 'i', 'ь': '', 'э': 'e',
+    'ю': 'yu', 'я': 'ya',
+}
+_CYRILLIC_TABLE = str.maketrans(_CYRILLIC)
+
+# o‘, g‘ va boshqa apostrof ko'rinishlari
+_APOSTROPHES = str.maketrans('', '', "'`ʻʼ‘’")
+
+# Bir xil talaffuzdagi yozuv variantlarini bitta shaklga keltirish:
+# Cobalt/Кобальт, Lacetti/Ласетти, Nexia/Нексия/Neksiya ...
+_FOLDS = (
+    (re.compile(r'c(?=[eiy])'), 's'),
+    (re.compile(r'c(?!h)'), 'k'),
+    (re.compile(r'q'), 'k'),
+    (re.compile(r'x'), 'ks'),
+    (re.compile(r'w'), 'v'),
+    (re.compile(r'ph'), 'f'),
+    (re.compile(r'kh'), 'h'),
+    (re.compile(r'dj'), 'j'),
+    (re.compile(r'iy(?=[aeiou])'), 'i'),
+    (re.compile(r'([a-z])\1+'), r'\1'),
+)
+
+_TOKEN_RE = re.compile(r'[a-z0-9]+')
+
+# Model, rang va hudud nomlari juda ko'p takrorlanadi: natijalar keshlanadi
+TOKEN_CACHE_SIZE = 100_000
+
+
+def tokenize(text: str | None) -> list[str]:
+    """Matnni transliteratsiya qilib, solishtirish uchun tokenlarga ajratadi."""
+    if not text:
+        return []
+    return list(_tokens(str(text)))
+
+
+@lru_cache(maxsize=TOKEN_CACHE_SIZE)
+def _tokens(text: str) -> tuple[str, ...]:
+    value = unicodedata.normalize('NFKC', text).lower()
+    value = value.translate(_APOSTROPHES).translate(_CYRILLIC_TABLE)
+    value = ''.join(
+        char for char in unicodedata.normalize('NFKD', value)
+        if not unicodedata.combining(char)
+    )
+
+    tokens = []
+    for token in _TOKEN_RE.findall(value):
+        for pattern, replacement in _FOLDS:
+            token = pattern.sub(replacement, token)
+        tokens.append(token)
+    return tuple(tokens)
+
+
+def normalize_text(text: str | None) -> str:
+    """FTS indeksiga yoziladigan normallashtirilgan matn."""
+    return ' '.join(tokenize(text))
+
+
+def fts_query(text: str | None) -> str | None:
+    """Foydalanuvchi so'rovidan FTS5 MATCH ifodasini yasaydi (har bir token prefiks)."""
+    tokens = tokenize(text)
+    if not tokens:
+        return None
+    return ' '.join(f'"{token}"*' for token in tokens)